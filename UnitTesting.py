@@ -1,6 +1,22 @@
 import gedcom_parser
+import benchmark
+import batch
+import query
+import server
 import unittest
+import asyncio
 import datetime
+import collections
+import concurrent.futures
+import contextlib
+import io
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from dateutil.relativedelta import relativedelta
 
 class TestUserStories(unittest.TestCase):
     def test_unittest(self): #this is a test unit test
@@ -93,7 +109,7 @@ class TestUserStories(unittest.TestCase):
 
     def test_birthsLessThanFive(self): # tests US17: No more than five siblings should be born at the same time
         obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged")
-        self.assertEqual(['F2', 'F3'],obj.birthsLessThanFive())
+        self.assertEqual(['F2'],obj.birthsLessThanFive())
         
     def test_uniqueFirstNameInFamily(self): # tests US25: Unique first names in families
         obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged")
@@ -175,6 +191,438 @@ class TestUserStories(unittest.TestCase):
         obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged")
         self.assertCountEqual(["I7", "I8"], obj.noSiblingMarriage())
     
+    def test_GEDCOM_Index(self): # tests the index used by US18, US25 and US32
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged")
+        self.assertCountEqual(['I30', 'I31', 'I32', 'I33', 'I34', 'I35'], obj.index.multiple_births()['I30'])
+        self.assertCountEqual(['I7', 'I8'], obj.index.siblings_with_same_spouses('I7'))
+        self.assertCountEqual(['I1', 'I38'], obj.index.children_by_famc['F1'])
+        self.assertCountEqual(['I2', 'I3'], obj.index.spouses_by_fams['F1'])
+    
+    def test_ReportWriter(self): # tests that every check writes to the one report that is passed in
+        output = gedcom_parser.ReportWriter(io.StringIO())
+        gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, output)
+        report = output.getvalue()
+        self.assertIn("WARNING: FAMILY: US15: F2: More than 15 siblings are in this family", report)
+        self.assertIn("ERROR: US22: Individual I45 from the GEDCOM file was not added to the individuals table because I45 is not a unique id", report)
+        self.assertIn("LIST: US29: List Deceased: ", report)
+
+    def test_fast_tokenizer(self): # tests that the fast tokenizer reads the same individuals and families as analyze_GEDCOM
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        fast = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), fast_tokenizer = True)
+        self.assertEqual(list(obj.individuals), list(fast.individuals))
+        self.assertEqual(list(obj.family), list(fast.family))
+        for ID in obj.individuals:
+            for attribute in gedcom_parser.Individual.__slots__:
+                self.assertEqual(getattr(obj.individuals[ID], attribute), getattr(fast.individuals[ID], attribute))
+        for ID in obj.family:
+            for attribute in gedcom_parser.Family.__slots__:
+                self.assertEqual(getattr(obj.family[ID], attribute), getattr(fast.family[ID], attribute))
+        self.assertEqual(obj.illegitimateDatesErrorList, fast.illegitimateDatesErrorList)
+        self.assertEqual(obj.getNonUniqueIDsList(), fast.getNonUniqueIDsList())
+
+    def test_ColumnarStore(self): # tests that the views of the columnar store have the same attributes as the parsed individuals and families
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        columnar = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), columnar = True)
+        self.assertEqual(list(obj.individuals), list(columnar.individuals))
+        for ID in obj.individuals:
+            for attribute in gedcom_parser.Individual.__slots__:
+                self.assertEqual(getattr(obj.individuals[ID], attribute), getattr(columnar.individuals[ID], attribute))
+        for ID in obj.family:
+            for attribute in gedcom_parser.Family.__slots__:
+                self.assertEqual(getattr(obj.family[ID], attribute), getattr(columnar.family[ID], attribute))
+        self.assertEqual(obj.user_story_errors, columnar.user_story_errors)
+        store = columnar.columns
+        self.assertEqual(datetime.date(283, 4, 25).toordinal(), store.births[store.individual_rows["I1"]])
+        self.assertEqual(gedcom_parser.NO_DATE, store.deaths[store.individual_rows["I1"]])
+        columnar.individuals["I1"].check_alive()
+        self.assertEqual(obj.individuals["I1"].calculateAge(), columnar.individuals["I1"].age)
+        self.assertTrue(columnar.individuals["I1"].alive)
+        columnar.individuals["I1"].fams = "NA"
+        self.assertEqual("NA", columnar.individuals["I1"].fams)
+
+    def test_CheckExecutor(self): # tests that running the checks on forked worker processes gives the same report and results as running them one after another
+        serial = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        parallel = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), workers = 2)
+        self.assertEqual(serial.output.getvalue(), parallel.output.getvalue())
+        self.assertEqual(serial.check_results, parallel.check_results)
+        self.assertEqual(serial.recentSurvivorTable.rows, parallel.recentSurvivorTable.rows)
+        self.assertEqual([check.method for check in gedcom_parser.CHECKS], list(parallel.check_results))
+        self.assertEqual(serial.fewerThan15Siblings(), parallel.check_results["fewerThan15Siblings"])
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy is not installed")
+    def test_DateColumns(self): # tests that the vectorized date rules report the same IDs and errors as the loops
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        vectorized = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), vectorized = True)
+        self.assertEqual(obj.check_results, vectorized.check_results)
+        self.assertEqual(obj.user_story_errors, vectorized.user_story_errors)
+        self.assertEqual(obj.output.getvalue(), vectorized.output.getvalue())
+        dates = [datetime.date(2019, 5, 31), datetime.date(2020, 6, 30), datetime.date(283, 4, 25), datetime.date(2000, 12, 1)]
+        columns = vectorized.date_columns
+        shifted = columns.add_months(columns.numpy.array(dates, dtype = "datetime64[D]"), 9)
+        self.assertEqual([date + relativedelta(months = 9) for date in dates], list(shifted.astype(datetime.date)))
+
+    def test_snapshot(self): # tests that a run from the snapshot of the previous run reports the same as a full run after a record changes
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "family.ged")
+            with open("SkywalkerFamilyErrors.ged") as f:
+                text = f.read()
+            with open(path, "w") as f:
+                f.write(text)
+            gedcom_parser.Read_GEDCOM(path, True, False, gedcom_parser.ReportWriter(io.StringIO()), snapshot = path + ".snapshot")
+            self.assertTrue(os.path.exists(path + ".snapshot"))
+            with open(path, "w") as f:
+                f.write(text.replace("1 NAME Luke /Skywalker/", "1 NAME Luke /Lars/"))
+            full = gedcom_parser.Read_GEDCOM(path, True, False, gedcom_parser.ReportWriter(io.StringIO()))
+            incremental = gedcom_parser.Read_GEDCOM(path, True, False, gedcom_parser.ReportWriter(io.StringIO()), snapshot = path + ".snapshot")
+            self.assertEqual(full.check_results, incremental.check_results)
+            self.assertEqual(full.user_story_errors, incremental.user_story_errors)
+            self.assertEqual(full.output.getvalue(), incremental.output.getvalue())
+            self.assertEqual(["family.ged", "family.ged.snapshot"], sorted(os.listdir(directory))) #The temporary file of the snapshot was moved into place
+
+    def test_ModelCache(self): # tests that a file loaded from the cache has the same individuals and families as a file that is read and that old models are evicted
+        with tempfile.TemporaryDirectory() as directory:
+            obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), cache = directory)
+            cached = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), cache = directory)
+            self.assertEqual(list(obj.individuals), list(cached.individuals))
+            for ID in obj.individuals:
+                for attribute in gedcom_parser.Individual.__slots__:
+                    self.assertEqual(getattr(obj.individuals[ID], attribute), getattr(cached.individuals[ID], attribute))
+            for ID in obj.family:
+                for attribute in gedcom_parser.Family.__slots__:
+                    self.assertEqual(getattr(obj.family[ID], attribute), getattr(cached.family[ID], attribute))
+            self.assertEqual(obj.illegitimateDatesErrorList, cached.illegitimateDatesErrorList)
+            self.assertEqual(obj.getNonUniqueIDsList(), cached.getNonUniqueIDsList())
+            cache = gedcom_parser.ModelCache(directory, max_bytes = 0)
+            gedcom_parser.Read_GEDCOM("SkywalkerFamilyErrors.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), cache = cache)
+            self.assertEqual([cache.key("SkywalkerFamilyErrors.ged")], os.listdir(directory))
+            shared = gedcom_parser.ModelCache(directory)
+            with concurrent.futures.ThreadPoolExecutor(4) as pool: #Runs that save the same model at once each write their own temporary file
+                list(pool.map(lambda _: shared.save("shared.model", list(range(10000))), range(20)))
+            self.assertEqual(list(range(10000)), shared.load("shared.model"))
+            self.assertFalse([name for name in os.listdir(directory) if name.endswith(".tmp")])
+
+    def test_SQLiteStore(self): # tests that the checks that run as SQL on the database report the same as the loops and that a second run loads the records from the database
+        checks = sorted(gedcom_parser.SQLiteStore.CHECKS)
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), checks = checks)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tree.db")
+            stored = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), checks = checks, database = path)
+            self.assertEqual(obj.check_results, stored.check_results)
+            self.assertEqual(obj.output.getvalue(), stored.output.getvalue())
+            self.assertNotIn("index", vars(stored)) #US18 and US24 did not need the GEDCOM_Index
+            self.assertNotIn("kinship", vars(stored))
+            database = gedcom_parser.SQLiteStore(path)
+            self.assertIsNotNone(database.parsed(database.key("TargaryenFamily15Siblings.ged")))
+            self.assertEqual([("I40",), ("I41",), ("I44",), ("I45",)], database.execute("SELECT id FROM individuals WHERE famc = ? ORDER BY position", ("F4",)).fetchall())
+            loaded = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), checks = checks, database = database)
+            self.assertEqual(obj.check_results, loaded.check_results)
+            self.assertEqual(list(obj.individuals), list(loaded.individuals))
+            for ID in obj.individuals:
+                for attribute in ("name", "sex", "birth", "death", "famc", "fams"):
+                    self.assertEqual(getattr(obj.individuals[ID], attribute), getattr(loaded.individuals[ID], attribute))
+            for ID in obj.family:
+                for attribute in gedcom_parser.Family.__slots__:
+                    self.assertEqual(getattr(obj.family[ID], attribute), getattr(loaded.family[ID], attribute))
+            single = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), checks = ["US18"], database = database)
+            self.assertEqual(obj.check_results["noSiblingMarriage"], single.check_results["noSiblingMarriage"])
+            self.assertEqual({}, single.individuals.records) #No record was read from the database for the SQL check
+            self.assertEqual("NA", single.individuals["I1"].fams)
+            self.assertIs(single.individuals["I1"], single.individuals["I1"])
+            database.close()
+
+    def test_TableRenderer(self): # tests that the renderers write the rows of the tables as they are added and that the report only has a line for each table
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        rendered = io.StringIO()
+        streamed = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), workers = 2, renderer = gedcom_parser.JSONLinesRenderer(rendered))
+        self.assertEqual(obj.check_results, streamed.check_results)
+        lines = [json.loads(line) for line in rendered.getvalue().splitlines()]
+        self.assertEqual([row[0] for row in obj.individuals_ptable.rows], [line["row"]["ID"] for line in lines if line["section"] == "individuals_ptable"])
+        self.assertEqual([[str(value) for value in row] for row in obj.upcomingBirthdaysTable.rows], [list(line["row"].values()) for line in lines if line["section"] == "upcomingBirthdaysTable"])
+        self.assertIn("(48 rows in the individuals_ptable section)", streamed.output.getvalue())
+        self.assertFalse(hasattr(streamed.individuals_ptable, "rows"))
+        paged = io.StringIO()
+        limited = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), checks = [], renderer = gedcom_parser.PagedTextRenderer(paged, limit = 5, page_length = 2))
+        self.assertEqual(["individuals_ptable page 1", "individuals_ptable page 2", "individuals_ptable page 3", "family_ptable page 1", "family_ptable page 2", "family_ptable page 3"], [line for line in paged.getvalue().splitlines() if " page " in line])
+        self.assertIn("(8 rows in the family_ptable section, the first 5 written)", limited.output.getvalue())
+        echoed = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()) as printed:
+            gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), checks = [], renderer = gedcom_parser.CSVRenderer(echoed, echo = True))
+        self.assertLessEqual(set(echoed.getvalue().splitlines()), set(printed.getvalue().splitlines())) #Every row was also printed
+        self.assertEqual(["individuals_ptable", "ID,Name,Gender,Birthday,Age,Alive,Death,Child,Spouse"], echoed.getvalue().splitlines()[:2])
+
+    def test_LazyGEDCOM(self): # tests that the lazy reader only parses the records that are looked up and finds the same records as analyze_GEDCOM
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        with tempfile.TemporaryDirectory() as directory:
+            sidecar = os.path.join(directory, "TargaryenFamily15Siblings.ged.idx")
+            lazy = gedcom_parser.LazyGEDCOM("TargaryenFamily15Siblings.ged", gedcom_parser.ReportWriter(io.StringIO()), sidecar)
+            self.assertEqual(obj.individuals["I6"].name, lazy.individuals["I6"].name)
+            self.assertEqual(obj.family["F2"].children, lazy.family["F2"].children)
+            self.assertEqual(2, len(lazy.parsed))
+            self.assertTrue(os.path.exists(sidecar))
+            self.assertEqual(lazy.record_index.offsets, gedcom_parser.RecordIndex("TargaryenFamily15Siblings.ged", sidecar).load().offsets)
+            self.assertEqual(["TargaryenFamily15Siblings.ged.idx"], os.listdir(directory)) #The temporary file of the sidecar was moved into place
+            self.assertEqual(list(obj.individuals), list(lazy.individuals))
+            self.assertEqual(obj.getNonUniqueIDsList(), lazy.getNonUniqueIDsList())
+            self.assertEqual(obj.illegitimateDatesErrorList, lazy.illegitimateDatesErrorList)
+            lazy.close()
+
+    def test_Kinship(self): # tests the relationships found in the graph of parents, including parents that are "NA"
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        self.assertEqual((0, 1), obj.kinship.relationship("I2", "I24"))
+        self.assertEqual((1, 1), obj.kinship.relationship("I24", "I25"))
+        self.assertEqual((1, 2), obj.kinship.relationship("I35", "I40"))
+        self.assertTrue(obj.kinship.related("I40", "I35", 2, 2))
+        self.assertFalse(obj.kinship.related("I24", "I25", 3, 3))
+        self.assertIsNone(obj.kinship.relationship("NA", "I24"))
+        individuals = {"I1": gedcom_parser.Individual(famc = "F1"), "I2": gedcom_parser.Individual(famc = "F1"), "I3": gedcom_parser.Individual()}
+        family = {"F1": gedcom_parser.Family()}
+        family["F1"].husband = "I3"
+        kinship = gedcom_parser.Kinship(individuals, family)
+        self.assertEqual((1, 1), kinship.relationship("I1", "I2"))
+        self.assertEqual((0, 1), kinship.relationship("I3", "I1"))
+
+    def test_generate_GEDCOM(self): # tests that the synthetic files of the benchmark are the same for a seed and have the errors that were injected
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = os.path.join(directory, "first.ged"), os.path.join(directory, "second.ged")
+            injected = benchmark.generate_GEDCOM(first, 300, 7, {"US22": 0.01, "US42": 0.01})
+            benchmark.generate_GEDCOM(second, 300, 7, {"US22": 0.01, "US42": 0.01})
+            with open(first) as f, open(second) as g:
+                self.assertEqual(f.read(), g.read())
+            self.assertEqual({"US22": 3, "US42": 3}, injected)
+            obj = benchmark.empty_reader(first)
+            obj.analyze_GEDCOM()
+            self.assertEqual(3, len(obj.getNonUniqueIDsList()))
+            self.assertEqual(3, len(obj.illegitimateDatesErrorList))
+            self.assertRaises(ValueError, benchmark.generate_GEDCOM, first, 300, 7, {"US27": 0.01})
+
+    def test_run_phases(self): # tests that the benchmark finds as many errors for each user story as a run of Read_GEDCOM
+        for path in ("TargaryenFamily15Siblings.ged", "US14_25T.ged"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                obj = gedcom_parser.Read_GEDCOM(path, True, False, gedcom_parser.ReportWriter(io.StringIO()))
+            errors = benchmark.run_phases(path)["errors"]
+            self.assertEqual({check.story: len(obj.check_results[check.method]) if isinstance(obj.check_results[check.method], list) else obj.check_results[check.method] for check in gedcom_parser.CHECKS}, errors)
+            self.assertEqual(len(obj.check_results["list_living_single"]), errors["US31"])
+        self.assertEqual(2, benchmark.run_phases("TargaryenFamily15Siblings.ged")["errors"]["US18"])
+
+    def test_Profiler(self): # tests that a profiled run measures every phase and check without changing what the checks find
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        profiled = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()), profile = gedcom_parser.Profiler(count_records = True))
+        self.assertIsNone(obj.profiler)
+        self.assertEqual(obj.check_results, profiled.check_results)
+        checks = {entry.name: entry for entry in profiled.profiler.entries if entry.kind == "check"}
+        self.assertEqual([check.method for check in gedcom_parser.CHECKS], list(checks))
+        self.assertEqual(2, checks["auntsAndUncles"].errors)
+        self.assertEqual(4, checks["auntsAndUncles"].IDs)
+        self.assertEqual(2, checks["noSiblingMarriage"].errors) #US18 writes WARNING lines
+        self.assertEqual(2, checks["noSiblingMarriage"].IDs)
+        self.assertIsInstance(checks["noSiblingMarriage"].net_blocks, int)
+        self.assertGreater(checks["auntsAndUncles"].records, 0)
+        self.assertEqual(56, profiled.profiler.entries[0].records)
+        with tempfile.TemporaryDirectory() as directory:
+            profiled.profiler.save_trace(os.path.join(directory, "trace.json"))
+            with open(os.path.join(directory, "trace.json")) as f:
+                events = json.load(f)["traceEvents"]
+        self.assertEqual(len(profiled.profiler.entries), len(events))
+        self.assertEqual("X", events[0]["ph"])
+
+    def test_Pipeline(self): # tests that only the selected checks run and that what only the other checks need is not built
+        full = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        ingest = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), checks = ["US42", "us22"])
+        self.assertEqual(["printIllegitimateDateErrors", "printNonUniqueIDsErrors"], list(ingest.check_results))
+        self.assertEqual(set(), ingest.pipeline.needs)
+        self.assertNotIn("index", vars(ingest))
+        self.assertNotIn("kinship", vars(ingest))
+        self.assertEqual([], ingest.user_story_errors)
+        self.assertEqual(full.listMultipleBirths(), ingest.listMultipleBirths()) #An unselected check still works when it is called
+        relationships = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), checks = gedcom_parser.Pipeline(["US20", "US03"]))
+        self.assertEqual({"auntsAndUncles": full.check_results["auntsAndUncles"]}, relationships.check_results)
+        self.assertIn("kinship", vars(relationships))
+        self.assertEqual([error for error in full.user_story_errors if "US03" in error], relationships.user_story_errors)
+        self.assertEqual([check for check in gedcom_parser.CHECKS if "list" in check.tags], gedcom_parser.Pipeline("list").checks)
+        self.assertRaises(ValueError, gedcom_parser.Pipeline, ["US99"])
+
+    def test_validate_files(self): # tests that the batch validation reports every file on its own line and that a slow file only times out itself
+        with tempfile.TemporaryDirectory() as directory:
+            benchmark.generate_GEDCOM(os.path.join(directory, "large.ged"), 5000)
+            with open(os.path.join(directory, "notes.txt"), "w") as fp:
+                fp.write("not a GEDCOM file")
+            self.assertEqual([os.path.join(directory, "large.ged"), "SkywalkerFamilyErrors.ged", "missing.ged"], list(batch.find_paths([directory, "-"], io.StringIO("SkywalkerFamilyErrors.ged\n\nmissing.ged\n"))))
+            self.assertEqual("timeout", batch.validate_file(os.path.join(directory, "large.ged"), timeout = 0.01)["status"])
+            result = batch.validate_file("TargaryenFamily15Siblings.ged", ["US29"], tables = directory, table_rows = 2)
+            with open(result["tables"]) as f:
+                sections = collections.Counter(json.loads(line)["section"] for line in f)
+            self.assertEqual({"individuals_ptable": 2, "family_ptable": 2, "deceased_table": 2}, sections)
+            self.assertEqual(os.path.join(directory, "TargaryenFamily15Siblings-"), result["tables"][:-len("0123456789.jsonl")])
+            self.assertRaises(ValueError, list, batch.validate_files(["TargaryenFamily15Siblings.ged"], table_format = "xml"))
+        results = list(batch.validate_files(["SkywalkerFamilyErrors.ged", "missing.ged", "TargaryenFamily15Siblings.ged"], ["US18", "US20", "US22", "US31"], workers = 2, ordered = True))
+        self.assertEqual(["ok", "error", "ok"], [result["status"] for result in results])
+        with contextlib.redirect_stdout(io.StringIO()):
+            reader = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        self.assertEqual({"US18": reader.check_results["noSiblingMarriage"], "US20": reader.check_results["auntsAndUncles"], "US22": None, "US31": reader.check_results["list_living_single"]}, results[2]["results"])
+        self.assertEqual(2, len(results[2]["results"]["US18"]))
+        self.assertEqual(len(reader.individuals), results[2]["individuals"])
+        self.assertIn("FileNotFoundError", results[1]["error"])
+        json.dumps(results, default = batch.json_value)
+
+    def test_ValidationServer(self): # tests that the server answers from the cache after the first request and measures the latency of each route
+        async def get(port, target):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            head, body = response.split(b"\r\n\r\n", 1)
+            return int(head.split()[1]), body.decode()
+
+        async def run():
+            validator = server.ValidationServer(".")
+            listener = await validator.start(port = 0)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                first = await get(port, "/validate?path=TargaryenFamily15Siblings.ged&checks=US20,US22")
+                second = await get(port, "/validate?path=TargaryenFamily15Siblings.ged&checks=US18,US20,US31")
+                report = await get(port, "/report?path=TargaryenFamily15Siblings.ged&checks=US29")
+                missing = await get(port, "/validate?path=missing.ged")
+                outside = await get(port, "/validate?path=../TargaryenFamily15Siblings.ged")
+                unknown = await get(port, "/validate?path=TargaryenFamily15Siblings.ged&checks=US99")
+                metrics = await get(port, "/metrics")
+            finally:
+                listener.close()
+                validator.close()
+            return first, second, report, missing, outside, unknown, json.loads(metrics[1])
+
+        first, second, report, missing, outside, unknown, metrics = asyncio.run(run())
+        with contextlib.redirect_stdout(io.StringIO()):
+            reader = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, False, gedcom_parser.ReportWriter(io.StringIO()))
+        self.assertEqual(200, first[0])
+        self.assertEqual({"US20": reader.check_results["auntsAndUncles"], "US22": None}, json.loads(first[1])["results"])
+        self.assertEqual({"US18": reader.check_results["noSiblingMarriage"], "US20": reader.check_results["auntsAndUncles"], "US31": reader.check_results["list_living_single"]}, json.loads(second[1])["results"])
+        self.assertIn("LIST: US29", report[1])
+        self.assertEqual([404, 403, 400], [missing[0], outside[0], unknown[0]])
+        self.assertEqual({"trees": 1, "hits": 2, "misses": 1}, {name: metrics["cache"][name] for name in ("trees", "hits", "misses")})
+        self.assertEqual(5, metrics["routes"]["/validate"]["requests"])
+        self.assertEqual(3, metrics["routes"]["/validate"]["errors"])
+
+    def test_lazy_tables(self): # tests that the pretty tables are only made when a check lists something and that a core run does not import prettytable or dateutil
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), checks = gedcom_parser.CORE_CHECKS)
+        self.assertEqual([], [name for name in vars(obj) if name in gedcom_parser.Read_GEDCOM.TABLE_FIELDS])
+        self.assertEqual(["ID", "Name", "Birthday"], obj.recentBirthsTable.field_names)
+        self.assertIs(obj.recentBirthsTable, obj.recentBirthsTable)
+        self.assertRaises(AttributeError, getattr, obj, "missingTable")
+        code = "import io, sys, gedcom_parser; gedcom_parser.Read_GEDCOM('TargaryenFamily15Siblings.ged', False, False, gedcom_parser.ReportWriter(io.StringIO()), checks = gedcom_parser.CORE_CHECKS); print(sorted(name for name in ('prettytable', 'dateutil', 'multiprocessing') if name in sys.modules))"
+        self.assertEqual("[]", subprocess.run([sys.executable, "-c", code], capture_output = True, text = True, check = True).stdout.strip())
+        for date in (datetime.date(2020, 1, 31), datetime.date(2019, 5, 31), datetime.date(2020, 2, 29), datetime.date(2021, 12, 15)):
+            for months in (-1, 1, 9, -13):
+                self.assertEqual(date + relativedelta(months = months), gedcom_parser.add_months(date, months))
+        self.assertRaises(TypeError, gedcom_parser.add_months, "ILLEGITIMATE", 9)
+
+    def test_StreamingGEDCOM(self): # tests that validating while reading finds what a full run finds and that only the IDs are kept when nothing else needs the records
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", True, True, gedcom_parser.ReportWriter(io.StringIO()), columnar = True)
+        output = gedcom_parser.ReportWriter(io.StringIO())
+        stream = gedcom_parser.StreamingGEDCOM("TargaryenFamily15Siblings.ged", output)
+        self.assertEqual({method: sorted(IDs) for method, IDs in full.check_results.items() if IDs is not None}, {method: sorted(IDs) for method, IDs in stream.check_results.items() if IDs is not None})
+        self.assertEqual(sorted(full.user_story_errors), sorted(stream.user_story_errors))
+        report = output.getvalue()
+        self.assertLess(report.index("ERROR: US42: Individual I43"), report.index("ERROR: FAMILY: F3 US21")) #The errors of the local checks are written in the order of the file instead of the order of the registry
+        local = gedcom_parser.StreamingGEDCOM("TargaryenFamily15Siblings.ged", gedcom_parser.ReportWriter(io.StringIO()), ["US01", "US03", "US22", "US42"], deferred = False)
+        self.assertEqual(["checkDatesAfterToday", "printIllegitimateDateErrors", "printNonUniqueIDsErrors"], list(local.check_results))
+        self.assertEqual(sorted(full.check_results["checkDatesAfterToday"]), sorted(local.check_results["checkDatesAfterToday"]))
+        self.assertEqual(0, len(local.individuals))
+        self.assertEqual(len(full.individuals), len(local.record_IDs["INDI"]))
+        self.assertEqual([error for error in full.user_story_errors if "US03" in error], local.user_story_errors)
+
+    def test_siblings_by_birth(self): # tests that the sorted sibling index orders the children with a legitimate birthday oldest first for US13, US14 and US28
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        siblings = obj.index.siblings_by_birth("F2")
+        self.assertEqual(sorted(siblings), siblings)
+        self.assertEqual(len(obj.family["F2"].children), len(siblings))
+        self.assertEqual([], obj.index.siblings_by_birth("F99"))
+        family, row = obj.childrenInOrderTable.rows[1]
+        self.assertEqual("F2", family)
+        self.assertEqual([child for birth, child in siblings], [child for child, age in row])
+
+    def test_families_with_same_spouses(self): # tests that the duplicate index groups the families with the same husband name, wife name and marriage date for US24
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        self.assertEqual(['F1', 'F7'], obj.index.families_with_same_spouses("F1"))
+        self.assertIs(obj.index.families_with_same_spouses("F1"), obj.index.families_with_same_spouses("F7"))
+        self.assertEqual(['F2'], obj.index.families_with_same_spouses("F2"))
+
+    def test_DuplicateFinder(self): # tests that individuals with similar names and close birthdays are clustered as probable duplicates
+        self.assertEqual(["S500", "S500", "R163", "T522", ""], [gedcom_parser.soundex(name) for name in ["Snow", "Snowe", "Rupert", "Tymczak", ""]])
+        individuals = {
+            "I1": gedcom_parser.Individual("Jon /Snow/", "M", datetime.date(283, 4, 25)),
+            "I2": gedcom_parser.Individual("Arya /Stark/", "F", datetime.date(289, 1, 1)),
+            "I3": gedcom_parser.Individual("John /Snow/", "M", datetime.date(283, 4, 26)),
+            "I4": gedcom_parser.Individual("Aria /Stark/", "F", datetime.date(289, 1, 2)),
+            "I5": gedcom_parser.Individual("Jon /Snow/", "M", datetime.date(284, 4, 25)),
+            "I6": gedcom_parser.Individual("Jon /Snow/", "F", datetime.date(283, 4, 25)),
+            "I7": gedcom_parser.Individual("Jon /Snow/", "M", "ILLEGITIMATE"),
+            "I8": gedcom_parser.Individual("NA", "M", datetime.date(300, 1, 1)), #No NAME line
+            "I9": gedcom_parser.Individual("NA", "M", datetime.date(300, 1, 2)),
+            "I10": gedcom_parser.Individual(" // ", "M", datetime.date(300, 1, 1)),
+        }
+        self.assertNotIn("", gedcom_parser.DuplicateFinder(individuals).blocks)
+        self.assertEqual(0.0, gedcom_parser.DuplicateFinder(individuals).score("I8", "I9"))
+        clusters = gedcom_parser.DuplicateFinder(individuals).clusters()
+        self.assertEqual([["I1", "I3"], ["I2", "I4"]], [IDs for score, IDs in clusters])
+        self.assertGreater(clusters[0][0], clusters[1][0])
+        self.assertEqual([], gedcom_parser.DuplicateFinder(individuals, threshold = 0.9).clusters())
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        self.assertEqual([(1.0, ['I1', 'I48']), (1.0, ['I17', 'I18'])], obj.listPossibleDuplicates())
+
+    def test_TreeQuery(self): # tests the indexed queries over a file that was already read
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()))
+        tree = query.TreeQuery(obj)
+        self.assertEqual(['I2', 'I3', 'I7', 'I8'], tree.ordered(tree.ancestors("I1")))
+        self.assertIn("I1", tree.descendants("I2"))
+        self.assertIs(tree.descendants("I2"), tree.descendants("I2"))
+        self.assertNotIn("I4", tree.descendants("I2") & tree.living())
+        self.assertEqual(['F2'], tree.ordered(tree.married_between(datetime.date(280, 1, 1), datetime.date(290, 12, 31))))
+        alive = tree.alive_on(datetime.date(283, 4, 25))
+        self.assertIn("I1", alive)
+        self.assertNotIn("I4", alive)
+        self.assertEqual(['I1', 'I48'], tree.ordered(tree.with_surname("SNOW")))
+        self.assertEqual(['I1', 'I48'], tree.ordered(tree.with_surname("Snowe", sounds_like = True)))
+        self.assertEqual(['I1', 'I48'], tree.ordered(tree.where(tree.with_surname("Snow") & alive, lambda individual: individual.sex == "M")))
+        self.assertEqual([], tree.ordered(tree.where(tree.with_surname("Snow") & alive, lambda individual: individual.sex == "F")))
+        intervals = query.IntervalTree([(1, 5, "a"), (3, 9, "b"), (7, 8, "c"), (10, 12, "d")])
+        self.assertCountEqual(["a", "b"], intervals.at(4))
+        self.assertCountEqual(["b", "c", "d"], intervals.overlapping(8, 10))
+
+    def test_AgeEngine(self): # tests that the ages and date checks follow the as-of date of a run
+        self.assertEqual(0, gedcom_parser.AgeEngine.years(datetime.date(2000, 2, 29), datetime.date(2001, 2, 28)))
+        self.assertEqual(1, gedcom_parser.AgeEngine.years(datetime.date(2000, 2, 29), datetime.date(2001, 3, 1)))
+        self.assertEqual(-1, gedcom_parser.AgeEngine.years(datetime.date(2000, 6, 1), datetime.date(2000, 1, 1)))
+        self.assertEqual("NA", gedcom_parser.AgeEngine.years("ILLEGITIMATE", datetime.date(2000, 1, 1)))
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), as_of = datetime.date(283, 5, 5))
+        self.assertEqual(datetime.date(283, 5, 5), obj.today)
+        self.assertEqual(0, obj.ages.age("I1"))
+        self.assertEqual(['I1', 'I48'], obj.check_results["recentBirths"])
+        self.assertNotIn("I1", obj.check_results["checkDatesAfterToday"])
+        self.assertIn("I2", obj.check_results["checkDatesAfterToday"])
+        self.assertEqual(tuple(individual.calculateAge2(obj.family["F1"].marriage) for individual in (obj.individuals[obj.family["F1"].husband], obj.individuals[obj.family["F1"].wife])), obj.ages.marriage_ages("F1"))
+        vectorized = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), vectorized = True, as_of = datetime.date(283, 5, 5))
+        self.assertEqual(obj.check_results["less_than_150_years_old"], vectorized.check_results["less_than_150_years_old"])
+        self.assertEqual(obj.check_results["checkDatesAfterToday"], vectorized.check_results["checkDatesAfterToday"])
+
+    def test_CalendarIndex(self): # tests that the windows of US35 to US39 cross the new year and keep February 29
+        individuals = {"I1": gedcom_parser.Individual("Leap /Day/", birth = datetime.date(2000, 2, 29)), "I2": gedcom_parser.Individual("New /Year/", birth = datetime.date(2001, 1, 3), death = datetime.date(2023, 12, 25)), "I3": gedcom_parser.Individual("No /Date/", birth = "ILLEGITIMATE")}
+        calendar = gedcom_parser.CalendarIndex(individuals, {})
+        self.assertEqual(["I1"], calendar.on_days(calendar.birthdays, datetime.date(2023, 2, 28), datetime.date(2023, 2, 28), individuals))
+        self.assertEqual([], calendar.on_days(calendar.birthdays, datetime.date(2024, 2, 28), datetime.date(2024, 2, 28), individuals))
+        self.assertEqual(["I2"], calendar.on_days(calendar.birthdays, datetime.date(2023, 12, 20), datetime.date(2024, 1, 19), individuals))
+        self.assertEqual(["I1", "I2"], calendar.on_days(calendar.birthdays, datetime.date(2023, 6, 1), datetime.date(2026, 6, 1), individuals))
+        self.assertEqual(["I2"], calendar.on_dates(calendar.deaths, datetime.date(2023, 12, 1), datetime.date(2024, 1, 1)))
+        obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged", False, False, gedcom_parser.ReportWriter(io.StringIO()), as_of = datetime.date(2021, 12, 15))
+        self.assertEqual(["I40"], obj.check_results["listUpcomingBirthdays"])
+
+    def test_parse_date(self): # tests the date conversion used for every DATE line
+        self.assertEqual(datetime.date(283, 4, 25), gedcom_parser.parse_date("25 APR 0283"))
+        self.assertEqual(datetime.date(2020, 3, 4), gedcom_parser.parse_date("04 Mar 2020"))
+        self.assertIsNone(gedcom_parser.parse_date("35 NOV 0290"))
+        self.assertIsNone(gedcom_parser.parse_date("29 FEB 2019"))
+        self.assertIsNone(gedcom_parser.parse_date("ABT 1900"))
+
     def test_firstCousinsShouldNotMarry(self): #Tests US19: First cousins should not marry
         obj = gedcom_parser.Read_GEDCOM("TargaryenFamily15Siblings.ged")
         self.assertCountEqual(['I40', 'I35'], obj.firstCousinsShouldNotMarry())
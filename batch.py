@@ -0,0 +1,158 @@
+'''This file validates many GEDCOM files at once. The paths come from directories, glob patterns, file names or a list on standard input, every file is read and checked by a warm worker of a process pool, and the result of each file is written as one JSON line as soon as it is done.
+Each file has a time limit and every worker has a memory limit, so one huge or broken upload only fails its own line instead of the whole batch.
+With --tables DIR the individual and family tables and the lists of the checks of each file are also written to a file of their own in DIR, as JSON lines, CSV or paged text, and the result has its path.
+Run "python batch.py uploads/ --workers 8 --timeout 30 --memory 512 > results.jsonl", "find uploads -name '*.ged' | python batch.py - --checks parse" or "python batch.py uploads/ --checks list --tables tables/ --format csv --table-rows 1000".'''
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import gedcom_parser
+from gedcom_parser import json_value #The results convert sets and dates the same way as the rows of a JSONLinesRenderer
+
+MESSAGE_PREFIXES = ("ERROR", "WARNING") #The lines of a report that are kept in the messages of a result
+EXTENSIONS = {"jsonl": ".jsonl", "csv": ".csv", "text": ".txt"} #The extension of the tables file of each format of gedcom_parser.RENDERERS
+
+class ValidationTimeout(Exception):
+    '''Raised in a worker when a file takes longer than the time limit'''
+
+def find_paths(sources, stdin = None):
+    '''Yields the paths of the GEDCOM files of each source. A directory yields every .ged file under it, a glob pattern yields the files that match it, "-" yields one path per line of standard input and anything else is yielded as it is.'''
+    for source in sources:
+        if source == "-":
+            for line in stdin if stdin is not None else sys.stdin:
+                if line.strip():
+                    yield line.strip()
+        elif os.path.isdir(source):
+            for directory, subdirectories, files in os.walk(source):
+                subdirectories.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".ged"):
+                        yield os.path.join(directory, name)
+        elif glob.has_magic(source):
+            yield from sorted(glob.glob(source, recursive = True))
+        else:
+            yield source
+
+def address_space():
+    '''Returns how many bytes of address space this process uses, or 0 where /proc is not available'''
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def raise_timeout(signum, frame):
+    raise ValidationTimeout()
+
+def init_worker(memory_limit = None):
+    '''Sets up a worker of the pool. memory_limit is how many more bytes of address space the worker may use than it used when it started, so a file that needs more raises a MemoryError in the worker instead of taking the memory of the whole machine.'''
+    signal.signal(signal.SIGINT, signal.SIG_IGN) #The parent stops the pool on Ctrl+C
+    if memory_limit is not None:
+        import resource #Only available on Unix, where the limit can be set
+        limit = address_space() + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+
+def tables_path(directory, path, table_format):
+    '''Returns the path in the directory that the tables of the GEDCOM file are written to. The name is the name of the file with a hash of its full path, so files with the same name in different directories do not write to the same tables.'''
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:10]
+    return os.path.join(directory, f"{name}-{digest}{EXTENSIONS[table_format]}")
+
+def validate_file(path, checks = None, timeout = None, tables = None, table_format = "jsonl", table_rows = None):
+    '''Reads the file, runs the selected checks on it and returns a dictionary that can be saved as JSON. status is "ok", "timeout" when it took more than timeout seconds, "memory" when it needed more than the memory limit of the worker or "error" when it could not be read or a check raised.
+    When tables is a directory, the individual and family tables and the lists of the checks are written to a file in it with the renderer of gedcom_parser.RENDERERS for table_format, at most table_rows rows of each table, and tables in the result is the path of the file.'''
+    result = {"path": path, "status": "ok", "pid": os.getpid()}
+    start = time.perf_counter()
+    report = gedcom_parser.ReportWriter(io.StringIO())
+    renderer = None
+    if tables is not None:
+        result["tables"] = tables_path(tables, path, table_format)
+        renderer = gedcom_parser.RENDERERS[table_format](result["tables"], table_rows)
+    timed = timeout and hasattr(signal, "setitimer") #The time limit needs SIGALRM, which Windows does not have
+    if timed:
+        handler = signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): #The checks print some of what they find, which would mix with the JSON lines of the parent
+            reader = gedcom_parser.Read_GEDCOM(path, renderer is not None, False, report, fast_tokenizer = True, checks = checks, renderer = renderer) #The individual and family tables are only made when they are written to the tables file
+        result["individuals"] = len(reader.individuals)
+        result["families"] = len(reader.family)
+        result["results"] = {check.story: reader.check_results[check.method] for check in reader.pipeline.checks}
+        result["messages"] = [line for line in report.getvalue().splitlines() if line.startswith(MESSAGE_PREFIXES)] + reader.user_story_errors
+    except ValidationTimeout:
+        result["status"] = "timeout"
+    except MemoryError:
+        result["status"] = "memory"
+    except Exception as error: #Covers files that cannot be opened as well as the checks that raise on some files
+        result["status"] = "error"
+        result["error"] = f"{type(error).__name__}: {error}"
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+def validate_task(task):
+    '''Runs validate_file in a worker with the arguments of one task'''
+    return validate_file(*task)
+
+def validate_files(paths, checks = None, workers = None, timeout = None, memory_limit = None, max_tasks = None, ordered = False, tables = None, table_format = "jsonl", table_rows = None):
+    '''Validates the files on a pool of worker processes and yields the result of each file when it is done, or in the order of paths when ordered is True. The workers are started once and read one file after another, and a worker is replaced after max_tasks files when it is given. checks is a Pipeline or a selection for one. tables, table_format and table_rows are passed on to validate_file.'''
+    if table_format not in gedcom_parser.RENDERERS:
+        raise ValueError(f"Can't write tables as {table_format}. The formats are {', '.join(gedcom_parser.RENDERERS)}")
+    pipeline = checks if isinstance(checks, gedcom_parser.Pipeline) else gedcom_parser.Pipeline(checks) #Unknown checks raise here instead of in every worker
+    workers = workers if workers is not None else os.cpu_count()
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else multiprocessing.get_context() #Forked workers start with gedcom_parser already imported
+    sys.stdout.flush()
+    pool = context.Pool(workers, init_worker, (memory_limit,), max_tasks)
+    try:
+        tasks = ((path, pipeline, timeout, tables, table_format, table_rows) for path in paths)
+        yield from (pool.imap if ordered else pool.imap_unordered)(validate_task, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
+
+def main(argv = None):
+    '''This validates the files from the command line and writes one JSON line for each file'''
+    parser = argparse.ArgumentParser(description = "Validates GEDCOM files on a pool of worker processes and writes the result of each file as a JSON line")
+    parser.add_argument("sources", nargs = "+", help = 'directories, glob patterns or files to validate, or "-" to read the paths from standard input')
+    parser.add_argument("--workers", type = int, default = os.cpu_count(), help = "how many files are validated at the same time")
+    parser.add_argument("--timeout", type = float, help = "the most seconds a file may take")
+    parser.add_argument("--memory", type = int, help = "the most megabytes a worker may use on top of what it used when it started")
+    parser.add_argument("--checks", nargs = "+", help = "the user stories or tags of the checks to run, every check by default")
+    parser.add_argument("--max-tasks", type = int, help = "how many files a worker reads before it is replaced")
+    parser.add_argument("--ordered", action = "store_true", help = "write the results in the order of the paths instead of when they are done")
+    parser.add_argument("--output", help = "the file the JSON lines are written to instead of standard output")
+    parser.add_argument("--tables", help = "the directory the tables and lists of each file are written to, which is made if it does not exist")
+    parser.add_argument("--format", choices = list(gedcom_parser.RENDERERS), default = "jsonl", help = "how the tables are written")
+    parser.add_argument("--table-rows", type = int, help = "the most rows of each table that are written, every row by default")
+    args = parser.parse_args(argv)
+    try:
+        checks = gedcom_parser.Pipeline(args.checks)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.tables:
+        os.makedirs(args.tables, exist_ok = True)
+    statuses = dict()
+    start = time.perf_counter()
+    with open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout) as fp:
+        for result in validate_files(find_paths(args.sources), checks, args.workers, args.timeout, args.memory << 20 if args.memory else None, args.max_tasks, args.ordered, args.tables, args.format, args.table_rows):
+            print(json.dumps(result, default = json_value), file = fp, flush = True)
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    seconds = time.perf_counter() - start
+    files = sum(statuses.values())
+    print(f"{files} files in {seconds:.2f}s ({files / seconds if seconds else 0:.1f} files/s): " + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())), file = sys.stderr)
+    return 1 if set(statuses) - {"ok"} else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
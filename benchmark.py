@@ -0,0 +1,511 @@
+'''This file benchmarks gedcom_parser on synthetic GEDCOM files. The files are made by a deterministic family tree generator that can inject errors for the user stories at a given rate.
+Reading the file, every check of the registry, the user stories and the pretty tables are timed separately at each size, the peak memory of a whole run is recorded and the results are saved as JSON so that the results of two commits can be compared.
+Run "python benchmark.py --sizes 1000 10000 --output results.json" and later "python benchmark.py --sizes 1000 10000 --compare results.json".'''
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import gedcom_parser
+
+MONTH_NAMES = {number: name for name, number in gedcom_parser.MONTHS.items()}
+GIVEN_NAMES = ["Aegon", "Aemma", "Alys", "Baelon", "Brienne", "Cersei", "Daeron", "Dany", "Edric", "Elia", "Gael", "Gwayne", "Helaena", "Jaehaerys", "Jocelyn", "Kyle", "Laena", "Lyanna", "Maekar", "Mya", "Naerys", "Orys", "Rhaena", "Rickon", "Saera", "Shiera", "Tyanna", "Viserys", "Visenya", "Walder"]
+SURNAMES = ["Arryn", "Baratheon", "Blackwood", "Bracken", "Dayne", "Florent", "Frey", "Greyjoy", "Hightower", "Lannister", "Martell", "Mormont", "Redwyne", "Stark", "Targaryen", "Tully", "Tyrell", "Velaryon"]
+FIRST_BIRTH = datetime.date(1800, 1, 1).toordinal()
+LAST_DATE = datetime.date(2015, 12, 31).toordinal() #No generated date is later than this, so a file is the same whatever day it is generated
+YEAR = 365
+
+class SyntheticIndividual:
+    '''One individual of a synthetic tree. The dates are ordinals and None when there is no date.'''
+    __slots__ = ("ID", "given", "surname", "sex", "birth", "death", "famc", "fams", "date_text")
+    def __init__(self, ID, given, surname, sex, birth):
+        self.ID = ID
+        self.given = given
+        self.surname = surname
+        self.sex = sex
+        self.birth = birth
+        self.death = None
+        self.famc = None
+        self.fams = []
+        self.date_text = None #Replaces the text of the birth date for US42
+
+class SyntheticFamily:
+    '''One family of a synthetic tree'''
+    __slots__ = ("ID", "husband", "wife", "marriage", "divorce", "children")
+    def __init__(self, ID, husband, wife, marriage):
+        self.ID = ID
+        self.husband = husband
+        self.wife = wife
+        self.marriage = marriage
+        self.divorce = None
+        self.children = []
+
+class SyntheticTree:
+    '''This class generates a family tree with about the given number of individuals. Each generation is married off in couples that have between 1 and 4 children born at least a year apart, and people marry into the tree from outside so that it keeps growing. Everything comes from the seed so the same arguments always make the same tree.'''
+    def __init__(self, size, seed = 0):
+        self.rng = random.Random(seed)
+        self.individuals = []
+        self.families = []
+        self.duplicates = [] #Copies of records written again with the same ID for US22
+        generation = [self.add_individual(self.rng.choice(SURNAMES), self.rng.choice("MF"), FIRST_BIRTH + self.rng.randrange(20 * YEAR)) for _ in range(max(2, size // 6))]
+        while len(self.individuals) < size:
+            generation = self.next_generation(generation, size)
+            if not generation:
+                break
+        for individual in self.individuals:
+            if individual.birth + 60 * YEAR < LAST_DATE and self.rng.random() < 0.7:
+                individual.death = min(individual.birth + self.rng.randrange(60 * YEAR, 95 * YEAR), LAST_DATE)
+
+    def add_individual(self, surname, sex, birth, given = None):
+        individual = SyntheticIndividual(f"I{len(self.individuals) + 1}", given if given is not None else self.rng.choice(GIVEN_NAMES), surname, sex, birth)
+        self.individuals.append(individual)
+        return individual
+
+    def add_family(self, husband, wife, marriage):
+        family = SyntheticFamily(f"F{len(self.families) + 1}", husband, wife, marriage)
+        self.families.append(family)
+        husband.fams.append(family)
+        wife.fams.append(family)
+        return family
+
+    def add_child(self, family, birth, given = None):
+        child = self.add_individual(family.husband.surname, self.rng.choice("MF"), birth, given)
+        child.famc = family
+        family.children.append(child)
+        return child
+
+    def next_generation(self, generation, size):
+        '''Marries the individuals of one generation and returns their children'''
+        children = []
+        self.rng.shuffle(generation)
+        for individual in generation:
+            if len(self.individuals) >= size:
+                break
+            if individual.fams or self.rng.random() < 0.1:
+                continue
+            spouse = self.add_individual(self.rng.choice(SURNAMES), "F" if individual.sex == "M" else "M", individual.birth + self.rng.randrange(-5 * YEAR, 5 * YEAR)) #Marries in from outside the tree
+            husband, wife = (individual, spouse) if individual.sex == "M" else (spouse, individual)
+            marriage = max(husband.birth, wife.birth) + self.rng.randrange(18 * YEAR, 30 * YEAR)
+            if marriage > LAST_DATE - 20 * YEAR:
+                continue
+            family = self.add_family(husband, wife, marriage)
+            if self.rng.random() < 0.1:
+                family.divorce = marriage + self.rng.randrange(2 * YEAR, 15 * YEAR)
+            birth = marriage
+            names = self.rng.sample(GIVEN_NAMES, 4)
+            for given in names[:self.rng.randint(1, 4)]:
+                birth += self.rng.randrange(YEAR, 4 * YEAR)
+                children.append(self.add_child(family, birth, given))
+        return children
+
+    def write(self, path):
+        '''Writes the tree as a GEDCOM file'''
+        with open(path, "w") as fp:
+            fp.write("0 HEAD\n1 SOUR benchmark\n")
+            for individual in self.individuals + self.duplicates:
+                fp.write(f"0 @{individual.ID}@ INDI\n1 NAME {individual.given} /{individual.surname}/\n1 SEX {individual.sex}\n")
+                if individual.birth is not None:
+                    fp.write(f"1 BIRT\n2 DATE {individual.date_text if individual.date_text is not None else date_text(individual.birth)}\n")
+                if individual.death is not None:
+                    fp.write(f"1 DEAT Y\n2 DATE {date_text(individual.death)}\n")
+                if individual.famc is not None:
+                    fp.write(f"1 FAMC @{individual.famc.ID}@\n")
+                for family in individual.fams:
+                    fp.write(f"1 FAMS @{family.ID}@\n")
+            for family in self.families:
+                fp.write(f"0 @{family.ID}@ FAM\n1 HUSB @{family.husband.ID}@\n1 WIFE @{family.wife.ID}@\n")
+                for child in family.children:
+                    fp.write(f"1 CHIL @{child.ID}@\n")
+                fp.write(f"1 MARR\n2 DATE {date_text(family.marriage)}\n")
+                if family.divorce is not None:
+                    fp.write(f"1 DIV\n2 DATE {date_text(family.divorce)}\n")
+            fp.write("0 TRLR\n")
+
+def date_text(ordinal):
+    '''Returns the GEDCOM text of the date with the ordinal'''
+    date = datetime.date.fromordinal(ordinal)
+    if date.month == 2 and date.day == 29: #upcomingAnniversaries can not move February 29 to a year that is not a leap year
+        date = date.replace(day = 28)
+    return f"{date.day} {MONTH_NAMES[date.month]} {date.year}"
+
+def pick(items, rng, condition = None):
+    '''Returns a random item of the list that meets the condition or None if a few tries do not find one'''
+    for _ in range(20):
+        if not items:
+            return None
+        item = rng.choice(items)
+        if condition is None or condition(item):
+            return item
+    return None
+
+def married(tree, rng):
+    return pick(tree.families, rng)
+
+def with_children(tree, rng):
+    return pick(tree.families, rng, lambda family: family.children)
+
+def inject_US01(tree, rng): #Date after today
+    individual = pick(tree.individuals, rng)
+    if individual is None:
+        return False
+    individual.birth = datetime.date(2200, 1, 1).toordinal() + rng.randrange(YEAR)
+    return True
+
+def inject_US02(tree, rng): #Birth after marriage
+    family = married(tree, rng)
+    if family is None:
+        return False
+    family.wife.birth = family.marriage + rng.randrange(1, YEAR)
+    return True
+
+def inject_US03(tree, rng): #Death before birth
+    individual = pick(tree.individuals, rng)
+    if individual is None:
+        return False
+    individual.death = individual.birth - rng.randrange(1, 10 * YEAR)
+    return True
+
+def inject_US04(tree, rng): #Divorce before marriage
+    family = married(tree, rng)
+    if family is None:
+        return False
+    family.divorce = family.marriage - rng.randrange(1, YEAR)
+    return True
+
+def inject_US05(tree, rng): #Marriage after death
+    family = married(tree, rng)
+    if family is None:
+        return False
+    family.husband.death = family.marriage - rng.randrange(1, YEAR)
+    return True
+
+def inject_US06(tree, rng): #Divorce after death
+    family = pick(tree.families, rng, lambda family: family.wife.death is not None)
+    if family is None:
+        return False
+    family.divorce = family.wife.death + rng.randrange(1, YEAR)
+    return True
+
+def inject_US07(tree, rng): #Older than 150
+    individual = pick(tree.individuals, rng, lambda individual: individual.death is not None)
+    if individual is None:
+        return False
+    individual.death = individual.birth + 155 * YEAR
+    return True
+
+def inject_US08(tree, rng): #Born before the marriage of the parents
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    family.children[0].birth = family.marriage - rng.randrange(YEAR, 2 * YEAR)
+    return True
+
+def inject_US09(tree, rng): #Born after the death of the mother
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    family.wife.death = family.children[-1].birth - rng.randrange(1, YEAR)
+    return True
+
+def inject_US10(tree, rng): #Married before 14
+    family = married(tree, rng)
+    if family is None:
+        return False
+    family.wife.birth = family.marriage - 10 * YEAR
+    return True
+
+def inject_US11(tree, rng): #Bigamy
+    family = pick(tree.families, rng, lambda family: family.divorce is None)
+    if family is None:
+        return False
+    other = tree.add_individual(rng.choice(SURNAMES), "F", family.wife.birth)
+    tree.add_family(family.husband, other, family.marriage + YEAR)
+    return True
+
+def inject_US12(tree, rng): #Mother too old
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    family.wife.birth = family.children[0].birth - 65 * YEAR
+    return True
+
+def inject_US13(tree, rng): #Siblings born 2 days to 8 months apart
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    tree.add_child(family, family.children[0].birth + rng.randrange(30, 200))
+    return True
+
+def inject_US14(tree, rng): #More than 5 siblings born at the same time
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    for given in GIVEN_NAMES[:6]:
+        tree.add_child(family, family.children[0].birth, given)
+    return True
+
+def inject_US15(tree, rng): #15 or more siblings
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    birth = family.children[-1].birth
+    while len(family.children) < 15:
+        birth += YEAR
+        tree.add_child(family, birth)
+    return True
+
+def inject_US16(tree, rng): #Male last names
+    individual = pick(tree.individuals, rng, lambda individual: individual.famc is not None and individual.sex == "M")
+    if individual is None:
+        return False
+    individual.surname = individual.surname + "son"
+    return True
+
+def inject_US17(tree, rng): #Married to a child
+    family = pick(tree.families, rng, lambda family: any(child.sex == "F" for child in family.children))
+    if family is None:
+        return False
+    daughter = next(child for child in family.children if child.sex == "F")
+    tree.add_family(family.husband, daughter, daughter.birth + 20 * YEAR)
+    return True
+
+def inject_US18(tree, rng): #Siblings married
+    family = pick(tree.families, rng, lambda family: {child.sex for child in family.children} == {"M", "F"})
+    if family is None:
+        return False
+    brother = next(child for child in family.children if child.sex == "M")
+    sister = next(child for child in family.children if child.sex == "F")
+    tree.add_family(brother, sister, max(brother.birth, sister.birth) + 20 * YEAR)
+    return True
+
+def grandchildren(family, sex):
+    '''Returns a list with the children of each child of the family that have the sex'''
+    return [[grandchild for spouse_family in child.fams for grandchild in spouse_family.children if grandchild.sex == sex] for child in family.children]
+
+def inject_US19(tree, rng): #First cousins married
+    for _ in range(20):
+        family = with_children(tree, rng)
+        if family is None:
+            return False
+        males, females = grandchildren(family, "M"), grandchildren(family, "F")
+        for first in range(len(family.children)):
+            for second in range(len(family.children)):
+                if first != second and males[first] and females[second]:
+                    tree.add_family(males[first][0], females[second][0], max(males[first][0].birth, females[second][0].birth) + 20 * YEAR)
+                    return True
+    return False
+
+def inject_US20(tree, rng): #Uncle married to a niece
+    for _ in range(20):
+        family = with_children(tree, rng)
+        if family is None:
+            return False
+        females = grandchildren(family, "F")
+        for uncle in family.children:
+            nieces = [niece for sibling, group in zip(family.children, females) if sibling is not uncle for niece in group]
+            if uncle.sex == "M" and nieces:
+                tree.add_family(uncle, nieces[0], nieces[0].birth + 20 * YEAR)
+                return True
+    return False
+
+def inject_US21(tree, rng): #Wrong gender for role
+    family = married(tree, rng)
+    if family is None:
+        return False
+    family.husband.sex = "F"
+    return True
+
+def inject_US22(tree, rng): #IDs that are not unique
+    individual = pick(tree.individuals, rng)
+    if individual is None:
+        return False
+    duplicate = SyntheticIndividual(individual.ID, rng.choice(GIVEN_NAMES), rng.choice(SURNAMES), rng.choice("MF"), individual.birth)
+    tree.duplicates.append(duplicate)
+    return True
+
+def inject_US23(tree, rng): #Same name and birth date
+    individual = pick(tree.individuals, rng)
+    if individual is None:
+        return False
+    tree.add_individual(individual.surname, individual.sex, individual.birth, individual.given)
+    return True
+
+def inject_US24(tree, rng): #Families with the same spouses and marriage date
+    family = married(tree, rng)
+    if family is None:
+        return False
+    tree.add_family(family.husband, family.wife, family.marriage)
+    return True
+
+def inject_US25(tree, rng): #Same first name and birth date in a family
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    tree.add_child(family, family.children[0].birth, family.children[0].given)
+    return True
+
+def inject_US26(tree, rng): #Entries that do not correspond
+    family = with_children(tree, rng)
+    if family is None:
+        return False
+    family.children[0].famc = None
+    return True
+
+def inject_US42(tree, rng): #Illegitimate date
+    individual = pick(tree.individuals, rng)
+    if individual is None:
+        return False
+    individual.date_text = f"31 FEB {datetime.date.fromordinal(individual.birth).year}"
+    return True
+
+INJECTORS = {name[len("inject_"):]: function for name, function in sorted(globals().items()) if name.startswith("inject_US")} #The key is the user story. The stories that only list individuals or families have no errors to inject
+
+def generate_GEDCOM(path, size, seed = 0, error_rates = None):
+    '''Writes a synthetic GEDCOM file with about size individuals to the path. error_rates has a user story as the key and the number of errors to inject per individual as the value. Returns a dictionary with the number of errors injected for each user story.'''
+    error_rates = error_rates if error_rates is not None else dict()
+    unknown = sorted(set(error_rates) - set(INJECTORS))
+    if unknown:
+        raise ValueError(f"Can't inject errors for {', '.join(unknown)}. The user stories with errors are {', '.join(INJECTORS)}")
+    tree = SyntheticTree(size, seed)
+    injected = dict()
+    for story in sorted(error_rates): #Every story has its own random numbers so changing the rate of one story does not move the errors of another
+        rng = random.Random(f"{seed}-{story}")
+        count = round(error_rates[story] * size)
+        injected[story] = sum(1 for _ in range(count) if tree.families and INJECTORS[story](tree, rng))
+    tree.write(path)
+    return injected
+
+def timed(function, *args):
+    '''Returns how many seconds the function took and what it returned, or the name of the exception it raised'''
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as error:
+        result = type(error).__name__
+    return time.perf_counter() - start, result
+
+def empty_reader(path):
+    '''Returns a Read_GEDCOM that has not read the file yet, so that reading the file can be timed on its own'''
+    reader = gedcom_parser.Read_GEDCOM.__new__(gedcom_parser.Read_GEDCOM)
+    reader.path = path
+    reader.output = gedcom_parser.ReportWriter(io.StringIO())
+    reader.family, reader.individuals, reader.error_list = dict(), dict(), []
+    reader.illegitimateDatesList, reader.illegitimateDatesErrorList, reader.nonUniqueIDsList, reader.nonUniqueIDsErrors = [], [], [], []
+    reader.columns = reader.date_columns = None
+    return reader
+
+def run_phases(path, results = None):
+    '''Reads the file and makes the tables, runs every check and the user stories in the same order as Read_GEDCOM, but one at a time so that a check that raises does not stop the others. The seconds each one took and what each check found are added to results when it is given.'''
+    results = results if results is not None else {"phases": dict(), "checks": dict(), "errors": dict()}
+    with contextlib.redirect_stdout(io.StringIO()):
+        reader = empty_reader(path)
+        results["phases"]["analyze_GEDCOM"], _ = timed(reader.analyze_GEDCOM)
+        results["phases"]["GEDCOM_Index"], reader.index = timed(gedcom_parser.GEDCOM_Index, reader.individuals, reader.family)
+        results["phases"]["Kinship"], reader.kinship = timed(gedcom_parser.Kinship, reader.individuals, reader.family)
+        reader.replace_empty_families() #Like Read_GEDCOM, every check sees "NA" for no spouse family
+        results["phases"]["create_indi_ptable"], _ = timed(reader.create_indi_ptable)
+        results["phases"]["create_fam_ptable"], _ = timed(reader.create_fam_ptable)
+        for check in gedcom_parser.CHECKS:
+            seconds, result = timed(check.run, reader)
+            results["checks"][f"{check.story} {check.method}"] = seconds
+            results["errors"][check.story] = len(result) if isinstance(result, list) else result #The number of IDs it returned or the exception it raised
+        results["phases"]["UserStories"], _ = timed(gedcom_parser.UserStories, reader.family, reader.individuals, reader.error_list, False, reader.output)
+    return results
+
+def benchmark_file(path, repeat = 3):
+    '''Times reading the file, the pretty tables, every check and the user stories and measures the peak memory of running them all. Each time is the fastest of repeat runs. Returns the results as a dictionary.'''
+    results = run_phases(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["phases"]["analyze_GEDCOM_fast"], _ = timed(empty_reader(path).analyze_GEDCOM_fast)
+    for _ in range(repeat - 1):
+        again = run_phases(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            again["phases"]["analyze_GEDCOM_fast"], _ = timed(empty_reader(path).analyze_GEDCOM_fast)
+        for kind in ("phases", "checks"):
+            for name, seconds in again[kind].items():
+                results[kind][name] = min(results[kind][name], seconds)
+    tracemalloc.start() #The memory is measured in a run of its own because tracing makes everything slower
+    try:
+        run_phases(path)
+        results["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return results
+
+def run_benchmarks(sizes, seed = 0, error_rates = None, repeat = 3, directory = None):
+    '''Generates a file for each size with the errors of error_rates injected, benchmarks it and returns the results of every size with details about the machine and the commit'''
+    results = {"commit": git_commit(), "python": platform.python_version(), "machine": platform.machine(), "date": datetime.datetime.now().isoformat(timespec = "seconds"), "seed": seed, "error_rates": error_rates, "repeat": repeat, "sizes": []}
+    with tempfile.TemporaryDirectory(dir = directory) as temporary:
+        for size in sizes:
+            path = os.path.join(temporary, f"synthetic{size}.ged")
+            injected = generate_GEDCOM(path, size, seed, error_rates)
+            result = benchmark_file(path, repeat)
+            result.update({"individuals": size, "bytes": os.path.getsize(path), "injected": injected})
+            results["sizes"].append(result)
+            print(f"{size} individuals: read in {result['phases']['analyze_GEDCOM']:.3f}s, checks in {sum(result['checks'].values()):.3f}s, peak memory {result['peak_memory'] / 1e6:.1f} MB", file = sys.stderr)
+    return results
+
+def git_commit():
+    '''Returns the commit that is checked out or None when it is not a git repository'''
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True, cwd = os.path.dirname(os.path.abspath(__file__)), check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_results(old, new, threshold = 1.2):
+    '''Returns a line for every time or peak memory of the new results that is more than threshold times the same one in the old results, for the sizes that both have'''
+    regressions = []
+    old_sizes = {result["individuals"]: result for result in old["sizes"]}
+    for result in new["sizes"]:
+        before = old_sizes.get(result["individuals"])
+        if before is None:
+            continue
+        measurements = [(f"{kind} {name}", result[kind][name], before[kind].get(name)) for kind in ("phases", "checks") for name in result[kind]]
+        measurements.append(("peak_memory", result["peak_memory"], before["peak_memory"]))
+        for name, now, then in measurements:
+            if then and now > then * threshold and now - then > 0.001: #Differences of less than a millisecond are noise
+                regressions.append(f"{result['individuals']} individuals: {name} went from {then:.4g} to {now:.4g} ({now / then:.2f}x)")
+    return regressions
+
+def main(argv = None):
+    '''This runs the benchmarks from the command line'''
+    parser = argparse.ArgumentParser(description = "Benchmarks gedcom_parser on synthetic GEDCOM files")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10000], help = "the numbers of individuals of the generated files")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--error-rate", type = float, default = 0.001, help = "the number of errors injected per individual for each user story")
+    parser.add_argument("--stories", nargs = "+", default = list(INJECTORS), help = "the user stories to inject errors for")
+    parser.add_argument("--repeat", type = int, default = 3, help = "how many times each file is timed, keeping the fastest time")
+    parser.add_argument("--output", help = "the JSON file the results are saved to")
+    parser.add_argument("--compare", help = "a JSON file saved by an earlier run to compare the results with")
+    parser.add_argument("--threshold", type = float, default = 1.2, help = "how many times slower or larger a result has to be to count as a regression")
+    parser.add_argument("--generate", help = "only write a file with the first size to this path")
+    args = parser.parse_args(argv)
+    error_rates = {story: args.error_rate for story in args.stories} if args.error_rate else None
+    if args.generate:
+        print(json.dumps(generate_GEDCOM(args.generate, args.sizes[0], args.seed, error_rates)))
+        return 0
+    results = run_benchmarks(args.sizes, args.seed, error_rates, args.repeat)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent = 1)
+    else:
+        print(json.dumps(results, indent = 1))
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare_results(json.load(fp), results, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file = sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,87 +3,305 @@ It can be assumed that the number of individuals in any file is always less than
 After reading all of the data, the program will print the unique identifiers and names of each of the individuals in order by their unique identifiers in a pretty table. 
 Then, for each family, print the unique identifiers and names of the husbands and wives, in order by unique family identifiers.'''
 
-from prettytable import PrettyTable
 from collections import defaultdict
 import datetime
-from dateutil.relativedelta import *
 import sys
+import functools
+import io
+import os
+import contextlib
+import array
+import bisect
+import itertools
+import collections.abc
+import hashlib
+import pickle
+import mmap
+import re
+import time
+import json
+import tempfile
+import calendar as calendar_module #Named so it is not mixed up with the calendar of a Read_GEDCOM
+
+MONTHS = {"JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6, "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12}
+DATE_PREFIXES = [(b"\n1 BIRT", "BIRT"), (b"\n1 DEAT", "DEAT"), (b"\n1 MARR", "MARR"), (b"\n1 DIV", "DIV")] #The lines that come right before the DATE lines that are stored
+SKIPPED_RECORDS = {b"HEAD", b"TRLR", b"NOTE"}
+SNAPSHOT_VERSION = 4 #Snapshots saved with another version are ignored. Change it whenever the parsing or a check changes
+PARSER_VERSION = 1 #Part of the key of every model in a ModelCache. Change it whenever the parsing changes
+MODEL_CACHE_SIZE = 64 << 20 #The most bytes of models a ModelCache keeps by default
+RECORD_INDEX_VERSION = 1 #Sidecar files saved with another version are scanned again
+DATABASE_VERSION = 2 #Kept in the user_version of a SQLiteStore database. Databases made with another version are made again
+RECORD_HEADER = re.compile(rb"(?<![^\r\n])[ \t\f\v]*0 ([^ \r\n]*) (INDI|FAM)[ \t\f\v]*(?![^\r\n])") #A level 0 INDI or FAM line, matched the same way analyze_tokens splits the stripped line
+NO_ID = -1 #Stored in the ID columns of a ColumnarStore for "NA"
+NO_DATE = 0 #Stored in the date columns of a ColumnarStore for a missing date
+ILLEGITIMATE_DATE = -1 #Stored in the date columns of a ColumnarStore for an illegitimate date
+NO_AGE = -(1 << 31) #Stored in the ages column of a ColumnarStore for "NA"
+
+@functools.lru_cache(maxsize = 1 << 16)
+def parse_date(arguments):
+    '''Converts the text of a GEDCOM DATE line such as "25 APR 0283" into a datetime.date. Returns None if the text is not a legitimate date. The usual "D MON YYYY" form is converted with the month table and anything else falls back to strptime. Results are cached because the same dates appear many times in a file.'''
+    parts = arguments.split(" ")
+    if len(parts) == 3 and len(parts[0]) <= 2 and len(parts[2]) == 4 and (parts[0] + parts[2]).isascii() and (parts[0] + parts[2]).isdigit():
+        month = MONTHS.get(parts[1].upper())
+        if month is not None:
+            try:
+                return datetime.date(int(parts[2]), month, int(parts[0]))
+            except ValueError:
+                return None
+    try:
+        return datetime.datetime.strptime(arguments, "%d %b %Y").date()
+    except ValueError:
+        return None
+
+def add_months(date, months):
+    '''Returns the date a number of months after the date the same way adding relativedelta(months = months) does, using the last day of the month when the day does not exist in it'''
+    if not isinstance(date, datetime.date): #Adding months to "ILLEGITIMATE" raises like adding a relativedelta to it did
+        raise TypeError(f"unsupported operand type(s) for +: {type(date).__name__!r} and 'months'")
+    year, month = divmod(date.year * 12 + date.month - 1 + months, 12)
+    month += 1
+    last_day = 31 if month == 12 else (datetime.date(year, month + 1, 1) - datetime.timedelta(days = 1)).day
+    return date.replace(year = year, month = month, day = min(date.day, last_day))
+
+def make_table(field_names):
+    '''Returns an empty pretty table with the field names. prettytable is only imported when the first table is made, so a run that does not list anything does not load it.'''
+    from prettytable import PrettyTable
+    return PrettyTable(field_names = field_names)
+
+def save_pickle(path, value):
+    '''Pickles the value to a temporary file of its own in the directory of path and then replaces path with it, so a file that is being written is never loaded and processes that save the same path at the same time do not write into one file'''
+    descriptor, temporary = tempfile.mkstemp(suffix = ".tmp", dir = os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(descriptor, "wb") as fp:
+            pickle.dump(value, fp, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporary)
+        raise
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(["AEIOUY", "BFPV", "CGJKQSXZ", "DT", "L", "MN", "R"]) for letter in letters} #H and W are left out because they do not separate letters with the same code
+
+def soundex(name):
+    '''Returns the American Soundex code of a name, such as "S500" for "Snow" and "Snowe", so names that sound alike get the same code. Anything that is not a letter is ignored and a name without letters returns "".'''
+    letters = [letter for letter in name.upper() if "A" <= letter <= "Z"]
+    if not letters:
+        return ""
+    code, last = letters[0], SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter)
+        if digit is None:
+            continue
+        if digit != last and digit != "0":
+            code += digit
+        last = digit
+    return (code + "000")[:4]
+
+def split_name(name):
+    '''Splits a GEDCOM name such as "Jon /Snow/" into its given name and surname. A name without a surname between slashes has "" as its surname.'''
+    parts = name.split("/")
+    return (parts[0].strip(), parts[1].strip()) if len(parts) > 1 else (name.strip(), "")
 
 class Read_GEDCOM:
     '''This class will read and analyze the GEDCOM file so that it can sort the data into the Individual and Family classes.'''
-    def __init__(self, path, ptables = True, print_all_errors = True):
+    profiler = None #The Profiler that measures the phases and checks of a profiled run
+    as_of = None #The date that the date checks treat as today, or None for the day they run
+    database = None #The SQLiteStore that the cross-record checks run on as SQL
+    renderer = None #The TableRenderer that the rows of the tables are written to as they are added, or None for pretty tables
+    #The field names of the pretty tables that the tables and lists of the checks are added to. A table is only made the first time it is used
+    TABLE_FIELDS = {
+        "family_ptable": ["ID", "Married", "Divorced", "Husband ID", "Husband Name", "Wife ID", "Wife Name", "Children"],
+        "individuals_ptable": ["ID", "Name", "Gender", "Birthday", "Age", "Alive", "Death", "Child", "Spouse"],
+        "recentDeathTable": ["ID", "Name", "Death"],
+        "recentSurvivorTable": ["Dead Relative ID", "Dead Relative Name", "Survivor ID", "Survivor Name", "Relation"],
+        "childrenInOrderTable": ["Family ID", "Children"],
+        "upcomingAnniversariesTable": ["Family ID", "Marriage Date", "Husband", "Wife"],
+        "orphansTable": ["Child ID", "Child Name", "Family ID"],
+        "recentBirthsTable": ["ID", "Name", "Birthday"],
+        "deceased_table": ["ID", "Name", "Death Day"],
+        "upcomingBirthdaysTable": ["ID", "Name", "Birthday"],
+        "living_married_table": ["Family ID", "Husband ID", "Husband Name", "Wife ID", "Wife Name"],
+        "living_single_table": ["ID", "Name"],
+    }
+
+    def __init__(self, path, ptables = True, print_all_errors = True, output = None, fast_tokenizer = False, columnar = False, workers = 1, vectorized = False, snapshot = None, cache = None, profile = None, checks = None, as_of = None, database = None, renderer = None):
         self.path = path
+        self.as_of = as_of
+        self.pipeline = checks if isinstance(checks, Pipeline) else Pipeline(checks) #Only the selected checks are run and only what they need is built
+        if profile: #True makes a Profiler with the default options
+            self.profiler = profile if isinstance(profile, Profiler) else Profiler()
+        self.output = output if output is not None else ReportWriter("SprintOutput.txt", "w" if ptables else "a") #Every check writes its errors and lists to this one report instead of opening the output file itself
+        self.output.open()
+        if renderer is not None:
+            self.renderer = renderer
+            renderer.open()
         self.family = dict() #The key is the FamID and the value is the instance for the Family class object for that specific FamID
         self.individuals = dict() #The key is the IndiID and the value is the instance for the Individual class object for that specific IndiID
         self.error_list = [] #This is a list of errors that will be evaluated for testing purposes
-        self.family_ptable = PrettyTable(field_names = ["ID", "Married", "Divorced", "Husband ID", "Husband Name", "Wife ID", "Wife Name", "Children"])
-        self.individuals_ptable = PrettyTable(field_names = ["ID", "Name", "Gender", "Birthday", "Age", "Alive", "Death", "Child", "Spouse"])
-        self.recentDeathTable = PrettyTable(field_names=["ID", "Name", "Death"])  # create a ptable for recent deaths
-        self.recentSurvivorTable = PrettyTable(field_names=["Dead Relative ID", "Dead Relative Name", "Survivor ID", "Survivor Name", "Relation"])
-        self.childrenInOrderTable = PrettyTable(field_names=["ID", "Children"])
-        self.upcomingAnniversariesTable = PrettyTable(field_names=["Family ID", "Marriage Date", "Husband", "Wife"])
-        self.orphansTable = PrettyTable(field_names=["Child ID", "Child Name", "Family ID"])
-        self.recentBirthsTable = PrettyTable(field_names=["ID", "Name", "Birthday"])
-        self.deceased_table = PrettyTable(field_names=["ID", "Name", "Death Day"])
-        self.childrenInOrderTable = PrettyTable(field_names=["Family ID", "Children"])
-        self.upcomingBirthdaysTable = PrettyTable(field_names=["ID", "Name", "Birthday"])
-        self.living_married_table = PrettyTable(field_names=["Family ID", "Husband ID", "Husband Name", "Wife ID", "Wife Name"])
-        self.living_single_table = PrettyTable(field_names=["ID", "Name"])
         self.illegitimateDatesList = []
         self.illegitimateDatesErrorList = []
         self.nonUniqueIDsList = []
         self.nonUniqueIDsErrors = []
-        self.analyze_GEDCOM()
-        if ptables: #Makes pretty tables for the data
-            self.create_indi_ptable()
-            self.create_fam_ptable()
-        self.fewerThan15Siblings()
-        self.checkDatesAfterToday()
-        self.checkBirthAfterMarriage()
-        self.noMarriagesToChildren()
-        self.listMultipleBirths()
-        self.listRecentSurvivors()
-        self.marriageAfter14()
-        self.birthsLessThanFive()
-        self.uniqueFirstNameInFamily()
-        self.orderSiblingsByAge()
-        self.correspondingEntries()
-        self.correctGenderForRole()
-        self.maleLastNames()
-        self.siblingSpacing()
-        self.uniqueFamiliesBySpouses()
-        self.listLargeAgeDifferences()
-        self.firstCousinsShouldNotMarry()
-        self.auntsAndUncles()
-        self.printIllegitimateDateErrors()
-        self.parentsNotTooOld()
-        self.upcomingAnniversaries()
-        self.recentBirths()
-        self.birthBeforeDeathOfParents()
-        self.list_deceased()
-        self.list_living_married()
-        self.list_living_single()
-        self.less_than_150_years_old()
-        self.listUpcomingBirthdays()
-        self.listOrphans()
-        self.birthBeforeMarriageOfParents()
-        self.printNonUniqueIDsErrors()
-        self.uniqueNameAndBirthDate()
-        self.noBigamy()
-        self.noSiblingMarriage()
-        self.user_story_errors = UserStories(self.family, self.individuals, self.error_list, print_all_errors).add_errors #Checks for errors in user stories
+        try:
+            previous_outcomes = None
+            changed = frozenset()
+            with self.measure("analyze_GEDCOM_blocks" if snapshot is not None else "analyze_GEDCOM_cached" if cache is not None else "analyze_GEDCOM_database" if database is not None else "analyze_GEDCOM_fast" if fast_tokenizer else "analyze_GEDCOM") as phase:
+                if snapshot is not None: #Incremental run that only analyzes the records that changed since the snapshot and only runs the checks that read what changed
+                    previous = self.load_snapshot(snapshot, ptables)
+                    blocks, changed = self.analyze_GEDCOM_blocks(previous)
+                    model = pickle.dumps((self.individuals, self.family), protocol = pickle.HIGHEST_PROTOCOL) #Saved before the empty sets of spouse families are replaced with "NA"
+                    previous_outcomes = previous["outcomes"] if previous is not None and blocks is not None else dict()
+                elif cache is not None: #Loads the parsed records from the cache when the file did not change since it was last read
+                    self.analyze_GEDCOM_cached(ModelCache(cache) if isinstance(cache, (str, os.PathLike)) else cache, fast_tokenizer)
+                elif database is not None: #Loads the records from the database when it holds this version of the file and writes them to it otherwise
+                    self.analyze_GEDCOM_database(database if isinstance(database, SQLiteStore) else SQLiteStore(database), fast_tokenizer)
+                elif fast_tokenizer: #Reads the file as bytes which is much faster for large files
+                    self.analyze_GEDCOM_fast()
+                else:
+                    self.analyze_GEDCOM()
+            if phase is not None:
+                phase.records = len(self.individuals) + len(self.family)
+            self.columns = None
+            if columnar: #Moves the parsed records into columns and uses views of them from here on, which takes much less memory for large files
+                with self.measure("ColumnarStore"):
+                    self.columns = ColumnarStore(self.individuals, self.family)
+                self.individuals = self.columns.individuals
+                self.family = self.columns.family
+            needs = self.pipeline.needs
+            if self.database is not None: #The checks that run as SQL use the indexes of the database instead of the GEDCOM_Index and Kinship
+                needs = frozenset().union(*(check.needs for check in self.pipeline.checks + self.pipeline.user_stories if check.method not in SQLiteStore.CHECKS))
+            if "index" in needs: #Otherwise the index is only built if an unselected check is called later
+                with self.measure("GEDCOM_Index"):
+                    self.index = GEDCOM_Index(self.individuals, self.family)
+            if "kinship" in needs:
+                with self.measure("Kinship"):
+                    self.kinship = Kinship(self.individuals, self.family)
+            if not isinstance(self.individuals, SQLiteRecords): #The records of a database already hold "NA", and going through them here would read every one
+                self.replace_empty_families() #Every run holds "NA" for no spouse family, which the checks test for, whether or not it makes the tables
+            if ptables: #Makes pretty tables for the data
+                with self.measure("create_indi_ptable"):
+                    self.create_indi_ptable()
+                with self.measure("create_fam_ptable"):
+                    self.create_fam_ptable()
+            self.date_columns = None
+            if vectorized and "dates" in self.pipeline.needs:
+                with self.measure("DateColumns"):
+                    self.date_columns = DateColumns(self.columns if self.columns is not None else ColumnarStore(self.individuals, self.family)) #NumPy columns of the dates for the vectorized date rules
+            executor = CheckExecutor(self, workers)
+            self.check_results = executor.run(self.pipeline.checks, previous_outcomes, changed) #Runs the selected checks, on a pool of forked worker processes when workers is more than 1
+            self.user_story_errors = self.error_list
+            if self.pipeline.user_stories:
+                with self.measure("UserStories"):
+                    self.user_story_errors = UserStories(self.family, self.individuals, self.error_list, print_all_errors, self.output, self.date_columns, self.pipeline.user_stories).add_errors #Checks for errors in user stories
+            if snapshot is not None and blocks is not None:
+                with self.measure("save_snapshot"):
+                    self.save_snapshot(snapshot, ptables, blocks, model, executor.outcomes)
+        finally:
+            self.output.close() #Writes everything that is still buffered to the output file
+            if self.renderer is not None:
+                self.renderer.close()
+            if self.profiler is not None:
+                self.profiler.close()
+
+    def measure(self, name, kind = "phase"):
+        '''Returns a context manager that measures the phase with the profiler of a profiled run and does nothing otherwise'''
+        return self.profiler.measure(name, kind) if self.profiler is not None else contextlib.nullcontext()
+
+    @functools.cached_property
+    def index(self):
+        '''Groups the parsed records once so that the cross-record checks do not have to compare every pair of individuals'''
+        return GEDCOM_Index(self.individuals, self.family)
+
+    @functools.cached_property
+    def kinship(self):
+        '''The graph of parents that US19 and US20 use to find how a husband and wife are related'''
+        return Kinship(self.individuals, self.family)
+
+    @functools.cached_property
+    def calendar(self):
+        '''Files the dates of the records by day once for the lists of recent and upcoming events'''
+        return CalendarIndex(self.individuals, self.family)
+
+    @property
+    def today(self):
+        '''The date the date checks compare with, which is as_of when the run is for another date'''
+        return self.as_of if self.as_of is not None else datetime.date.today()
+
+    @functools.cached_property
+    def ages(self):
+        '''The ages on the date of today that the date checks use, each worked out once'''
+        return AgeEngine(self.individuals, self.family, self.today)
+
+    def __getattr__(self, name):
+        '''Makes a table of TABLE_FIELDS the first time it is used'''
+        if name not in self.TABLE_FIELDS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        table = self.make_table(name)
+        setattr(self, name, table)
+        return table
+
+    def make_table(self, name):
+        '''Returns an empty table of TABLE_FIELDS, which is a StreamingTable when the run has a renderer and a pretty table otherwise'''
+        if self.renderer is not None:
+            return StreamingTable(self.renderer, name, self.TABLE_FIELDS[name])
+        return make_table(self.TABLE_FIELDS[name])
+
+    def create_tables(self):
+        '''Makes every table that the tables and lists of the checks are added to now, replacing the tables that were already made'''
+        for name in self.TABLE_FIELDS:
+            setattr(self, name, self.make_table(name))
 
-    
     def analyze_GEDCOM(self):
         '''The purpose of this function is to read the GEDCOM file line by line and evaluate if a new instance of Family or Individual needs to be made. Each line is further evaluated using the parse_info function that is defined below.'''
-        ind, fam, date_identifier_line, indiv_or_fam = "", "", [], "NA" #The lines are analyzed to see if they are for an individuals information or the family's information. Each line is marked accordingly and analyzed appropriately
-        for tokens in self.file_reading_gen(self.path, sep = " "): #Goes line by line in the GEDCOM file and analyzes the tokens of each line
+        self.analyze_tokens(self.file_reading_gen(self.path, sep = " ")) #Goes line by line in the GEDCOM file and analyzes the tokens of each line
+
+    def analyze_GEDCOM_cached(self, cache, fast_tokenizer = False):
+        '''Loads the individuals, families and the illegitimate and non unique ID errors of the file from the ModelCache. If the file is not in the cache it is analyzed and then saved to the cache.'''
+        key = cache.key(self.path)
+        model = cache.load(key)
+        if model is not None:
+            individuals, families, self.illegitimateDatesList, self.illegitimateDatesErrorList, self.nonUniqueIDsList, self.nonUniqueIDsErrors = model
+            for ID, *values in individuals:
+                individual = self.individuals[ID] = Individual.__new__(Individual)
+                for field, value in zip(Individual.__slots__, values):
+                    setattr(individual, field, value)
+            for ID, *values in families:
+                family = self.family[ID] = Family.__new__(Family)
+                for field, value in zip(Family.__slots__, values):
+                    setattr(family, field, value)
+            return
+        if fast_tokenizer:
+            self.analyze_GEDCOM_fast()
+        else:
+            self.analyze_GEDCOM()
+        individuals = [(ID, *(getattr(individual, field) for field in Individual.__slots__)) for ID, individual in self.individuals.items()] #Plain tuples are much smaller and faster to load than pickled instances
+        families = [(ID, *(getattr(family, field) for field in Family.__slots__)) for ID, family in self.family.items()]
+        cache.save(key, (individuals, families, self.illegitimateDatesList, self.illegitimateDatesErrorList, self.nonUniqueIDsList, self.nonUniqueIDsErrors))
+
+    def analyze_GEDCOM_database(self, database, fast_tokenizer = False):
+        '''Loads the illegitimate and non unique ID errors of the file from the SQLiteStore and reads the individuals and families from it when they are looked up. If the database holds another file or another version of the file, the file is analyzed and written to the database, and the run uses the records it parsed.'''
+        self.database = database
+        key = database.key(self.path)
+        parsed = database.parsed(key)
+        if parsed is not None: #The records stay in the database and are read when they are looked up
+            self.individuals, self.family = database.records()
+            self.illegitimateDatesList, self.illegitimateDatesErrorList, self.nonUniqueIDsList, self.nonUniqueIDsErrors = parsed
+            return
+        if fast_tokenizer:
+            self.analyze_GEDCOM_fast()
+        else:
+            self.analyze_GEDCOM()
+        database.load(key, self.individuals, self.family, (self.illegitimateDatesList, self.illegitimateDatesErrorList, self.nonUniqueIDsList, self.nonUniqueIDsErrors))
+
+    def analyze_tokens(self, lines, state = ("", "", [], "NA")):
+        '''Analyzes the tokens of each line for analyze_GEDCOM. The state is the current IndiID, FamID, previous line and whether the lines are for an individual or a family. It is returned so that more lines can be analyzed later from where these lines stopped.'''
+        ind, fam, date_identifier_line, indiv_or_fam = state #The lines are analyzed to see if they are for an individuals information or the family's information. Each line is marked accordingly and analyzed appropriately
+        for tokens in lines:
 
             if len(tokens) >= 2 and tokens[0] == '0' and tokens[1] in ["HEAD", "TRLR", "NOTE"]: #Skips the line if it is HEAD TRLR or NOTE because it does not need to be evaluated
                 continue
             elif len(tokens) == 3 and tokens[0] == '0' and tokens[2] == "INDI":
                 indiv_or_fam = "individual" #Marks the line as individual so that the parse_info function can identify it accordingly
-                ind = tokens[1].replace("@", "") #The GEDCOM file has unnecessary @ symbols and this will get rid of them
+                ind = sys.intern(tokens[1].replace("@", "")) #The GEDCOM file has unnecessary @ symbols and this will get rid of them. The IDs are interned so that every reference to the same ID shares one string
                 if self.checkUniqueID(ind, indiv_or_fam) ==  True: #Makes sure the ind ID is unique
                     self.individuals[ind] = Individual() #The instance of the Individual class object is created for this specific IndiID
                 else:
@@ -91,7 +309,7 @@ class Read_GEDCOM:
                 continue
             elif len(tokens) == 3 and tokens[0] == '0' and tokens[2] == "FAM":
                 indiv_or_fam = "family" #Marks the line as family so that the parse_info function can identify it accordingly
-                fam = tokens[1].replace("@", "")
+                fam = sys.intern(tokens[1].replace("@", ""))
                 if self.checkUniqueID(fam, indiv_or_fam) == True: #Makes sure the fam ID is unique
                     self.family[fam] = Family() #The instance of the Family class object is created for this specific FamID
                 else:
@@ -101,6 +319,7 @@ class Read_GEDCOM:
                 self.parse_info(tokens, date_identifier_line, ind, fam, indiv_or_fam)
 
             date_identifier_line = tokens #Each previous line will be saved to be used by the parse_info function to identify what kind of DATE the line is. Each DATE line in the GEDCOM file is preceded by a tag that identifies what kind of date it is
+        return ind, fam, date_identifier_line, indiv_or_fam
     
     def parse_info(self, tokens, date_identifier_line, ind, fam, indiv_or_fam):
         '''This will parse the information from each line that is sent from the analyze_GEDCOM function. The information will be stored in the appropriate place in the appropriate class.'''
@@ -109,7 +328,7 @@ class Read_GEDCOM:
         else:
             level, tag, arguments = tokens
             if level == "1" and tag in ["NAME", "SEX", "FAMC", "FAMS", "HUSB", "WIFE", "CHIL"]: #Makes sure that only valid lines are read in the GEDCOM file that correspond specifically for level 1 information with the indicated tags
-                arguments = arguments.replace("@", "")
+                arguments = sys.intern(arguments.replace("@", ""))
                 if indiv_or_fam == "individual": #If the line was marked to correspond to an individual, then the line will be parsed and evaluated for the IndiID's name, sex, children, and the spouses will be added to a set to maintain uniqueness
                     if tag == "NAME":
                         self.individuals[ind].name = arguments
@@ -127,42 +346,135 @@ class Read_GEDCOM:
                     elif tag == "CHIL":
                         self.family[fam].children.add(arguments)
             elif level == "2" and tag == "DATE" and date_identifier_line[1] in ["BIRT", "DEAT", "MARR", "DIV"]: #Makes sure that only valid lines are read in the GEDCOM file that correspond to level 2 information with the specific tag DATE. The date_identifier line should also be one of the indicated tags
-                date_identifier_level, date_identifier_tag = date_identifier_line[0], date_identifier_line[1] #As previously mentioned, the date_identifier line will be divided into its level and tag to evaluate what the specific date corresponds to
-                try:
-                    arguments = datetime.datetime.strptime(arguments, "%d %b %Y").date() 
-                except ValueError:
-                    self.illegitimateDatesList.append(arguments)
-                    illegitimateDate = arguments
-                    arguments = "ILLEGITIMATE"
-                if date_identifier_level == "1" and date_identifier_tag in ["BIRT", "DEAT", "MARR", "DIV"]:
-                    if indiv_or_fam == "individual": #Parses birthday and death day information for an individual
-                        if date_identifier_tag == "BIRT":
-                            if arguments == "ILLEGITIMATE":
-                                error = f"ERROR: US42: Individual {ind} had an illegitimate birth date of {illegitimateDate}"
-                                self.illegitimateDatesErrorList.append(error)
-                            self.individuals[ind].birth = arguments
-                        elif date_identifier_tag == "DEAT":
-                            if arguments == "ILLEGITIMATE":
-                                error = f"ERROR: US42: Individual {ind} had an illegitimate death date of {illegitimateDate}"
-                                self.illegitimateDatesErrorList.append(error)
-                            self.individuals[ind].death = arguments
-                    elif indiv_or_fam == "family": #Parses marriage date and divorce date information for a family
-                        if date_identifier_tag == "MARR":
-                            if arguments == "ILLEGITIMATE":
-                                error = f"ERROR: US42: Family {fam} had an illegitimate marriage date of {illegitimateDate}"
-                                self.illegitimateDatesErrorList.append(error)
-                            self.family[fam].marriage = arguments
-                        elif date_identifier_tag == "DIV":
-                            if arguments == "ILLEGITIMATE":
-                                error = f"ERROR: US42: Family {fam} had an illegitimate divorce date of {illegitimateDate}"
-                                self.illegitimateDatesErrorList.append(error)
-                            self.family[fam].divorce = arguments
+                self.store_date(date_identifier_line[0], date_identifier_line[1], arguments, ind, fam, indiv_or_fam) #As previously mentioned, the date_identifier line is divided into its level and tag to evaluate what the specific date corresponds to
+
+    def store_date(self, date_identifier_level, date_identifier_tag, arguments, ind, fam, indiv_or_fam):
+        '''Converts the text of a DATE line and stores it as the birth, death, marriage or divorce date that the line before it identified. Dates that can not be converted are stored as "ILLEGITIMATE" and recorded for US42.'''
+        illegitimateDate = arguments
+        arguments = parse_date(arguments)
+        if arguments is None:
+            self.illegitimateDatesList.append(illegitimateDate)
+            arguments = "ILLEGITIMATE"
+        if date_identifier_level == "1" and date_identifier_tag in ["BIRT", "DEAT", "MARR", "DIV"]:
+            if indiv_or_fam == "individual": #Parses birthday and death day information for an individual
+                if date_identifier_tag == "BIRT":
+                    if arguments == "ILLEGITIMATE":
+                        error = f"ERROR: US42: Individual {ind} had an illegitimate birth date of {illegitimateDate}"
+                        self.illegitimateDatesErrorList.append(error)
+                    self.individuals[ind].birth = arguments
+                elif date_identifier_tag == "DEAT":
+                    if arguments == "ILLEGITIMATE":
+                        error = f"ERROR: US42: Individual {ind} had an illegitimate death date of {illegitimateDate}"
+                        self.illegitimateDatesErrorList.append(error)
+                    self.individuals[ind].death = arguments
+            elif indiv_or_fam == "family": #Parses marriage date and divorce date information for a family
+                if date_identifier_tag == "MARR":
+                    if arguments == "ILLEGITIMATE":
+                        error = f"ERROR: US42: Family {fam} had an illegitimate marriage date of {illegitimateDate}"
+                        self.illegitimateDatesErrorList.append(error)
+                    self.family[fam].marriage = arguments
+                elif date_identifier_tag == "DIV":
+                    if arguments == "ILLEGITIMATE":
+                        error = f"ERROR: US42: Family {fam} had an illegitimate divorce date of {illegitimateDate}"
+                        self.illegitimateDatesErrorList.append(error)
+                    self.family[fam].divorce = arguments
+
+    def analyze_GEDCOM_fast(self):
+        '''This does the same thing as analyze_GEDCOM but it works on large binary chunks of the file instead of line by line. Each chunk is split into its records and the stored tags are found with find and rfind, so the lines that are not stored are never decoded or split. Chunks with indented lines or old Mac line endings are analyzed line by line instead.'''
+        state = ("", "", [], "NA")
+        for chunk in self.record_chunk_gen(self.path):
+            if b"\r" in chunk:
+                chunk = chunk.replace(b"\r\n", b"\n")
+            if not chunk.startswith(b"0 ") or b"\r" in chunk or b"\n " in chunk or b"\n\t" in chunk:
+                state = self.analyze_tokens((line.strip().split(" ", 2) for line in io.StringIO(chunk.decode(), newline = None)), state)
+                continue
+            ind, fam, _, indiv_or_fam = state
+            for record in chunk[2:].split(b"\n0 "):
+                header_end = record.find(b"\n")
+                if header_end == -1:
+                    header_end = len(record)
+                xref, _, kind = record[:header_end].rstrip().partition(b" ")
+                if kind == b"INDI" and xref not in SKIPPED_RECORDS:
+                    indiv_or_fam = "individual"
+                    ind = sys.intern(xref.decode().replace("@", ""))
+                    if self.checkUniqueID(ind, indiv_or_fam) == True:
+                        self.individuals[ind] = Individual()
+                    else:
+                        indiv_or_fam = "NA"
+                elif kind == b"FAM" and xref not in SKIPPED_RECORDS:
+                    indiv_or_fam = "family"
+                    fam = sys.intern(xref.decode().replace("@", ""))
+                    if self.checkUniqueID(fam, indiv_or_fam) == True:
+                        self.family[fam] = Family()
+                    else:
+                        indiv_or_fam = "NA"
+                if indiv_or_fam == "individual": #The lines of a record that is not an INDI or FAM record still belong to the last INDI or FAM record like they do in analyze_GEDCOM
+                    individual = self.individuals[ind]
+                    individual.name = self.last_value(record, b"\n1 NAME ", header_end, individual.name)
+                    individual.sex = self.last_value(record, b"\n1 SEX ", header_end, individual.sex)
+                    individual.famc = self.last_value(record, b"\n1 FAMC ", header_end, individual.famc)
+                    individual.fams.update(self.all_values(record, b"\n1 FAMS ", header_end))
+                elif indiv_or_fam == "family":
+                    family = self.family[fam]
+                    family.husband = self.last_value(record, b"\n1 HUSB ", header_end, family.husband)
+                    family.wife = self.last_value(record, b"\n1 WIFE ", header_end, family.wife)
+                    family.children.update(self.all_values(record, b"\n1 CHIL ", header_end))
+                else:
+                    continue
+                for date_identifier_tag, arguments in self.date_values(record, header_end):
+                    self.store_date("1", date_identifier_tag, arguments, ind, fam, indiv_or_fam)
+            state = (ind, fam, [], indiv_or_fam)
+
+    def date_values(self, record, start):
+        '''Returns the tag and the text of every DATE line in the record that comes right after a level 1 BIRT, DEAT, MARR or DIV line, in the order they appear in the record'''
+        dates = []
+        for prefix, date_identifier_tag in DATE_PREFIXES:
+            pos = record.find(prefix, start)
+            while pos != -1:
+                end = record.find(b"\n", pos + 1)
+                rest = record[pos + len(prefix):end]
+                if end != -1 and (rest.startswith(b" ") or not rest.strip()) and record.startswith(b"2 DATE ", end + 1):
+                    date_end = record.find(b"\n", end + 1)
+                    arguments = record[end + 8:date_end if date_end != -1 else len(record)].decode().rstrip()
+                    if arguments:
+                        dates.append((pos, date_identifier_tag, arguments))
+                pos = record.find(prefix, pos + 1)
+        if len(dates) > 1:
+            dates.sort()
+        return [(date_identifier_tag, arguments) for pos, date_identifier_tag, arguments in dates]
+
+    def all_values(self, record, prefix, start):
+        '''Returns the values of every line in the record that starts with the prefix, for the tags such as FAMS and CHIL that can appear more than once'''
+        values = []
+        pos = record.find(prefix, start)
+        while pos != -1:
+            end = record.find(b"\n", pos + 1)
+            value = record[pos + len(prefix):end if end != -1 else len(record)].decode().rstrip().replace("@", "")
+            if value:
+                values.append(sys.intern(value))
+            pos = record.find(prefix, pos + 1)
+        return values
+
+    def last_value(self, record, prefix, start, default):
+        '''Returns the value of the last line in the record that starts with the prefix, for the tags such as NAME and HUSB where a later line replaces an earlier one'''
+        pos = record.rfind(prefix, start)
+        while pos != -1:
+            end = record.find(b"\n", pos + 1)
+            value = record[pos + len(prefix):end if end != -1 else len(record)].decode().rstrip().replace("@", "")
+            if value:
+                return sys.intern(value)
+            pos = record.rfind(prefix, start, pos)
+        return default
 
     #Function for US01's unittest: Returns a list of id's (ind or fam) that
     #have dates after the current date
     def checkDatesAfterToday(self):
-        with open("Sprintoutput.txt", "a") as f:
-            currentDate  = datetime.date.today()
+        if self.date_columns is not None: #The vectorized version returns None when the loop below has to run instead
+            idList = self.date_columns.checkDatesAfterToday(self.output, self.today)
+            if idList is not None:
+                return idList
+        with self.output as f:
+            currentDate  = self.today
             idList = []
             for ind in self.individuals:
                 if self.individuals[ind].birth != "ILLEGITIMATE" and  self.individuals[ind].birth > currentDate:
@@ -183,14 +495,13 @@ class Read_GEDCOM:
     #Function for US36's unittest: Returns a list of id's that have death dates within the past 30 days.
     def listRecentDeaths(self):
         ''' Lists the individuals with death dates within the past 30 days of today's date'''
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             idList = []
-            today = datetime.date.today()
-            dateFrom30DaysAgo = datetime.date.today() - datetime.timedelta(30)
-            for ind in self.individuals:
-                if self.individuals[ind].death is not None and self.individuals[ind].death != "ILLEGITIMATE" and self.individuals[ind].death >= dateFrom30DaysAgo and self.individuals[ind].death < today:
-                    self.recentDeathTable.add_row([ind, self.individuals[ind].name, self.individuals[ind].death])
-                    idList.append(ind)
+            today = self.today
+            dateFrom30DaysAgo = today - datetime.timedelta(30)
+            for ind in self.calendar.on_dates(self.calendar.deaths, dateFrom30DaysAgo, today - datetime.timedelta(1)): #Only the deaths of the last 30 days are looked at
+                self.recentDeathTable.add_row([ind, self.individuals[ind].name, self.individuals[ind].death])
+                idList.append(ind)
             print("LIST: US36: Recent Deaths:", file=f)
             print(self.recentDeathTable, file=f)
             return idList
@@ -198,7 +509,11 @@ class Read_GEDCOM:
     #Function for US02's unittest: Returns a list of individual id's that
     #have birth dates after their marriage dates
     def checkBirthAfterMarriage(self):
-        with open("Sprintoutput.txt", "a") as f:
+        if self.date_columns is not None: #The vectorized version returns None when the loop below has to run instead
+            idList = self.date_columns.checkBirthAfterMarriage(self.output)
+            if idList is not None:
+                return idList
+        with self.output as f:
             idList = []
             for ind in self.individuals:
                 birthDate = self.individuals[ind].birth
@@ -218,7 +533,9 @@ class Read_GEDCOM:
     #Function for US17's unittest. No Marrriage to Children. Returns an error if in the family,
     #the husband id or wife id is also in the children's list.
     def noMarriagesToChildren(self):
-        with open("SprintOutput.txt", "a") as f:
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.noMarriagesToChildren(self.output)
+        with self.output as f:
             idList = []
             for ind in self.individuals:
                 famSet = self.individuals[ind].fams
@@ -237,53 +554,42 @@ class Read_GEDCOM:
     #Function for US32's unittest. List all multiple births in a GEDCOM file.
     #Finding twins, triplets, etc.
     def listMultipleBirths(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
+            sameBirths = self.index.multiple_births() #Only individuals from the same family with the same birthday need to be compared with each other
             for ind in self.individuals:
-                for ind2 in self.individuals:
-                    if self.individuals[ind].famc == self.individuals[ind2].famc and self.individuals[ind].name != self.individuals[ind2].name:
-                        if self.individuals[ind].birth != "ILLEGITIMATE" and self.individuals[ind2].birth != "ILLEGITIMATE" and self.individuals[ind].birth == self.individuals[ind2].birth:
-                            print(f"ERROR: INDIVIDUALS: {ind} and {ind2}. US32: List all multiple Births; {self.individuals[ind].name} has the same birthday as: {self.individuals[ind2].name}", file=f)
-                            if (ind in idList):
-                                continue
-                            else:
-                                idList.append(ind)
+                for ind2 in sameBirths.get(ind, []):
+                    if self.individuals[ind].name != self.individuals[ind2].name:
+                        print(f"ERROR: INDIVIDUALS: {ind} and {ind2}. US32: List all multiple Births; {self.individuals[ind].name} has the same birthday as: {self.individuals[ind2].name}", file=f)
+                        if (ind in idList):
+                            continue
+                        else:
+                            idList.append(ind)
         return idList
     
     #Function for US14's unittest. No more than five siblings should be born at the same time
     def birthsLessThanFive(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
-            for ind in self.individuals:
-                famSet = self.individuals[ind].fams
-                if famSet != "NA":
-                    for fam in famSet:
-                        birthday_list = list()
-                        childrenSet = self.family[fam].children
-                        for child in childrenSet:
-                            if self.individuals[ind].birth != "ILLEGITIMATE":
-                                birthday_list.append(self.individuals[ind].birth)
-                        count_dict = dict((i, birthday_list.count(i)) for i in birthday_list)
-                        list_birthdays = count_dict.values()
-                        if len(list_birthdays) == 0 or max(list_birthdays) <= 5:
-                            continue
-                        elif(fam not in idList):
-                            print(f"ERROR: FAMILY: {fam}. US14: Number of children born in a single birth should not be greater than 5", file=f)
-                            idList.append(fam)
+            for fam in self.family:
+                for birth, sameBirth in itertools.groupby(self.index.siblings_by_birth(fam), key = lambda sibling: sibling[0]): #Siblings born on the same day are next to each other in the sorted list
+                    if len(list(sameBirth)) > 5:
+                        print(f"ERROR: FAMILY: {fam}. US14: Number of children born in a single birth should not be greater than 5", file=f)
+                        idList.append(fam)
+                        break
         return idList
 
     #Function for US25's unittest. Unique first names in families
     def uniqueFirstNameInFamily(self):
         idList = []
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             for ind in self.individuals:
-                for ind2 in self.individuals:
-                    if ind != ind2:
-                        if self.individuals[ind].name == self.individuals[ind2].name:
-                            if self.individuals[ind].birth != "ILLEGITIMATE" and self.individuals[ind2].birth != "ILLEGITIMATE":
-                                if self.individuals[ind].birth == self.individuals[ind2].birth and self.individuals[ind].famc == self.individuals[ind2].famc:
-                                    print(f"ERROR: INDIVIDUALS: {ind} and {ind2}. US25: No more than one child with the same name and birth date should appear in a family", file=f)
-                                    idList.append(ind)
+                if self.individuals[ind].birth == "ILLEGITIMATE":
+                    continue
+                for ind2 in self.index.name_and_birth.get((self.individuals[ind].name, self.individuals[ind].birth), []): #Only individuals with the same name and birth date can be duplicates
+                    if ind != ind2 and self.individuals[ind].famc == self.individuals[ind2].famc:
+                        print(f"ERROR: INDIVIDUALS: {ind} and {ind2}. US25: No more than one child with the same name and birth date should appear in a family", file=f)
+                        idList.append(ind)
         return idList
 
     # Function for US15's unittest. No more than five siblings should be born at the same time
@@ -293,7 +599,7 @@ class Read_GEDCOM:
         If a family has greater than 15 siblings, an error is thrown.
         '''
         idList = []
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for fam in self.family:
                 if len(self.family[fam].children) >= 15:
                     idList.append(fam)
@@ -305,8 +611,10 @@ class Read_GEDCOM:
     # specified in family records should have corresponding entries in the corresponding  individual's records.
     # I.e. the information in the individual and family records should be consistent.
     def correspondingEntries(self):
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.correspondingEntries(self.output)
         idList = []
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for ind in self.individuals:
                 if self.individuals[ind].famc == "NA" and self.individuals[ind].fams == "NA":
                     continue
@@ -329,14 +637,13 @@ class Read_GEDCOM:
     # Function for US28: List siblings in families by decreasing age, i.e. oldest siblings first
     def orderSiblingsByAge(self):
         idList = []
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for fam in self.family:
                 if(self.family[fam].children != 'NA' and len(self.family[fam].children) > 1):
-                    chil = dict()
-                    for c in self.family[fam].children:
-                        age = self.individuals[c].age
-                        chil[c] = age
-                    sortedChil = sorted(chil.items(), key=lambda item: item[1], reverse = True)
+                    ordered = [child for birth, child in self.index.siblings_by_birth(fam)] #Oldest first, which is the order of decreasing age without using ages that were worked out for another day
+                    placed = set(ordered)
+                    ordered += [c for c in self.family[fam].children if c not in placed] #Children without a legitimate birthday come last
+                    sortedChil = [(c, self.ages.age(c)) for c in ordered]
                     self.childrenInOrderTable.add_row([fam, sortedChil])
                 idList.append(fam)
             print("LIST: US28: Order Siblings by Age:", file=f)
@@ -345,25 +652,27 @@ class Read_GEDCOM:
 
     # Function for US18: Siblings should not marry.
     def noSiblingMarriage(self):
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.noSiblingMarriage(self.output)
         idList = []
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for ind1 in self.individuals:
-                fam1chil = self.individuals[ind1].famc
-                for ind2 in self.individuals:
-                    fam2chil = self.individuals[ind2].famc
-                    if ind1 != ind2 and fam1chil == fam2chil:
-                        fam1spouse = self.individuals[ind1].fams
-                        fam2spouse = self.individuals[ind2].fams
-                        if fam1spouse == fam2spouse and fam1spouse != "NA" and fam2spouse != "NA":
-                            if(ind1 not in idList):
-                                print(f"WARNING: INDIVIDUAL: US18: {ind1} and {ind2}: siblings should not marry", file = f)
-                                idList.append(ind1)
+                fam1spouse = self.individuals[ind1].fams
+                if fam1spouse == "NA":
+                    continue
+                for ind2 in self.index.siblings_with_same_spouses(ind1): #Siblings who married each other share both their famc and their fams
+                    if ind1 != ind2 and self.individuals[ind2].fams == fam1spouse:
+                        print(f"WARNING: INDIVIDUAL: US18: {ind1} and {ind2}: siblings should not marry", file = f)
+                        idList.append(ind1)
+                        break
         return idList
     
     # Function for US11: No Bigamy
     def noBigamy(self):
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.noBigamy(self.output)
         idList = []
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for ind in self.individuals:
                 marriageCount = 0
                 if len(self.individuals[ind].fams) > 1:
@@ -379,7 +688,7 @@ class Read_GEDCOM:
 
     # Function for US21's unittest. Husbands must be males and wives must be females.
     def correctGenderForRole(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             indIDList = [] #return id's of individuals who do not have the correct role gender
             individualsDict = self.individuals
             familyDict = self.family
@@ -396,7 +705,7 @@ class Read_GEDCOM:
 
     #function for US16's unittest. Males in the same family should have the same last name.
     def maleLastNames(self):  # us16
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for fam in self.family:
                 family = self.family[fam]
@@ -411,48 +720,44 @@ class Read_GEDCOM:
 
     #Function for US13's unittest. Birth dates of siblings should be more than 8 months apart or less than 2 days apart
     def siblingSpacing(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for fam in self.family:
-                family = self.family[fam]
-                for child in family.children:
-                    currBirthday = self.individuals[child].birth #first child's birthday
-                    for children in family.children:
-                        sibBirthday = self.individuals[children].birth #one siblings birthday
-                        if currBirthday != "ILLEGITIMATE" and sibBirthday != "ILLEGITIMATE":
-                            diff = abs(currBirthday - sibBirthday)
-                        if(diff > datetime.timedelta(days=2) and diff < datetime.timedelta(days=243)):
-                            idList.append(child)
-                            idList.append(children)
-                            print(f"ERROR: US13: {self.individuals[child].name } and {self.individuals[children].name} have birthdays too close together", file=f)
+                siblings = self.index.siblings_by_birth(fam)
+                births = [birth for birth, child in siblings]
+                for position, (birth, child) in enumerate(siblings):
+                    start = bisect.bisect_left(births, birth + 3, position + 1) #Only the younger siblings born more than 2 days and less than 243 days later are too close to this child
+                    for sibBirth, children in siblings[start:bisect.bisect_left(births, birth + 243, start)]:
+                        idList.append(child)
+                        idList.append(children)
+                        print(f"ERROR: US13: {self.individuals[child].name } and {self.individuals[children].name} have birthdays too close together", file=f)
+                        print(f"ERROR: US13: {self.individuals[children].name } and {self.individuals[child].name} have birthdays too close together", file=f)
             idList = list(dict.fromkeys(idList))
             return idList
 
     # Function for US24. No more than one family with the same spouses by name and the same marriage date should appear in a GEDCOM file
     def uniqueFamiliesBySpouses(self):
-        with open("SprintOutput.txt", "a") as f:
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.uniqueFamiliesBySpouses(self.output)
+        with self.output as f:
             idList = []
             for fam in self.family:
-                family = self.family[fam]
-                h_name = self.individuals[family.husband].name
-                w_name = self.individuals[family.wife].name
-                marriage_date = family.marriage
-                for famo in self.family:
-                    if(fam != famo and self.individuals[self.family[famo].husband].name == h_name and self.individuals[self.family[famo].wife].name == w_name and self.family[famo].marriage == marriage_date):
+                for famo in self.index.families_with_same_spouses(fam): #Only the families with the same husband name, wife name and marriage date are compared
+                    if(fam != famo):
                         print(f"ERROR: US 24: {fam} and {famo} is an identical families", file=f)
                         idList.append(fam)
             return idList
 
     # Function for US34. List all couples who were married when the older spouse was more than twice as old as the younger spouse.
     def listLargeAgeDifferences(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for fam in self.family:
                 family = self.family[fam]
-                years_married = datetime.date.today().year - family.marriage.year
-                if years_married >= 0 and self.individuals[family.wife].age != "NA" and self.individuals[family.husband].age != "NA":
-                    husband_married_age = int(self.individuals[family.husband].age) - years_married
-                    wife_married_age = int(self.individuals[family.wife].age) - years_married
+                years_married = self.today.year - family.marriage.year
+                if years_married >= 0 and self.ages.age(family.wife) != "NA" and self.ages.age(family.husband) != "NA":
+                    husband_married_age = int(self.ages.age(family.husband)) - years_married
+                    wife_married_age = int(self.ages.age(family.wife)) - years_married
                     if husband_married_age > 2*wife_married_age or wife_married_age > 2*husband_married_age:
                         idList.append(family.husband)
                         idList.append(family.wife)
@@ -461,79 +766,33 @@ class Read_GEDCOM:
 
     #Function for US19. First cousins should not marry one another
     def firstCousinsShouldNotMarry(self):
-        with open("SprintOutput.txt", "a") as f:
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.firstCousinsShouldNotMarry(self.output)
+        with self.output as f:
             idList = []
             for fam in self.family:
                 wife = self.family[fam].wife
                 husband = self.family[fam].husband
-                waifu = self.individuals[self.family[fam].wife].famc #wife's family
-                husbando = self.individuals[self.family[fam].husband].famc #husbands family
-                if waifu != "NA" and husbando != "NA":
-                    wife_mom =  self.family[waifu].wife #wife's mom's family
-                    wife_dad =  self.family[waifu].husband #wife's dad
-                    husband_mom = self.family[husbando].wife #husband's mom
-                    husband_dad =  self.family[husbando].husband #husband's dad
-
-                    pat_grandpa = self.individuals[husband_dad].famc
-                    pat_grandma = self.individuals[husband_mom].famc
-                    mat_grandma = self.individuals[wife_mom].famc
-                    mat_grandpa = self.individuals[wife_dad].famc
-
-                    if(mat_grandma == pat_grandma and (mat_grandma != "NA" and pat_grandma != "NA")): #if wife's mom and husband's mom are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US19: {self.family[fam].wife} and {self.family[fam].husband} are first cousins", file=f)
-                    if(mat_grandpa == pat_grandpa and (mat_grandpa != "NA" and pat_grandpa != "NA")): #if wife's dad and husband's dad are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US19: {self.family[fam].wife} and {self.family[fam].husband} are first cousins", file=f)
-                    if(mat_grandpa == pat_grandma and (mat_grandpa != "NA" and pat_grandma != "NA")): #if wife's dad and husband's mom are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US19: {self.family[fam].wife} and {self.family[fam].husband} are first cousins", file=f)
-                    if(mat_grandma == pat_grandpa and (mat_grandma != "NA" and pat_grandpa != "NA")): #if wife's mom and husband's dad are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US19: {self.family[fam].wife} and {self.family[fam].husband} are first cousins", file=f)
+                if self.kinship.related(wife, husband, 2, 2): #if a parent of the wife and a parent of the husband are siblings
+                    idList.append(wife)
+                    idList.append(husband)
+                    print(f"ERROR: US19: {wife} and {husband} are first cousins", file=f)
             idList = list(dict.fromkeys(idList))
             return idList
 
     #Function for US20. Aunts and uncles should not marry their nieces or nephews
     def auntsAndUncles(self):
-        with open("SprintOutput.txt", "a") as f:
+        if self.database is not None: #Runs as SQL on the indexes of the database
+            return self.database.auntsAndUncles(self.output)
+        with self.output as f:
             idList = []
             for fam in self.family:
                 wife = self.family[fam].wife
                 husband = self.family[fam].husband
-                waifu = self.individuals[self.family[fam].wife].famc #wife's family
-                husbando = self.individuals[self.family[fam].husband].famc #husbands family
-                if waifu != "NA" and husbando != "NA":
-                    wife_mom =  self.family[waifu].wife #wife's mom's family
-                    wife_dad =  self.family[waifu].husband #wife's dad
-                    husband_mom = self.family[husbando].wife #husband's mom
-                    husband_dad =  self.family[husbando].husband #husband's dad
-
-                    pat_grandpa = self.individuals[husband_dad].famc
-                    pat_grandma = self.individuals[husband_mom].famc
-                    mat_grandma = self.individuals[wife_mom].famc
-                    mat_grandpa = self.individuals[wife_dad].famc
-
-                    if husbando == mat_grandma: #uncle and wife's mom are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US20: AUNTS AND UNCLES {self.family[fam].wife} and {self.family[fam].husband} are related", file=f)
-                    if husbando == mat_grandpa: #uncle and wife's father are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US20: AUNTS AND UNCLES {self.family[fam].wife} and {self.family[fam].husband} are related", file=f)
-                    if waifu == pat_grandma: #aunt and husband's mom are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US20: AUNTS AND UNCLES {self.family[fam].wife} and {self.family[fam].husband} are related", file=f)
-                    if waifu == pat_grandpa: #aunts and husband's father are siblings
-                        idList.append(wife)
-                        idList.append(husband)
-                        print(f"ERROR: US20: AUNTS AND UNCLES {self.family[fam].wife} and {self.family[fam].husband} are related", file=f)
+                if self.kinship.related(husband, wife, 1, 2) or self.kinship.related(wife, husband, 1, 2): #uncle and one of the wife's parents are siblings or aunt and one of the husband's parents are siblings
+                    idList.append(wife)
+                    idList.append(husband)
+                    print(f"ERROR: US20: AUNTS AND UNCLES {wife} and {husband} are related", file=f)
             return idList
 
     # Function for US42's unittest. Return the list of illegitimate dates that were accumulated
@@ -542,25 +801,25 @@ class Read_GEDCOM:
         return self.illegitimateDatesList
 
     def printIllegitimateDateErrors(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for error in self.illegitimateDatesErrorList:
                 print(error, file=f)
 
     # Function for US12's unittest: Mother should be less than 60 years older than her children 
     # and father should be less than 80 years older than his children.
     def parentsNotTooOld(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             families = self.family
-            individuals = self.individuals
+            ages = self.ages
             for famID in families:
-                motherAge = individuals[families[famID].wife].age
-                fatherAge = individuals[families[famID].husband].age
+                motherAge = ages.age(families[famID].wife)
+                fatherAge = ages.age(families[famID].husband)
                 for childID in families[famID].children:
-                    if individuals[childID].alive != False and motherAge != "NA" and individuals[childID].age != "NA" and int(motherAge) - int(individuals[childID].age) >= 60 and individuals[families[famID].wife].alive != False:
+                    if ages.alive(childID) != False and motherAge != "NA" and ages.age(childID) != "NA" and int(motherAge) - int(ages.age(childID)) >= 60 and ages.alive(families[famID].wife) != False:
                         print(f"WARNING: US12: In family {famID}, Mother {families[famID].wife} is 60 or more years older than child {childID}", file=f)
                         idList.append(families[famID].wife)
-                    if individuals[childID].alive != False and fatherAge != "NA" and individuals[childID].age != "NA" and int(fatherAge) - int(individuals[childID].age) >= 80 and individuals[families[famID].husband].alive != False:
+                    if ages.alive(childID) != False and fatherAge != "NA" and ages.age(childID) != "NA" and int(fatherAge) - int(ages.age(childID)) >= 80 and ages.alive(families[famID].husband) != False:
                         print(f"WARNING: US12: In family {famID}, Father {families[famID].husband} is 80 or more years older than child {childID}", file=f)
                         idList.append(families[famID].husband)
         return idList
@@ -568,18 +827,15 @@ class Read_GEDCOM:
     # Function for US39's unittest: List all living couples in a GEDCOM file whose 
     # marriage anniversaries occur in the next 30 days.
     def upcomingAnniversaries(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             idList = []
-            todaysDate = datetime.date.today()
-            dateIn30Days = datetime.date.today() + datetime.timedelta(30)
-            for famID in self.family:
+            todaysDate = self.today
+            dateIn30Days = todaysDate + datetime.timedelta(30)
+            for famID in self.calendar.on_days(self.calendar.anniversaries, todaysDate, dateIn30Days, self.family): #Anniversaries from today to 30 days from now, also across the new year
                 if self.individuals[self.family[famID].husband].death != "ILLEGITIMATE" and self.individuals[self.family[famID].wife].death != "ILLEGITIMATE":
                     if self.family[famID].marriage < todaysDate:
-                        updatedMarriageDate = (self.family[famID].marriage).replace(year=todaysDate.year)
-                        if (updatedMarriageDate + datetime.timedelta(30)) >= dateIn30Days:
-                            if updatedMarriageDate <= dateIn30Days:
-                                self.upcomingAnniversariesTable.add_row([famID, self.family[famID].marriage, self.family[famID].husband, self.family[famID].wife])
-                                idList.append(famID)
+                        self.upcomingAnniversariesTable.add_row([famID, self.family[famID].marriage, self.family[famID].husband, self.family[famID].wife])
+                        idList.append(famID)
             print("LIST: US39: Upcoming Anniversaries:", file=f)
             print(self.upcomingAnniversariesTable, file=f)
         return idList
@@ -587,12 +843,12 @@ class Read_GEDCOM:
     # Function for US33's unittest: List all orphaned children (both parents dead 
     # and child < 18 years old) in a GEDCOM file
     def listOrphans(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for famID, fam in self.family.items():
-                if self.individuals[fam.husband].alive == False and self.individuals[fam.wife].alive == False:
+                if self.ages.alive(fam.husband) == False and self.ages.alive(fam.wife) == False:
                     for childID in fam.children:
-                        if self.individuals[childID].age < 18 and self.individuals[childID].age > 0 and self.individuals[childID].alive == True:
+                        if self.ages.age(childID) < 18 and self.ages.age(childID) > 0 and self.ages.alive(childID) == True:
                             self.orphansTable.add_row([childID, self.individuals[childID].name, famID])
                             idList.append(childID)
             print("LIST: US33: Orphaned Children:", file=f)
@@ -605,7 +861,7 @@ class Read_GEDCOM:
 
     # Prints non-unique error messages to the output file
     def printNonUniqueIDsErrors(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             for error in self.nonUniqueIDsErrors:
                 print(error, file=f)
 
@@ -613,46 +869,47 @@ class Read_GEDCOM:
     # and all family IDs should be unique. This function gets called in 
     # the parser to detect repeated IDs.
     def checkUniqueID(self, id, indiv_or_fam):
-        with open("Sprintoutput.txt", "a") as f:
-            isUnique = True
-            if indiv_or_fam == "individual":
-                if id in list(self.individuals.keys()):
-                    self.nonUniqueIDsList.append(id)
-                    error = f"ERROR: US22: Individual {id} from the GEDCOM file was not added to the individuals table because {id} is not a unique id"
-                    self.nonUniqueIDsErrors.append(error)
-                    isUnique = False
-            elif indiv_or_fam == "family":
-                if id in list(self.family.keys()):
-                    self.nonUniqueIDsList.append(id)
-                    error = f"ERROR: US22: Family {id} was not added to the families table because {id} is not a unique id"
-                    self.nonUniqueIDsErrors.append(error)
-                    isUnique = False
+        isUnique = True
+        if indiv_or_fam == "individual":
+            if id in self.individuals: #A hash lookup, so checking every record while parsing stays linear
+                self.nonUniqueIDsList.append(id)
+                error = f"ERROR: US22: Individual {id} from the GEDCOM file was not added to the individuals table because {id} is not a unique id"
+                self.nonUniqueIDsErrors.append(error)
+                isUnique = False
+        elif indiv_or_fam == "family":
+            if id in self.family:
+                self.nonUniqueIDsList.append(id)
+                error = f"ERROR: US22: Family {id} was not added to the families table because {id} is not a unique id"
+                self.nonUniqueIDsErrors.append(error)
+                isUnique = False
         return isUnique
 
     # Function for US35's unittest: List all people in a GEDCOM file who were born in the last 30 days
     def recentBirths(self):
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             idList = []
-            today = datetime.date.today()
-            dateFrom30DaysAgo = today - relativedelta(months=1)
-            for indID in self.individuals:
-                if self.individuals[indID].birth != "ILLEGITIMATE":
-                    if self.individuals[indID].birth > dateFrom30DaysAgo and self.individuals[indID].birth < today:
-                        self.recentBirthsTable.add_row([indID, self.individuals[indID].name, self.individuals[indID].birth])
-                        idList.append(indID)
+            today = self.today
+            dateFrom30DaysAgo = add_months(today, -1)
+            for indID in self.calendar.on_dates(self.calendar.births, dateFrom30DaysAgo + datetime.timedelta(1), today - datetime.timedelta(1)): #Born after the day a month ago and before today
+                self.recentBirthsTable.add_row([indID, self.individuals[indID].name, self.individuals[indID].birth])
+                idList.append(indID)
             print("LIST: US35: Recent Births:", file = f)
             print(self.recentBirthsTable, file = f)
             return idList
 
     # Function for US09's unittest: Child should be born before death of mother and before 9 months after death of father
     def birthBeforeDeathOfParents(self):
-        with open("Sprintoutput.txt", "a") as f:
+        if self.date_columns is not None: #The vectorized version returns None when the loop below has to run instead
+            idList = self.date_columns.birthBeforeDeathOfParents(self.output)
+            if idList is not None:
+                return idList
+        with self.output as f:
             idList = []
             for famID in self.family:
                 fam = self.family[famID]
                 mother_death = self.individuals[fam.wife].death if self.individuals[fam.wife].death != None else "NA"
                 father_death = self.individuals[fam.husband].death if self.individuals[fam.husband].death != None else "NA"
-                father_death_after_9_months = father_death + relativedelta(months=9) if father_death != "NA" else "NA"
+                father_death_after_9_months = self.ages.after_9_months(father_death) if father_death != "NA" else "NA"
                 for childID in fam.children:
                     child_bday = self.individuals[childID].birth
                     if mother_death != "NA" and child_bday > mother_death or father_death_after_9_months != "NA" and child_bday > father_death_after_9_months:
@@ -660,6 +917,110 @@ class Read_GEDCOM:
                         idList.append(childID)
             return idList
 
+    def record_chunk_gen(self, path, chunk_size = 1 << 20):
+        '''This is a file reading generator that reads the GEDCOM file in large binary chunks. Each chunk is cut at the start of a level 0 line so that no record is split between two chunks.'''
+        try:
+            fp = open(path, 'rb')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Can't open {path}!")
+        else:
+            with fp:
+                rest = b""
+                while True:
+                    chunk = fp.read(chunk_size)
+                    if not chunk:
+                        break
+                    chunk = rest + chunk
+                    end = chunk.rfind(b"\n0 ") + 1 #The last record of a chunk might continue in the next chunk
+                    if end == 0:
+                        rest = chunk
+                        continue
+                    rest = chunk[end:]
+                    yield chunk[:end]
+                if rest:
+                    yield rest
+
+    def record_block_gen(self, path):
+        '''This is a file reading generator that yields the GEDCOM file as blocks of lines for incremental runs. Each block starts with a level 0 INDI or FAM line and holds every line up to the next one, because analyze_GEDCOM also reads the lines of other level 0 records into the INDI or FAM record before them. Each block is yielded with its (tag, ID) key, and the lines before the first INDI or FAM line are yielded with the key None.'''
+        try:
+            fp = open(path, 'r')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Can't open {path}!")
+        else:
+            with fp:
+                key, lines = None, []
+                for line in fp:
+                    if line.lstrip().startswith("0"):
+                        tokens = line.strip().split(" ", 2)
+                        if len(tokens) == 3 and tokens[0] == "0" and tokens[2] in ["INDI", "FAM"] and tokens[1] not in ["HEAD", "TRLR", "NOTE"]:
+                            yield key, lines
+                            key, lines = (tokens[2], tokens[1].replace("@", "")), []
+                    lines.append(line)
+                yield key, lines
+
+    def analyze_GEDCOM_blocks(self, previous):
+        '''Reads the GEDCOM file for an incremental run. Only the blocks from record_block_gen that are new or changed since the previous snapshot are analyzed, and the Individual or Family of every other block is taken from the snapshot. Returns a dictionary with the key of each block and its digest, illegitimate dates and spouse families or children as the value, and the set of fields that changed. The dictionary is None when a duplicate ID made it read the whole file with analyze_GEDCOM.'''
+        previous_blocks = previous["blocks"] if previous is not None else dict()
+        previous_individuals, previous_family = previous["model"] if previous is not None else (dict(), dict())
+        blocks = dict()
+        changed = set()
+        for key, lines in self.record_block_gen(self.path):
+            if key is None: #The lines before the first INDI or FAM record are never stored
+                continue
+            if key in blocks: #checkUniqueID leaves out the records of a duplicate ID, so the file is read the usual way
+                self.individuals.clear()
+                self.family.clear()
+                self.illegitimateDatesList.clear()
+                self.illegitimateDatesErrorList.clear()
+                self.analyze_GEDCOM()
+                return None, set(Individual.__slots__ + Family.__slots__)
+            kind, ID = key
+            records, previous_records = (self.individuals, previous_individuals) if kind == "INDI" else (self.family, previous_family)
+            dates_start, errors_start = len(self.illegitimateDatesList), len(self.illegitimateDatesErrorList)
+            digest = hashlib.sha1("".join(lines).encode()).digest()
+            if key in previous_blocks and previous_blocks[key][0] == digest:
+                members = previous_blocks[key][3]
+                records[ID] = previous_records[ID]
+                if kind == "INDI": #The set is built again in the order the IDs were added when the file was read, so it is iterated in the same order as in a full run
+                    records[ID].fams = set(members)
+                else:
+                    records[ID].children = set(members)
+                self.illegitimateDatesList += previous_blocks[key][1]
+                self.illegitimateDatesErrorList += previous_blocks[key][2]
+            else:
+                tokens_list = [line.strip().split(" ", 2) for line in lines]
+                self.analyze_tokens(tokens_list)
+                members = tuple(dict.fromkeys(tokens[2].replace("@", "") for tokens in tokens_list if len(tokens) == 3 and tokens[0] == "1" and tokens[1] == ("FAMS" if kind == "INDI" else "CHIL")))
+                old, new = previous_records.get(ID), records[ID]
+                changed.update(field for field in type(new).__slots__ if old is None or getattr(old, field) != getattr(new, field))
+            blocks[key] = (digest, self.illegitimateDatesList[dates_start:], self.illegitimateDatesErrorList[errors_start:], members)
+        for kind, ID in previous_blocks.keys() - blocks.keys(): #Every field of a removed record counts as changed
+            changed.update(Individual.__slots__ if kind == "INDI" else Family.__slots__)
+        if previous is not None and previous["date"] != self.today:
+            changed.add("today")
+        return blocks, changed
+
+    def load_snapshot(self, path, ptables):
+        '''Returns the snapshot that an earlier incremental run saved at the path, or None if there is none or it was saved by another version, with other ptables or with tables that were printed another way'''
+        try:
+            with open(path, "rb") as fp:
+                snapshot = pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("ptables") != ptables or snapshot.get("tables") != self.table_text():
+            return None
+        snapshot["model"] = pickle.loads(snapshot["model"])
+        return snapshot
+
+    def table_text(self):
+        '''Returns what the text printed for the tables in the report depends on, which is None for pretty tables and the row limit of the renderer for streamed tables'''
+        return None if self.renderer is None else ("streamed", self.renderer.limit)
+
+    def save_snapshot(self, path, ptables, blocks, model, outcomes):
+        '''Saves what the next incremental run needs: the digest of every block, the individuals and families as they were read and the outcome of every check'''
+        snapshot = {"version": SNAPSHOT_VERSION, "ptables": ptables, "tables": self.table_text(), "date": self.today, "blocks": blocks, "model": model, "outcomes": outcomes}
+        save_pickle(path, snapshot) #The old snapshot is only replaced once the new one is complete, and runs that share the path each write their own file
+
     def file_reading_gen(self, path, sep = "\t"):
         '''This is a file reading generator that reads the GEDCOM function line by line. The function will first check for bad inputs and raise an error if it detects any.'''
         try: #This tries to open the file and returns an error if it can not open the file. The code continues if opening the file is successful
@@ -672,36 +1033,47 @@ class Read_GEDCOM:
                     separate_line = line.strip().split(sep, 2) #Each line is stripped and seperated by the indicated seperator which in this case is a space. Each seperate line is yielded on each call to next()
                     yield separate_line
 
+    def replace_empty_families(self):
+        '''Replaces the empty set of spouse families of each individual with "NA", which also makes the table look cleaner'''
+        for individual in self.individuals.values():
+            if individual.fams == set():
+                individual.fams = "NA"
+
     def create_indi_ptable(self):
         '''This creates a Pretty Table that is an Individual summary of each individuals ID, Name, Gender, Birthday, Age, whether they are alive or not, death date, children, and spouses.'''
         print("Individual Table")
         for ID, individual in self.individuals.items():
             individual.check_alive() #Calls this specific function to acquire whether the person is alive or not and what their age is.
-            if individual.fams == set(): #This just makes the table look cleaner by replacing empty sets with NA
-                individual.fams = "NA"
+            if self.as_of is not None: #The table shows the ages on the date the run is for, like the checks use
+                individual.age = self.ages.age(ID)
             self.individuals_ptable.add_row([ID, individual.name, individual.sex, individual.birth, individual.age, individual.alive, individual.death, individual.famc, individual.fams])
         print(self.individuals_ptable)
         #write individuals table to output
-        with open("Sprintoutput.txt", "w") as f:
+        with self.output as f:
             print("Individuals", file=f)
             print(self.individuals_ptable, file=f)
 
     # US10 implemented by Alden Radoncic
     def marriageAfter14(self):
-        with open("SprintOutput.txt", "a") as f:
+        if self.date_columns is not None: #The vectorized version returns None when the loop below has to run instead
+            idList = self.date_columns.marriageAfter14(self.output)
+            if idList is not None:
+                return idList
+        with self.output as f:
             idList = []
             for famID, fam in self.family.items():
                 if fam.marriage != "ILLEGITIMATE":
-                    if self.individuals[fam.husband].calculateAge2(fam.marriage) < 14 or self.individuals[fam.wife].calculateAge2(fam.marriage) < 14:
+                    husband_age, wife_age = self.ages.marriage_ages(famID)
+                    if husband_age < 14 or wife_age < 14:
                         idList.append(famID)
                         print(f"WARNING: FAMILY: US10: {famID}: One or both spouses were less than 14 years old at the time of marriage.", file = f)
             return idList
 
     def birthBeforeMarriageOfParents(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for famID, fam in self.family.items():
-                dateOf9MonthsAfterDivorce = fam.divorce + relativedelta(months=9) if fam.divorce != "NA" and fam.divorce != "ILLEGITIMATE" else "NA"
+                dateOf9MonthsAfterDivorce = self.ages.after_9_months(fam.divorce) if fam.divorce != "NA" and fam.divorce != "ILLEGITIMATE" else "NA"
                 for child in fam.children:
                     childBirth = self.individuals[child].birth
                     if childBirth != "ILLEGITIMATE" and fam.marriage != "ILLEGITIMATE":
@@ -711,7 +1083,7 @@ class Read_GEDCOM:
             return idList
              
     def listRecentSurvivors(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             individualDeaths = self.listRecentDeaths()
             for ind in individualDeaths:
@@ -736,19 +1108,21 @@ class Read_GEDCOM:
 
     def less_than_150_years_old(self):
         ''' US07 Death should be less than 150 years after birth for dead people, and current date should be less than 150 years after birth for all living people'''
-        with open("SprintOutput.txt", "a") as f:
+        if self.date_columns is not None:
+            return self.date_columns.less_than_150_years_old(self.output, self.today)
+        with self.output as f:
             idList = [] #Stores the ID of the people who are older than 150 years old in a list for testing purposes
             for indID in self.individuals:
-                if self.individuals[indID].age == "NA": #Skips the person if they apparently do not have an age attributed to them
+                if self.ages.age(indID) == "NA": #Skips the person if they apparently do not have an age attributed to them
                     pass
-                elif self.individuals[indID].age >= 150:
+                elif self.ages.age(indID) >= 150:
                     idList.append(indID)
-                    print(f"ERROR: INDIVIDUAL: US07 {self.individuals[indID].name} age is {self.individuals[indID].age} which is older than 150 years old.", file=f)
+                    print(f"ERROR: INDIVIDUAL: US07 {self.individuals[indID].name} age is {self.ages.age(indID)} which is older than 150 years old.", file=f)
             return idList
     
     def list_deceased(self):
         '''US29: List all deceased individuals in a GEDCOM file'''
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for indID in self.individuals:
                 if self.individuals[indID].death != None:
@@ -760,7 +1134,7 @@ class Read_GEDCOM:
         
     def list_living_married(self):
         '''US30: List all living married people in a GEDCOM file'''
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for famID, fam in self.family.items():
                 if fam.divorce == "NA" and self.individuals[fam.husband].death == None and self.individuals[fam.wife].death == None: #The family is not currently divorced and both husband and wife are still alive
@@ -772,12 +1146,12 @@ class Read_GEDCOM:
     
     def list_living_single(self):
         '''US31: List all living people over 30 who have never been married in a GEDCOM file'''
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
             for indID in self.individuals:
-                    if self.individuals[indID].age == "NA":
+                    if self.ages.age(indID) == "NA":
                         pass
-                    elif self.individuals[indID].age > 30 and self.individuals[indID].fams == "NA" and self.individuals[indID].death == None: #The indivduals need to have an age over 30, have never had a spouse in their life, and be currently living
+                    elif self.ages.age(indID) > 30 and self.individuals[indID].fams == "NA" and self.individuals[indID].death == None: #The indivduals need to have an age over 30, have never had a spouse in their life, and be currently living
                         idList.append(indID)
                         self.living_single_table.add_row([indID, self.individuals[indID].name])
             print("LIST: US31: List Living Single: ", file = f) #Creates and adds individuals who are living and single to a new pretty table
@@ -785,33 +1159,34 @@ class Read_GEDCOM:
             return idList
 
     def listUpcomingBirthdays(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
-            for indID in self.individuals:
-                if self.individuals[indID].alive:
-                    curr_bday = self.individuals[indID].birth
-                    today = datetime.date.today()
-                    date_30days_from_today = today + relativedelta(days=30)
-                    if curr_bday != "ILLEGITIMATE" and (today.month, today.day) < (curr_bday.month, curr_bday.day) <= (date_30days_from_today.month, date_30days_from_today.day):
-                        idList.append(indID)
-                        self.upcomingBirthdaysTable.add_row([indID, self.individuals[indID].name, self.individuals[indID].birth])
+            today = self.today
+            for indID in self.calendar.on_days(self.calendar.birthdays, today + datetime.timedelta(1), today + datetime.timedelta(days=30), self.individuals): #Birthdays after today and up to 30 days from now, also across the new year
+                if self.ages.alive(indID):
+                    idList.append(indID)
+                    self.upcomingBirthdaysTable.add_row([indID, self.individuals[indID].name, self.individuals[indID].birth])
             print(f"LIST: US38: Upcoming Birthdays:", file=f)
             print(self.upcomingBirthdaysTable, file=f)
             return idList
 
     def uniqueNameAndBirthDate(self):
-        with open("SprintOutput.txt", "a") as f:
+        with self.output as f:
             idList = []
-            uniqueInds = set()
             for indID in self.individuals:
-                ind = (self.individuals[indID].name, self.individuals[indID].birth)
-                if ind in uniqueInds:
+                if self.index.name_and_birth[(self.individuals[indID].name, self.individuals[indID].birth)][0] != indID: #The first individual with a name and birth date is the earlier one
                     print(f"ERROR: INDIVIDUAL: US23: {indID}: Individual {indID} has the same name and birth date as an earlier (lower ID numbered) individual", file=f)
                     idList.append(indID)
-                else:
-                    uniqueInds.add(ind)
             return idList
 
+    def listPossibleDuplicates(self, threshold = 0.7, max_days = 31):
+        '''Goes beyond US23 by also finding individuals whose names are only similar and whose birthdays are up to max_days apart. Returns the clusters of DuplicateFinder, best first.'''
+        with self.output as f:
+            clusters = DuplicateFinder(self.individuals, threshold, max_days).clusters()
+            for score, IDs in clusters:
+                print(f"WARNING: INDIVIDUALS: {', '.join(IDs)}: These individuals are probably the same person ({score:.2f}): " + ", ".join(self.individuals[ID].name for ID in IDs), file=f)
+            return clusters
+
     def create_fam_ptable(self):
         '''This creates a Pretty Table that is a Family summary of each family's ID, when they were married, when they got divorced, the Husband ID, the Husband Name, the Wife ID, the Wife Name, and their children.'''
         print("Family Table")
@@ -820,12 +1195,513 @@ class Read_GEDCOM:
         # self.orderSiblingsByAge()  
         print(self.family_ptable)
         #append families table to output file
-        with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
             print("Families", file=f)
             print(self.family_ptable, file=f)
 
+class ReportWriter:
+    '''This class is the one output sink for the errors and lists of a run. The checks print to it inside a "with" block, the text is buffered in memory and it is only written to the target when the buffer is full or the run is closed. The target can be a file path or any object with a write method such as io.StringIO.'''
+    def __init__(self, target = "SprintOutput.txt", mode = "a", buffer_size = 65536):
+        self.target = target
+        self.mode = mode #The mode the file path is first opened with. It is always appended to after that so nothing written earlier in the run is lost
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.file = None
+        self.depth = 0 #The number of runs that have the writer open. The output file stays open while this is more than 0
+
+    def open(self):
+        '''Starts a run so that the output file stays open until the matching close'''
+        self.depth += 1
+        return self
+
+    def close(self):
+        '''Ends a run. When the last run is closed everything that is still buffered is written and the output file is closed'''
+        self.depth = max(self.depth - 1, 0)
+        self.flush()
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        return len(text)
+
+    def flush(self):
+        '''Writes the buffered text to the target'''
+        if self.buffer:
+            text = "".join(self.buffer)
+            self.buffer, self.buffered = [], 0
+            if isinstance(self.target, str):
+                if self.file is None:
+                    self.file = open(self.target, self.mode)
+                    self.mode = "a"
+                self.file.write(text)
+            else:
+                self.target.write(text)
+        if self.file is not None and self.depth == 0:
+            self.file.close()
+            self.file = None
+
+    def getvalue(self):
+        '''Returns everything written so far when the target is an in-memory buffer such as io.StringIO'''
+        self.flush()
+        return self.target.getvalue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.buffered >= self.buffer_size or self.depth == 0: #Outside of a run each block is written right away like the checks used to do
+            self.flush()
+        return False
+
+def json_value(value):
+    '''Converts the sets and dates that some checks return into values that can be saved as JSON'''
+    return sorted(value) if isinstance(value, (set, frozenset)) else str(value)
+
+class StreamingTable:
+    '''This takes the place of a pretty table of TABLE_FIELDS when a run has a TableRenderer. Each row is passed to the renderer when it is added instead of being kept, so a table takes the same memory however many rows it has. Printing the table prints how many rows it had.'''
+    def __init__(self, renderer, name, field_names):
+        self.renderer = renderer
+        self.name = name
+        self.field_names = field_names
+
+    def add_row(self, row):
+        self.renderer.add_row(self.name, self.field_names, row)
+
+    def __str__(self):
+        return self.renderer.summary(self.name)
+
+class TableRenderer:
+    '''This is the base class of the renderers that write the rows of the tables of a run as they are added instead of keeping them in pretty tables. Each table is a section named after its attribute, such as "recentBirthsTable". At most limit rows of each section are written and the rest are only counted, and with echo every row is also written to standard output. The target can be a file path or any object with a write method such as io.StringIO. A subclass writes the rows with write_row and can start and end each section with start_section and end_section.'''
+    def __init__(self, target, limit = None, echo = False):
+        self.target = target
+        self.limit = limit
+        self.echo = echo
+        self.counts = dict() #The key is the section and the value is how many rows were added to it
+        self.held = None #The (section, field names, row) of every row added while a check is captured, or None when the rows are written
+        self.section = None #The section that the last row was written to
+        self.file = None
+        self.depth = 0 #The number of runs that have the renderer open, like a ReportWriter
+
+    def open(self):
+        '''Starts a run so that the target stays open until the matching close'''
+        self.depth += 1
+        if self.file is None:
+            self.file = open(self.target, "w", newline = "") if isinstance(self.target, (str, os.PathLike)) else self.target
+
+    def close(self):
+        '''Ends a run and finishes the last section. The target file is closed after the last run that has it open.'''
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        if self.section is not None:
+            self.end_section(self.section)
+            self.section = None
+        if self.file is not None and self.file is not self.target:
+            self.file.close()
+        self.file = None
+
+    def write(self, text):
+        '''Writes text to the target and to standard output when echo is True'''
+        self.file.write(text)
+        if self.echo:
+            sys.stdout.write(text)
+
+    def add_row(self, section, field_names, row):
+        '''Writes the row to its section, or holds it back while a check is captured'''
+        if self.held is not None:
+            self.held.append((section, field_names, row))
+            return
+        count = self.counts[section] = self.counts.get(section, 0) + 1
+        if self.limit is not None and count > self.limit:
+            return
+        if section != self.section:
+            if self.section is not None:
+                self.end_section(self.section)
+            self.section = section
+            self.start_section(section, field_names)
+        self.write_row(section, field_names, row)
+
+    def hold(self):
+        '''Holds back the rows added from now on instead of writing them'''
+        self.held = []
+
+    def release(self):
+        '''Stops holding back rows and returns the rows that were held as a dictionary with the section as the key and its list of rows as the value, in the form capture_check returns them'''
+        rows = dict()
+        for section, field_names, row in self.held:
+            rows.setdefault(section, []).append(row)
+        self.held = None
+        return rows
+
+    def summary(self, section):
+        '''Returns the line that is printed in place of the table of the section'''
+        count = self.counts.get(section, 0) + sum(1 for held in self.held or () if held[0] == section)
+        if self.limit is not None and count > self.limit:
+            return f"({count} rows in the {section} section, the first {self.limit} written)"
+        return f"({count} rows in the {section} section)"
+
+    def start_section(self, section, field_names):
+        pass
+
+    def write_row(self, section, field_names, row):
+        raise NotImplementedError
+
+    def end_section(self, section):
+        pass
+
+class JSONLinesRenderer(TableRenderer):
+    '''Writes each row as one line with a JSON object of its section and its values by field name. Sets are written as sorted lists and dates and other values as text.'''
+    def write_row(self, section, field_names, row):
+        self.write(json.dumps({"section": section, "row": dict(zip(field_names, row))}, default = json_value) + "\n")
+
+class CSVRenderer(TableRenderer):
+    '''Writes each section as CSV, starting with a row of the section name and then a row of the field names, so the sections can be split apart again. A section that starts again after another section gets its names again.'''
+    def __init__(self, target, limit = None, echo = False):
+        super().__init__(target, limit, echo)
+        import csv #Only imported by the runs that write CSV
+        self.writer = csv.writer(self, lineterminator = "\n") #Writes through write, so echo works the same as for the other renderers
+
+    def start_section(self, section, field_names):
+        self.writer.writerow([section])
+        self.writer.writerow(field_names)
+
+    def write_row(self, section, field_names, row):
+        self.writer.writerow(row)
+
+class PagedTextRenderer(TableRenderer):
+    '''Writes each section as pages of fixed width text with page_length rows each. Every page starts with the section name, its page number and the field names. The width of each column is worked out from the rows of its page, so only one page is kept in memory.'''
+    def __init__(self, target, limit = None, echo = False, page_length = 60):
+        super().__init__(target, limit, echo)
+        self.page_length = page_length
+        self.page = [] #The rows of the page that is not written yet, as text
+        self.pages = 0 #The number of pages of the section that were written
+        self.field_names = None
+
+    def start_section(self, section, field_names):
+        self.field_names = field_names
+        self.pages = 0
+
+    def write_row(self, section, field_names, row):
+        self.page.append([str(value) for value in row])
+        if len(self.page) == self.page_length:
+            self.write_page(section)
+
+    def end_section(self, section):
+        if self.page:
+            self.write_page(section)
+
+    def write_page(self, section):
+        '''Writes the rows of the page with the columns as wide as their longest value'''
+        self.pages += 1
+        widths = [max(len(name), *(len(values[column]) for values in self.page)) for column, name in enumerate(self.field_names)]
+        line = lambda values: "  ".join(value.ljust(width) for value, width in zip(values, widths)).rstrip() + "\n"
+        self.write(f"{section} page {self.pages}\n")
+        self.write(line(self.field_names))
+        self.write(line(["-" * width for width in widths]))
+        for values in self.page:
+            self.write(line(values))
+        self.write("\n")
+        self.page = []
+
+#The renderers by the name of their format
+RENDERERS = {"jsonl": JSONLinesRenderer, "csv": CSVRenderer, "text": PagedTextRenderer}
+
+class ModelCache:
+    '''This class keeps the parsed records of GEDCOM files in a directory so that a file that did not change does not have to be read again. Each model is a pickle of plain tuples and its name is the sha1 of the file and the PARSER_VERSION. When the models take more than max_bytes the ones used least recently are removed.'''
+    def __init__(self, directory, max_bytes = MODEL_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok = True)
+
+    def key(self, path):
+        '''Returns the name of the model for the file at the path, which changes whenever the contents of the file or the parser change'''
+        digest = hashlib.sha1()
+        try:
+            with open(path, "rb") as fp:
+                for chunk in iter(functools.partial(fp.read, 1 << 20), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Can't open {path}!")
+        return f"{digest.hexdigest()}-{PARSER_VERSION}.model"
+
+    def load(self, key):
+        '''Returns the model saved with the key or None if there is none'''
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as fp:
+                model = pickle.load(fp)
+            os.utime(path) #Marks the model as used so it is evicted last
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return None
+        return model
+
+    def save(self, key, model):
+        '''Saves the model with the key and evicts models until the cache fits in max_bytes again'''
+        save_pickle(os.path.join(self.directory, key), model) #A model that is being written is never loaded, and runs that save the same model at once each write their own file
+        self.evict(keep = key)
+
+    def evict(self, keep = None):
+        '''Removes the models saved by other parser versions and then the least recently used models until the rest take at most max_bytes. The model with the key keep is never removed.'''
+        models = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".model") and entry.is_file():
+                stat = entry.stat()
+                models.append((entry.name.endswith(f"-{PARSER_VERSION}.model"), stat.st_mtime, stat.st_size, entry.name)) #Models of other versions sort first, then the oldest
+        total = sum(size for _, _, size, _ in models)
+        for current, _, size, name in sorted(models):
+            if current and total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+class RecordIndex:
+    '''This class finds the byte offsets of every INDI and FAM record of a GEDCOM file with one scan of the memory mapped file, so that one record can be read without reading the rest of the file. A record runs up to the next INDI or FAM line like the blocks of record_block_gen. The offsets are saved to a sidecar file next to the GEDCOM file and used again as long as the size and modification time of the file stay the same.'''
+    def __init__(self, path, sidecar = None):
+        self.path = path
+        self.sidecar = sidecar if sidecar is not None else path + ".idx"
+        self.offsets = dict() #The key is the (tag, ID) of a record and the value is its start and end byte offsets. Only the first record with an ID is kept like analyze_GEDCOM does
+        self.duplicates = [] #The (tag, ID) of every later record with the same ID in the order of the file
+
+    def stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Can't open {self.path}!")
+        return stat.st_size, stat.st_mtime_ns
+
+    def load(self):
+        '''Loads the offsets from the sidecar file, or scans the GEDCOM file and saves them when the sidecar file is missing or was saved for another version of the file. Returns the index.'''
+        stat = self.stat()
+        try:
+            with open(self.sidecar, "rb") as fp:
+                saved = pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            saved = None
+        if isinstance(saved, tuple) and len(saved) == 6 and saved[0] == (RECORD_INDEX_VERSION, stat):
+            _, tags, IDs, starts, ends, self.duplicates = saved
+            self.offsets = {("INDI" if tag == ord("I") else "FAM", ID): (start, end) for tag, ID, start, end in zip(tags, IDs, starts, ends)}
+        else:
+            self.build()
+            self.save(stat)
+        return self
+
+    def build(self):
+        '''Scans the memory mapped GEDCOM file for the level 0 INDI and FAM lines and records where each record starts and ends'''
+        self.offsets, self.duplicates = dict(), []
+        with open(self.path, "rb") as fp:
+            if os.fstat(fp.fileno()).st_size == 0: #An empty file can not be memory mapped
+                return self
+            with mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ) as data:
+                key = start = None
+                for match in RECORD_HEADER.finditer(data):
+                    if match.group(1) in SKIPPED_RECORDS:
+                        continue
+                    if key is not None:
+                        self.add(key, start, match.start())
+                    key, start = (match.group(2).decode(), match.group(1).decode().replace("@", "")), match.start()
+                if key is not None:
+                    self.add(key, start, len(data))
+        return self
+
+    def add(self, key, start, end):
+        if key in self.offsets:
+            self.duplicates.append(key)
+        else:
+            self.offsets[key] = (start, end)
+
+    def save(self, stat):
+        '''Saves the offsets to the sidecar file with the size and modification time of the GEDCOM file they were found in'''
+        tags = bytes(ord(tag[0]) for tag, _ in self.offsets)
+        starts = array.array("q", (start for start, _ in self.offsets.values())) #The offsets are saved as packed 64 bit integers
+        ends = array.array("q", (end for _, end in self.offsets.values()))
+        save_pickle(self.sidecar, ((RECORD_INDEX_VERSION, stat), tags, [ID for _, ID in self.offsets], starts, ends, self.duplicates)) #Readers that index the same file at once each write their own temporary file
+
+class LazyRecords(collections.abc.Mapping):
+    '''This is the individuals or family mapping of a LazyGEDCOM. The IDs come from its RecordIndex and each record is only parsed the first time it is looked up.'''
+    def __init__(self, reader, tag):
+        self.reader = reader
+        self.tag = tag
+        self.IDs = [ID for record_tag, ID in reader.record_index.offsets if record_tag == tag]
+
+    def __getitem__(self, ID):
+        if (self.tag, ID) not in self.reader.record_index.offsets:
+            raise KeyError(ID)
+        return self.reader.parse_record((self.tag, ID))[0]
+
+    def __contains__(self, ID):
+        return (self.tag, ID) in self.reader.record_index.offsets
+
+    def __iter__(self):
+        return iter(self.IDs)
+
+    def __len__(self):
+        return len(self.IDs)
+
+class LazyGEDCOM(Read_GEDCOM):
+    '''This is a Read_GEDCOM that does not read the whole file. The individuals and family mappings parse each record from the memory mapped file the first time it is used, so looking up one individual or family only reads that record. The checks can still be called on it but they parse every record they look at.'''
+    def __init__(self, path, output = None, sidecar = None, as_of = None):
+        self.path = path
+        self.as_of = as_of
+        self.output = output if output is not None else ReportWriter("SprintOutput.txt", "a")
+        self.record_index = RecordIndex(path, sidecar).load()
+        self.parsed = dict() #The key is the (tag, ID) of a record and the value is the parsed record with its illegitimate dates and errors
+        self.individuals = LazyRecords(self, "INDI")
+        self.family = LazyRecords(self, "FAM")
+        self.error_list = []
+        self.nonUniqueIDsList = []
+        self.nonUniqueIDsErrors = []
+        for tag, ID in self.record_index.duplicates: #The records with IDs that are not unique are known from the index without parsing them
+            self.checkUniqueID(ID, "individual" if tag == "INDI" else "family")
+        self.columns = self.date_columns = None
+        self.fp = open(path, "rb")
+        self.data = mmap.mmap(self.fp.fileno(), 0, access = mmap.ACCESS_READ) if self.record_index.offsets else b""
+
+    def parse_record(self, key):
+        '''Returns the record with the (tag, ID) key and its illegitimate dates and errors, and parses it with analyze_tokens the first time'''
+        if key not in self.parsed:
+            start, end = self.record_index.offsets[key]
+            parser = Read_GEDCOM.__new__(Read_GEDCOM) #Only holds the one record that is parsed
+            parser.individuals, parser.family = dict(), dict()
+            parser.illegitimateDatesList, parser.illegitimateDatesErrorList, parser.nonUniqueIDsList, parser.nonUniqueIDsErrors = [], [], [], []
+            parser.analyze_tokens(line.strip().split(" ", 2) for line in io.StringIO(self.data[start:end].decode(), newline = None))
+            records = parser.individuals if key[0] == "INDI" else parser.family
+            self.parsed[key] = (records[key[1]], parser.illegitimateDatesList, parser.illegitimateDatesErrorList)
+        return self.parsed[key]
+
+    @property
+    def illegitimateDatesList(self):
+        '''The illegitimate dates of every record in the order of the file, which parses every record'''
+        return [date for key in self.record_index.offsets for date in self.parse_record(key)[1]]
+
+    @property
+    def illegitimateDatesErrorList(self):
+        return [error for key in self.record_index.offsets for error in self.parse_record(key)[2]]
+
+    def close(self):
+        '''Closes the memory mapped file'''
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.fp.close()
+
+class ReferenceMapping(collections.abc.Mapping):
+    '''This is a mapping that looks up any record that was read but iterates none of them. A local check that runs on one family with it as the individuals can read the husband and wife without checking them again.'''
+    def __init__(self, records):
+        self.records = records
+
+    def __getitem__(self, ID):
+        return self.records[ID]
+
+    def __contains__(self, ID):
+        return ID in self.records
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+class StreamingGEDCOM(Read_GEDCOM):
+    '''This is a Read_GEDCOM that validates the file while it reads it. Each record is parsed on its own and the selected checks tagged local write their errors for it right away. After that the record is only kept as a row of a ColumnarStore, and once the whole file was read the other selected checks run on the views of the store. When deferred is False the other checks are not run and only the IDs of the records are kept, unless a local check needs the husband and wife of a family. The errors of the local checks are written in the order of the records in the file, and a family is checked after the whole file was read when its husband or wife comes after it. Ages and "NA" for an empty fams are worked out like the individuals table does.'''
+    def __init__(self, path, output = None, checks = None, deferred = True, as_of = None):
+        self.path = path
+        self.as_of = as_of
+        self.pipeline = checks if isinstance(checks, Pipeline) else Pipeline(checks)
+        self.output = output if output is not None else ReportWriter("SprintOutput.txt", "a")
+        self.output.open()
+        self.columns = ColumnarStore(dict(), dict())
+        self.individuals = self.columns.individuals
+        self.family = self.columns.family
+        self.date_columns = None
+        self.error_list = []
+        self.user_story_errors = self.error_list
+        self.illegitimateDatesList = []
+        self.illegitimateDatesErrorList = []
+        self.nonUniqueIDsList = []
+        self.nonUniqueIDsErrors = []
+        self.local_checks = [check for check in self.pipeline.checks if "local" in check.tags]
+        self.local_user_stories = [check for check in self.pipeline.user_stories if "local" in check.tags]
+        self.keep_records = deferred or "references" in self.pipeline.needs #Otherwise only the IDs are kept, so the memory used does not grow with the records
+        self.record_IDs = {"INDI": set(), "FAM": set()} #The IDs of the records that were read, for US22
+        results = defaultdict(list)
+        try:
+            pending = [] #The parsers of the families whose husband or wife was not read yet
+            for key, lines in self.record_block_gen(path):
+                if key is not None:
+                    parser = self.stream_record(key, lines)
+                    if parser.family and "references" in self.pipeline.needs and not all(ID in self.individuals for fam in parser.family.values() for ID in (fam.husband, fam.wife)):
+                        pending.append(parser)
+                    else:
+                        self.run_local_checks(parser, results)
+            for parser in pending:
+                self.run_local_checks(parser, results)
+            if deferred:
+                results.update(CheckExecutor(self).run([check for check in self.pipeline.checks if "local" not in check.tags]))
+                self.run_user_stories(self.family, self.individuals, [check for check in self.pipeline.user_stories if "local" not in check.tags])
+            self.check_results = {check.method: results[check.method] for check in self.pipeline.checks if check.method in results}
+        finally:
+            self.output.close()
+
+    def stream_record(self, key, lines):
+        '''Parses the block of lines of one record with analyze_tokens, adds the record to the ColumnarStore and returns the parser that holds the record and its illegitimate dates and errors for the local checks'''
+        tag, ID = key
+        parser = Read_GEDCOM.__new__(Read_GEDCOM) #Only holds the one record that is parsed
+        parser.individuals, parser.family = dict(), dict()
+        parser.illegitimateDatesList, parser.illegitimateDatesErrorList, parser.nonUniqueIDsList, parser.nonUniqueIDsErrors = [], [], [], []
+        parser.output = self.output
+        parser.as_of = self.as_of
+        parser.date_columns = None
+        if ID in self.record_IDs[tag]: #Only the first record with an ID is kept, so the lines of this one are not parsed
+            (parser.individuals if tag == "INDI" else parser.family)[ID] = None #checkUniqueID only needs to find the ID
+            parser.checkUniqueID(ID, "individual" if tag == "INDI" else "family")
+            parser.individuals, parser.family = dict(), dict()
+            self.nonUniqueIDsList += parser.nonUniqueIDsList
+            self.nonUniqueIDsErrors += parser.nonUniqueIDsErrors
+            return parser
+        self.record_IDs[tag].add(ID)
+        parser.analyze_tokens(line.strip().split(" ", 2) for line in lines)
+        self.illegitimateDatesList += parser.illegitimateDatesList
+        self.illegitimateDatesErrorList += parser.illegitimateDatesErrorList
+        for ID, individual in parser.individuals.items():
+            individual.check_alive()
+            if individual.fams == set():
+                individual.fams = "NA"
+            if self.keep_records:
+                self.columns.add_individual(ID, individual)
+        for ID, family in parser.family.items():
+            if self.keep_records:
+                self.columns.add_family(ID, family)
+        if parser.family:
+            parser.individuals = ReferenceMapping(self.individuals)
+        return parser
+
+    def run_local_checks(self, parser, results):
+        '''Runs the local checks on the record of the parser, writing what they find to the output and adding the IDs they return to results'''
+        for check in self.local_checks:
+            result = check.run(parser)
+            if isinstance(result, list):
+                results[check.method] += result
+            else:
+                results[check.method] = result
+        self.run_user_stories(parser.family, parser.individuals, self.local_user_stories)
+
+    def run_user_stories(self, family_dict, individual_dict, checks):
+        '''Runs the user stories of USER_STORY_CHECKS in checks and writes the errors they find to the output'''
+        if checks:
+            errors = UserStories(family_dict, individual_dict, [], False, self.output, None, checks).add_errors
+            with self.output as f:
+                for error in errors:
+                    print(error, file = f)
+            self.error_list += errors
+
 class Individual:
     '''This class will hold all the information for each individual according to their IndiID. This includes their name, sex, birthday, age, whether they are alive, death date, and their children and spouses.'''
+    __slots__ = ("name", "sex", "birth", "age", "alive", "death", "famc", "fams") #Slots instead of a __dict__ for each instance keeps large files from using several GB
     def __init__(self, name = "NA", sex = "NA", birth = None, age = "NA", alive = True, death = None, famc = "NA"):
         self.name = name
         self.sex = sex
@@ -880,6 +1756,7 @@ class Individual:
 
 class Family:
     '''This class will hold all of the information for each family according to their FamID. This includes the marriage date, divorce date, husband ID, wife ID, and a set of the children.'''
+    __slots__ = ("marriage", "divorce", "husband", "wife", "children")
     def __init__(self):
         self.marriage = "NA"
         self.divorce = "NA"
@@ -887,16 +1764,1200 @@ class Family:
         self.wife = "NA"
         self.children = set()
 
+class GEDCOM_Index:
+    '''This class groups the individuals and families once after the GEDCOM file is read so that checks comparing records with each other only look at the records that can match instead of every pair of individuals.'''
+    def __init__(self, individual_dict, family_dict):
+        self.individuals = individual_dict
+        self.family = family_dict
+        self.children_by_famc = defaultdict(list) #The key is the famc ID and the value is the list of IndiIDs that are children in that family (including "NA")
+        self.name_and_birth = defaultdict(list) #The key is the (name, birth) pair and the value is the list of IndiIDs with that name and birthday
+        self.spouses_by_fams = defaultdict(list) #The key is the FamID and the value is the list of IndiIDs that list that family as a spouse family
+        for ID, individual in individual_dict.items():
+            self.children_by_famc[individual.famc].append(ID)
+            self.name_and_birth[(individual.name, individual.birth)].append(ID)
+            for fam in individual.fams:
+                self.spouses_by_fams[fam].append(ID)
+        self._multiple_births = None
+        self._siblings_by_spouses = None
+        self._siblings_by_birth = None
+        self._families_by_spouses = None
+
+    def multiple_births(self):
+        '''Returns a dictionary with each IndiID as the key and the list of IndiIDs (including itself) that are children in the same family and share the same legitimate birthday as the value'''
+        if self._multiple_births is None:
+            self._multiple_births = dict()
+            for children in self.children_by_famc.values():
+                births = defaultdict(list)
+                for ID in children:
+                    if self.individuals[ID].birth != "ILLEGITIMATE":
+                        births[self.individuals[ID].birth].append(ID)
+                for same_birth in births.values():
+                    for ID in same_birth:
+                        self._multiple_births[ID] = same_birth
+        return self._multiple_births
+
+    def siblings_by_birth(self, fam):
+        '''Returns the list of (birth ordinal, IndiID) of the children of the family with a legitimate birthday, oldest first. The lists of every family are sorted once the first time this is called, so US13, US14 and US28 only sweep over them.'''
+        if self._siblings_by_birth is None:
+            self._siblings_by_birth = dict()
+            for ID, family in self.family.items():
+                births = ((self.individuals[child].birth, child) for child in family.children)
+                self._siblings_by_birth[ID] = sorted((birth.toordinal(), child) for birth, child in births if isinstance(birth, datetime.date))
+        return self._siblings_by_birth.get(fam, [])
+
+    def families_with_same_spouses(self, fam):
+        '''Returns the list of FamIDs (including fam) whose husband name, wife name and marriage date are the same as those of the family fam, in the order of the families. Every family is grouped the first time this is called.'''
+        if self._families_by_spouses is None:
+            self._families_by_spouses = defaultdict(list)
+            for ID, family in self.family.items():
+                self._families_by_spouses[(self.individuals[family.husband].name, self.individuals[family.wife].name, family.marriage)].append(ID)
+        family = self.family[fam]
+        return self._families_by_spouses[(self.individuals[family.husband].name, self.individuals[family.wife].name, family.marriage)]
+
+    def siblings_with_same_spouses(self, ID):
+        '''Returns the list of IndiIDs (including ID) that share both the famc and the set of spouse families of the individual ID'''
+        if self._siblings_by_spouses is None:
+            self._siblings_by_spouses = defaultdict(list)
+            for children in self.children_by_famc.values():
+                for child in children:
+                    self._siblings_by_spouses[(self.individuals[child].famc, frozenset(self.individuals[child].fams))].append(child)
+        individual = self.individuals[ID]
+        return self._siblings_by_spouses.get((individual.famc, frozenset(individual.fams)), [])
+
+class Kinship:
+    '''This class turns the famc links into a graph of parents once and keeps the ancestors of each individual a generation at a time, so how two individuals are related is found by intersecting a few small sets instead of following famc chains by hand. The famc family of an individual and the husband and wife of that family are one generation up, their famc families and parents are two generations up and so on. Generations past max_generations are not kept, which covers second cousins once removed with the default.'''
+    def __init__(self, individual_dict, family_dict, max_generations = 4):
+        self.max_generations = max_generations
+        self.parents = dict() #The key is the IndiID and the value is its famc FamID and the IndiIDs of the husband and wife of that family, leaving out "NA" and IDs that are not in the file
+        for ID, individual in individual_dict.items():
+            famc = individual.famc
+            if famc in family_dict:
+                self.parents[ID] = (famc, tuple(parent for parent in (family_dict[famc].husband, family_dict[famc].wife) if parent in individual_dict))
+        self._ancestors = dict() #The key is the IndiID and the value is what ancestors returned for it
+
+    def ancestors(self, ID):
+        '''Returns a tuple with the set of ancestors of the individual ID that are each number of generations up, starting with the set of just ID. FamIDs and IndiIDs are both ancestors. The ancestors of the parents are found first without recursion so that deep trees do not reach the recursion limit.'''
+        stack, expanded = [ID], set()
+        while stack:
+            current = stack[-1]
+            famc, parents = self.parents.get(current, (None, ()))
+            if current not in expanded and current not in self._ancestors:
+                expanded.add(current)
+                waiting = [parent for parent in parents if parent not in self._ancestors and parent not in expanded] #A parent that is expanded but not finished is also a descendant, so that line of the file is skipped instead of looping forever
+                if waiting:
+                    stack.extend(waiting)
+                    continue
+            stack.pop()
+            if current in self._ancestors:
+                continue
+            levels = [{current}] + [set() for generation in range(self.max_generations)]
+            if famc is not None:
+                levels[1].add(famc)
+            levels[1].update(parents)
+            for parent in parents:
+                for generation, ancestors in enumerate(self._ancestors.get(parent, ())[1:self.max_generations], 2):
+                    levels[generation] |= ancestors
+            self._ancestors[current] = tuple(frozenset(level) for level in levels)
+        return self._ancestors[ID]
+
+    def related(self, first, second, first_generations, second_generations):
+        '''Returns True if first and second have a common ancestor that is first_generations up from first and second_generations up from second. (1, 1) is siblings, (2, 2) is first cousins, (3, 3) is second cousins and (1, 2) means first is an uncle or aunt of second.'''
+        if max(first_generations, second_generations) > self.max_generations:
+            raise ValueError(f"Only {self.max_generations} generations of ancestors are kept")
+        return not self.ancestors(first)[first_generations].isdisjoint(self.ancestors(second)[second_generations])
+
+    def relationship(self, first, second):
+        '''Returns how many generations up from first and from second their nearest common ancestor is as a (first, second) tuple, or None if they have none within max_generations. (0, 1) means first is a parent of second.'''
+        first_ancestors, second_ancestors = self.ancestors(first), self.ancestors(second)
+        generations = [(a, b) for a in range(len(first_ancestors)) for b in range(len(second_ancestors)) if not first_ancestors[a].isdisjoint(second_ancestors[b])]
+        return min(generations, key = lambda pair: (sum(pair), pair), default = None)
+
+class CalendarIndex:
+    '''This class files the birth and death dates of the individuals by date and the birthdays and marriage anniversaries by month and day once, so the lists of recent and upcoming events only look up each day of their window instead of going through every record. A window of N days takes N lookups whatever the size of the file, and the IDs are put back in the order of the file. Birthdays and anniversaries on February 29 are on February 28 in the years that do not have one. Missing and illegitimate dates are not filed.'''
+    def __init__(self, individual_dict, family_dict):
+        self.positions = dict() #The key is an IndiID or FamID and the value is its position in the file, for putting the IDs found back in order
+        self.births = defaultdict(list) #The key is the date and the value is the list of IndiIDs born on it
+        self.deaths = defaultdict(list)
+        self.birthdays = defaultdict(list) #The key is the (month, day) and the value is the list of IndiIDs born on it
+        self.anniversaries = defaultdict(list) #The key is the (month, day) and the value is the list of FamIDs married on it
+        for position, (ID, individual) in enumerate(individual_dict.items()):
+            self.positions[ID] = position
+            if isinstance(individual.birth, datetime.date):
+                self.births[individual.birth].append(ID)
+                self.birthdays[(individual.birth.month, individual.birth.day)].append(ID)
+            if isinstance(individual.death, datetime.date):
+                self.deaths[individual.death].append(ID)
+        for position, (ID, family) in enumerate(family_dict.items()):
+            self.positions[ID] = position
+            if isinstance(family.marriage, datetime.date):
+                self.anniversaries[(family.marriage.month, family.marriage.day)].append(ID)
+
+    @staticmethod
+    def days(first, last):
+        '''Yields every date from first to last (inclusive)'''
+        for offset in range((last - first).days + 1):
+            yield first + datetime.timedelta(offset)
+
+    def ordered(self, IDs, records):
+        '''Returns the IDs in the order of the file without the ones that are not in records'''
+        return sorted((ID for ID in IDs if ID in records), key = self.positions.__getitem__)
+
+    def on_dates(self, events, first, last):
+        '''Returns the IDs of the events (births or deaths) on a date from first to last (inclusive) in the order of the file'''
+        return sorted((ID for day in self.days(first, last) for ID in events.get(day, ())), key = self.positions.__getitem__)
+
+    def on_days(self, events, first, last, records):
+        '''Returns the IDs of the yearly events (birthdays or anniversaries) from first to last (inclusive) in the order of the file. A window that goes past the end of the year continues in January and a window of a year or more has every ID. records is the individuals or families, so an ID whose record was replaced by a later record with the same ID is only found on the day of the record that was kept.'''
+        IDs = dict() #Keeps each ID once when the window has the same day twice
+        for day in self.days(first, min(last, first + datetime.timedelta(365))):
+            IDs.update(dict.fromkeys(events.get((day.month, day.day), ())))
+            if day.month == 2 and day.day == 28 and not calendar_module.isleap(day.year):
+                IDs.update(dict.fromkeys(events.get((2, 29), ())))
+        return self.ordered(IDs, records)
+
+class AgeEngine:
+    '''This class works out the ages that the date checks use for one as-of date, which is today unless the run is for another date. Each date is turned into its YYYYMMDD day number, so the whole years between two dates are the difference of their day numbers divided by 10000 and rounded down instead of a comparison of (month, day) tuples. Ages are worked out the first time they are used and kept, and like check_alive does for the individuals table an individual without a death date is alive and is aged on the as-of date while the others are aged on their death date. A missing or illegitimate date gives the age "NA". The ages at each marriage and the dates 9 months after a divorce or death are kept the same way.'''
+    def __init__(self, individual_dict, family_dict, as_of):
+        self.individuals = individual_dict
+        self.family = family_dict
+        self.as_of = as_of
+        self._ages = dict() #The key is the IndiID and the value is its age on the as-of date
+        self._marriage_ages = dict() #The key is the FamID and the value is the age of the husband and the wife on the marriage date
+        self._after_9_months = dict() #The key is a date and the value is the date 9 months later
+
+    @staticmethod
+    def day_number(date):
+        '''Returns the date as the number YYYYMMDD, or None for a missing or illegitimate date'''
+        return date.year * 10000 + date.month * 100 + date.day if isinstance(date, datetime.date) else None
+
+    @classmethod
+    def years(cls, birth, date):
+        '''Returns the whole years from the birth to the date, or "NA" if either is not a legitimate date'''
+        birth, date = cls.day_number(birth), cls.day_number(date)
+        return (date - birth) // 10000 if birth is not None and date is not None else "NA"
+
+    def alive(self, ID):
+        '''Returns True if the individual has no death date and a birthday that is not illegitimate, like check_alive'''
+        individual = self.individuals[ID]
+        return individual.death is None and individual.birth != "ILLEGITIMATE"
+
+    def age(self, ID):
+        '''Returns the age of the individual on the as-of date, or on the death date if they died'''
+        if ID not in self._ages:
+            individual = self.individuals[ID]
+            self._ages[ID] = self.years(individual.birth, self.as_of if self.alive(ID) else individual.death)
+        return self._ages[ID]
+
+    def marriage_ages(self, fam):
+        '''Returns the ages of the husband and the wife on the marriage date of the family, like calculateAge2. A family without a marriage date uses their ages on the as-of date instead.'''
+        if fam not in self._marriage_ages:
+            family = self.family[fam]
+            self._marriage_ages[fam] = tuple(self.age(spouse) if family.marriage == "NA" else self.years(self.individuals[spouse].birth, family.marriage) for spouse in (family.husband, family.wife))
+        return self._marriage_ages[fam]
+
+    def after_9_months(self, date):
+        '''Returns the date 9 months after the date for US08 and US09'''
+        if date not in self._after_9_months:
+            self._after_9_months[date] = add_months(date, 9)
+        return self._after_9_months[date]
+
+class DuplicateFinder:
+    '''This class finds individuals that are probably the same person entered twice, such as "Jon /Snow/" born 25 APR 0283 and "John /Snow/" born 26 APR 0283. The individuals are put into blocks by the Soundex code of their surname and each block is sorted by birthday, so only the individuals of a block that were born at most max_days apart are compared instead of every pair. A pair scores the similarity of the two given names times the similarity of the two surnames times how close the birthdays are, and the pairs that score at least threshold are joined into clusters. Individuals without a legitimate birthday or without a name are not compared, and individuals with a different known sex are never duplicates.'''
+    def __init__(self, individual_dict, threshold = 0.7, max_days = 31):
+        self.individuals = individual_dict
+        self.threshold = threshold
+        self.max_days = max_days
+        self.blocks = defaultdict(list) #The key is the Soundex code of the surname and the value is the list of (birth ordinal, IndiID) pairs in that block
+        for ID, individual in individual_dict.items():
+            if isinstance(individual.birth, datetime.date) and self.named(individual): #Unnamed individuals would all share the "" block with the same empty names
+                self.blocks[soundex(split_name(individual.name)[1])].append((individual.birth.toordinal(), ID))
+        for block in self.blocks.values():
+            block.sort()
+
+    @staticmethod
+    def named(individual):
+        '''Returns whether the individual has a name, which is not the case for an individual without a NAME line that still has "NA" or a name with no given name or surname'''
+        return individual.name != "NA" and any(split_name(individual.name))
+
+    def score(self, first, second):
+        '''Returns how likely it is that the individuals first and second are the same person, from 0 to 1'''
+        import difflib #Only needed when looking for duplicates
+        first, second = self.individuals[first], self.individuals[second]
+        if not (self.named(first) and self.named(second)):
+            return 0.0
+        if first.sex != second.sex and "NA" not in (first.sex, second.sex):
+            return 0.0
+        days = abs(first.birth.toordinal() - second.birth.toordinal())
+        if days > self.max_days:
+            return 0.0
+        matchers = [difflib.SequenceMatcher(None, first_name.lower(), second_name.lower()) for first_name, second_name in zip(split_name(first.name), split_name(second.name)) if first_name or second_name] #The given names and surnames are compared on their own so that a shared surname does not make siblings look alike
+        score = 1 - days / (self.max_days + 1)
+        for matcher in matchers:
+            score *= matcher.quick_ratio()
+        if score < self.threshold: #quick_ratio is never less than ratio, so the pair cannot reach the threshold
+            return 0.0
+        score = 1 - days / (self.max_days + 1)
+        for matcher in matchers:
+            score *= matcher.ratio()
+        return score
+
+    def pairs(self):
+        '''Yields a (score, IndiID, IndiID) tuple for each pair of individuals in the same block that scores at least threshold'''
+        for block in self.blocks.values():
+            for position, (birth, ID) in enumerate(block):
+                for later in range(position + 1, len(block)):
+                    other_birth, other = block[later]
+                    if other_birth - birth > self.max_days: #The block is sorted by birthday, so the rest are even further apart
+                        break
+                    score = self.score(ID, other)
+                    if score >= self.threshold:
+                        yield score, ID, other
+
+    def clusters(self):
+        '''Returns a list of (score, IndiIDs) tuples, one for each group of individuals that are joined by pairs that score at least threshold. The score of a cluster is the score of its best pair and the IndiIDs are in the order of the individuals. The clusters with the best score come first.'''
+        parent = dict() #Joins the individuals of a pair, the root of each cluster is its own parent
+        def root(ID):
+            while parent[ID] != ID:
+                parent[ID] = parent[parent[ID]] #Halves the path each time so that long chains stay short
+                ID = parent[ID]
+            return ID
+        pairs = list(self.pairs())
+        for score, first, second in pairs:
+            parent.setdefault(first, first)
+            parent.setdefault(second, second)
+            parent[root(second)] = root(first)
+        best, members = defaultdict(float), defaultdict(list)
+        for score, first, second in pairs:
+            best[root(first)] = max(best[root(first)], score)
+        for ID in self.individuals:
+            if ID in parent:
+                members[root(ID)].append(ID)
+        return sorted(((best[ID], IDs) for ID, IDs in members.items()), key = lambda cluster: -cluster[0]) #sorted is stable, so clusters with the same score stay in the order of their first individual
+
+class ColumnarStore:
+    '''This class stores the individuals and families in columns instead of one object per record. Every ID is interned and given an ID number once, the ID columns hold those numbers, the dates are stored as ordinals and the sex as a small code in arrays. The individuals and family attributes are mappings of views with the same attributes as the Individual and Family classes, so the checks can run on the store without changes or read the columns directly.'''
+    def __init__(self, individual_dict, family_dict):
+        self.ids = [] #The ID for each ID number
+        self.id_numbers = dict() #The key is the ID and the value is its ID number
+        self.individual_rows = dict() #The key is the IndiID and the value is its row in the individual columns
+        self.family_rows = dict() #The key is the FamID and the value is its row in the family columns
+        self.sex_codes = ["NA", "M", "F"] #The sex for each sex code
+        self.names = []
+        self.sexes = array.array("b")
+        self.births = array.array("i") #Dates are stored as ordinals, with NO_DATE for a missing date and ILLEGITIMATE_DATE for an illegitimate one
+        self.deaths = array.array("i")
+        self.ages = array.array("i")
+        self.alive = array.array("b")
+        self.famc = array.array("i") #ID columns hold ID numbers, with NO_ID for "NA"
+        self.fams = [] #A tuple of ID numbers for each individual, or None once the empty set was replaced with "NA" for the table
+        self.marriages = array.array("i")
+        self.divorces = array.array("i")
+        self.husbands = array.array("i")
+        self.wives = array.array("i")
+        self.children = [] #A tuple of ID numbers for each family
+        for ID, individual in individual_dict.items():
+            self.add_individual(ID, individual)
+        for ID, family in family_dict.items():
+            self.add_family(ID, family)
+        self.individuals = ColumnarMapping(self, self.individual_rows, IndividualView) #Used in place of the individuals dictionary of Read_GEDCOM
+        self.family = ColumnarMapping(self, self.family_rows, FamilyView) #Used in place of the family dictionary of Read_GEDCOM
+
+    def add_individual(self, ID, individual):
+        '''Adds a row for the Individual to the individual columns'''
+        self.individual_rows[ID] = len(self.names)
+        self.number(ID)
+        self.names.append(individual.name)
+        self.sexes.append(self.sex_code(individual.sex))
+        self.births.append(self.ordinal(individual.birth))
+        self.deaths.append(self.ordinal(individual.death))
+        self.ages.append(self.age_code(individual.age))
+        self.alive.append(individual.alive)
+        self.famc.append(self.number(individual.famc))
+        self.fams.append(self.numbers(individual.fams))
+
+    def add_family(self, ID, family):
+        '''Adds a row for the Family to the family columns'''
+        self.family_rows[ID] = len(self.children)
+        self.number(ID)
+        self.marriages.append(self.ordinal(family.marriage))
+        self.divorces.append(self.ordinal(family.divorce))
+        self.husbands.append(self.number(family.husband))
+        self.wives.append(self.number(family.wife))
+        self.children.append(self.numbers(family.children))
+
+    def number(self, ID):
+        '''Returns the ID number of the ID, giving it the next number the first time it is seen'''
+        if ID == "NA":
+            return NO_ID
+        number = self.id_numbers.get(ID)
+        if number is None:
+            number = self.id_numbers[sys.intern(ID)] = len(self.ids)
+            self.ids.append(sys.intern(ID))
+        return number
+
+    def id(self, number):
+        '''Returns the ID for the ID number'''
+        return self.ids[number] if number != NO_ID else "NA"
+
+    def numbers(self, IDs):
+        '''Returns a tuple of the ID numbers of a set of IDs. The set is "NA" when the table replaced an empty set'''
+        if IDs == "NA":
+            return None
+        return tuple(self.number(ID) for ID in IDs)
+
+    def id_set(self, numbers):
+        '''Returns the set of IDs for a tuple of ID numbers'''
+        if numbers is None:
+            return "NA"
+        return {self.ids[number] for number in numbers}
+
+    def sex_code(self, sex):
+        '''Returns the code of the sex, adding it to the sex codes the first time it is seen'''
+        if sex not in self.sex_codes:
+            self.sex_codes.append(sex)
+        return self.sex_codes.index(sex)
+
+    def sex(self, code):
+        '''Returns the sex for the sex code'''
+        return self.sex_codes[code]
+
+    @staticmethod
+    def ordinal(date):
+        '''Returns the ordinal that is stored in a date column for a date, "ILLEGITIMATE", None or "NA"'''
+        if date == "ILLEGITIMATE":
+            return ILLEGITIMATE_DATE
+        elif date is None or date == "NA":
+            return NO_DATE
+        return date.toordinal()
+
+    @staticmethod
+    def date(ordinal):
+        '''Returns the birth or death date for an ordinal, where a missing date is None'''
+        if ordinal > 0:
+            return datetime.date.fromordinal(ordinal)
+        return "ILLEGITIMATE" if ordinal == ILLEGITIMATE_DATE else None
+
+    @staticmethod
+    def family_date(ordinal):
+        '''Returns the marriage or divorce date for an ordinal, where a missing date is "NA"'''
+        if ordinal > 0:
+            return datetime.date.fromordinal(ordinal)
+        return "ILLEGITIMATE" if ordinal == ILLEGITIMATE_DATE else "NA"
+
+    def age_code(self, age):
+        '''Returns the value that is stored in the ages column for an age or "NA"'''
+        return NO_AGE if age == "NA" else age
+
+    def age(self, code):
+        '''Returns the age or "NA" for a value of the ages column'''
+        return "NA" if code == NO_AGE else code
+
+    def flag(self, code):
+        '''Returns True or False for a value of the alive column'''
+        return bool(code)
+
+    def same(self, value):
+        '''Returns the value unchanged for the columns that store the value itself'''
+        return value
+
+    def numpy_column(self, column):
+        '''Returns one of the array columns such as "births" as a NumPy array that shares its memory, so checks can compare a whole column at once. NumPy is only imported when this is called.'''
+        import numpy
+        values = getattr(self, column)
+        return numpy.frombuffer(values, dtype = numpy.dtype(values.typecode)) if len(values) else numpy.zeros(0, dtype = numpy.dtype(values.typecode))
+
+def column_property(column, decode, encode):
+    '''Returns a property that reads and writes the value in the view's row of a column of the store, converting it with the decode and encode methods of the store'''
+    def get(view):
+        return getattr(view.store, decode)(getattr(view.store, column)[view.row])
+    def set(view, value):
+        getattr(view.store, column)[view.row] = getattr(view.store, encode)(value)
+    return property(get, set)
+
+class IndividualView(Individual):
+    '''This is an Individual whose attributes are read from and written to its row of a ColumnarStore'''
+    __slots__ = ("store", "row")
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    name = column_property("names", "same", "same")
+    sex = column_property("sexes", "sex", "sex_code")
+    birth = column_property("births", "date", "ordinal")
+    death = column_property("deaths", "date", "ordinal")
+    age = column_property("ages", "age", "age_code")
+    alive = column_property("alive", "flag", "same")
+    famc = column_property("famc", "id", "number")
+    fams = column_property("fams", "id_set", "numbers")
+
+class FamilyView(Family):
+    '''This is a Family whose attributes are read from and written to its row of a ColumnarStore'''
+    __slots__ = ("store", "row")
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    marriage = column_property("marriages", "family_date", "ordinal")
+    divorce = column_property("divorces", "family_date", "ordinal")
+    husband = column_property("husbands", "id", "number")
+    wife = column_property("wives", "id", "number")
+    children = column_property("children", "id_set", "numbers")
+
+class ColumnarMapping(collections.abc.Mapping):
+    '''This is a read only dictionary from ID to the view of that ID's row in a ColumnarStore'''
+    def __init__(self, store, rows, view):
+        self.store = store
+        self.rows = rows
+        self.view = view
+
+    def __getitem__(self, ID):
+        return self.view(self.store, self.rows[ID])
+
+    def __contains__(self, ID):
+        return ID in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+class DateColumns:
+    '''This class holds the dates of a ColumnarStore as NumPy datetime64[D] columns for the vectorized date rules. Missing and illegitimate dates are NaT in the date columns and are told apart with the ordinal columns. The families are joined to the rows of their spouses and children. Each rule returns the same IDs or errors as its loop version, or None when the dates of the file would make the loop version raise, so that the loop version can run instead and raise the same error.'''
+    def __init__(self, store):
+        import numpy #NumPy is only needed when vectorized = True
+        self.numpy = numpy
+        self.store = store
+        self.individual_ids = list(store.individual_rows)
+        self.family_ids = list(store.family_rows)
+        self.birth_ordinals, self.births = self.date_column(store.births)
+        self.death_ordinals, self.deaths = self.date_column(store.deaths)
+        self.marriage_ordinals, self.marriages = self.date_column(store.marriages)
+        self.divorce_ordinals, self.divorces = self.date_column(store.divorces)
+        individual_row = numpy.full(len(store.ids) + 1, -1, dtype = numpy.int64) #The row of each ID number, where the last entry is for NO_ID so "NA" has no row
+        individual_row[[store.id_numbers[ID] for ID in self.individual_ids]] = numpy.arange(len(self.individual_ids))
+        family_row = numpy.full(len(store.ids) + 1, -1, dtype = numpy.int64)
+        family_row[[store.id_numbers[ID] for ID in self.family_ids]] = numpy.arange(len(self.family_ids))
+        self.husband_rows = individual_row[numpy.array(store.husbands, dtype = numpy.int64)]
+        self.wife_rows = individual_row[numpy.array(store.wives, dtype = numpy.int64)]
+        self.child_families, self.child_rows = self.join(store.children, individual_row) #One entry for each child of each family, in the order the checks go through them
+        self.spouse_individuals, self.spouse_families = self.join(store.fams, family_row) #One entry for each spouse family of each individual
+
+    def date_column(self, ordinals):
+        '''Returns the ordinals of a date column of the store and the same dates as datetime64[D], where missing and illegitimate dates are NaT'''
+        numpy = self.numpy
+        ordinals = numpy.array(ordinals, dtype = numpy.int64)
+        dates = (ordinals - datetime.date(1970, 1, 1).toordinal()).astype("datetime64[D]")
+        dates[ordinals <= 0] = numpy.datetime64("NaT")
+        return ordinals, dates
+
+    def join(self, groups, row):
+        '''Flattens a column of ID number tuples into the row that each tuple belongs to and the row of each ID number in it (-1 when the ID has no row)'''
+        numpy = self.numpy
+        lengths = numpy.array([len(group) if group is not None else 0 for group in groups], dtype = numpy.int64)
+        numbers = numpy.fromiter((number for group in groups if group is not None for number in group), dtype = numpy.int64, count = int(lengths.sum()))
+        return numpy.repeat(numpy.arange(len(groups)), lengths), row[numbers]
+
+    def date(self, ordinal):
+        '''Returns the date for an ordinal the same way the Individual and Family attributes hold it'''
+        return self.store.date(int(ordinal))
+
+    def year_month_day(self, dates):
+        '''Returns the year, month and day of each date in a datetime64[D] column'''
+        numpy = self.numpy
+        months = dates.astype("datetime64[M]")
+        return dates.astype("datetime64[Y]").astype(numpy.int64) + 1970, months.astype(numpy.int64) % 12 + 1, (dates - months.astype("datetime64[D]")).astype(numpy.int64) + 1
+
+    def add_months(self, dates, count):
+        '''Adds a number of months to each date like relativedelta does, using the last day of the month when the day does not exist in it'''
+        numpy = self.numpy
+        months = dates.astype("datetime64[M]") + count
+        month_start = months.astype("datetime64[D]")
+        days_in_month = ((months + 1).astype("datetime64[D]") - month_start).astype(numpy.int64)
+        days = (dates - dates.astype("datetime64[M]").astype("datetime64[D]")).astype(numpy.int64)
+        return month_start + numpy.minimum(days, days_in_month - 1)
+
+    def age_on(self, births, dates):
+        '''Returns the age in whole years on each date of a person born on the matching birth date, like calculateAge2'''
+        birth_year, birth_month, birth_day = self.year_month_day(births)
+        year, month, day = self.year_month_day(dates)
+        return year - birth_year - (month * 32 + day < birth_month * 32 + birth_day)
+
+    def checkDatesAfterToday(self, output, today):
+        '''US01 with one comparison per date column'''
+        if (self.birth_ordinals == NO_DATE).any() or (self.marriage_ordinals == NO_DATE).any(): #A missing birth or marriage date cannot be compared with today
+            return None
+        today = self.numpy.datetime64(today, "D")
+        births, deaths = self.births > today, self.deaths > today
+        marriages, divorces = self.marriages > today, self.divorces > today
+        idList = []
+        with output as f:
+            for row in self.numpy.flatnonzero(births | deaths):
+                ind = self.individual_ids[row]
+                if births[row]:
+                    print(f"ERROR: INDIVIDUAL: {ind} US01: Birthday {self.date(self.birth_ordinals[row])} occurs in the future", file=f)
+                    idList.append(ind)
+                if deaths[row]:
+                    print(f"ERROR: INDIVIDUAL: {ind} US01: Death {self.date(self.death_ordinals[row])} occurs in the future", file=f)
+                    idList.append(ind)
+            for row in self.numpy.flatnonzero(marriages | divorces):
+                fam = self.family_ids[row]
+                if marriages[row]:
+                    print(f"ERROR: FAMILY: {fam} US01: Marriage {self.store.family_date(int(self.marriage_ordinals[row]))} occurs in the future", file=f)
+                    idList.append(fam)
+                if divorces[row]:
+                    print(f"ERROR: FAMILY: {fam} US01: Divorce {self.store.family_date(int(self.divorce_ordinals[row]))} occurs in the future", file=f)
+                    idList.append(fam)
+        return idList
+
+    def checkBirthAfterMarriage(self, output):
+        '''US02 with one comparison for every spouse family of every individual'''
+        if (self.spouse_families == -1).any(): #A spouse family that was never read
+            return None
+        births = self.birth_ordinals[self.spouse_individuals]
+        marriages = self.marriage_ordinals[self.spouse_families]
+        compared = (births != ILLEGITIMATE_DATE) & (marriages != ILLEGITIMATE_DATE)
+        if (compared & ((births == NO_DATE) | (marriages == NO_DATE))).any():
+            return None
+        idList = []
+        with output as f:
+            for pair in self.numpy.flatnonzero(compared & (self.births[self.spouse_individuals] > self.marriages[self.spouse_families])):
+                row, fam_row = self.spouse_individuals[pair], self.spouse_families[pair]
+                ind = self.individual_ids[row]
+                sex = "Husband's" if self.store.sex(self.store.sexes[row]) == "M" else "Wife's"
+                print(f"ERROR: FAMILY: {self.family_ids[fam_row]} US02: {sex} ({ind}) birthday {self.date(self.birth_ordinals[row])} occurs after marriage {self.date(self.marriage_ordinals[fam_row])}", file=f)
+                idList.append(ind)
+        return idList
+
+    def birth_before_death(self):
+        '''US03 with one comparison of the death and birth columns'''
+        compared = (self.death_ordinals > 0) & (self.birth_ordinals != ILLEGITIMATE_DATE)
+        if (compared & (self.birth_ordinals == NO_DATE)).any():
+            return None
+        return [f"ERROR: INDIVIDUAL: US03: {self.store.names[row]}'s death occurs on {self.date(self.death_ordinals[row])} which is before their birth on {self.date(self.birth_ordinals[row])}" for row in self.numpy.flatnonzero(compared & (self.deaths < self.births))]
+
+    def marriage_before_divorce(self):
+        '''US04 with one comparison of the divorce and marriage columns'''
+        compared = (self.divorce_ordinals > 0) & (self.marriage_ordinals != ILLEGITIMATE_DATE)
+        if (compared & (self.marriage_ordinals == NO_DATE)).any():
+            return None
+        rows = self.numpy.flatnonzero(compared & (self.divorces < self.marriages))
+        if (self.husband_rows[rows] == -1).any() or (self.wife_rows[rows] == -1).any():
+            return None
+        return [f"ERROR: FAMILY: US04: {self.store.names[self.husband_rows[row]]} and {self.store.names[self.wife_rows[row]]} divorce occurs on {self.store.family_date(int(self.divorce_ordinals[row]))} which is before their marriage on {self.store.family_date(int(self.marriage_ordinals[row]))}" for row in rows]
+
+    def less_than_150_years_old(self, output, today):
+        '''US07 with the age of every individual computed at once like AgeEngine does, on today for the living and on the death date for the others'''
+        numpy = self.numpy
+        living = (self.death_ordinals == NO_DATE) & (self.birth_ordinals != ILLEGITIMATE_DATE)
+        known = (self.birth_ordinals > 0) & (living | (self.death_ordinals > 0))
+        ages = self.age_on(self.births, numpy.where(living, numpy.datetime64(today, "D"), self.deaths))
+        idList = []
+        with output as f:
+            for row in numpy.flatnonzero(known & (ages >= 150)):
+                idList.append(self.individual_ids[row])
+                print(f"ERROR: INDIVIDUAL: US07 {self.store.names[row]} age is {ages[row]} which is older than 150 years old.", file=f)
+        return idList
+
+    def birthBeforeDeathOfParents(self, output):
+        '''US09 with the mother's death and 9 months after the father's death joined to each child'''
+        if (self.husband_rows == -1).any() or (self.wife_rows == -1).any() or (self.child_rows == -1).any():
+            return None
+        if (self.death_ordinals[self.husband_rows] == ILLEGITIMATE_DATE).any(): #9 months cannot be added to an illegitimate death
+            return None
+        mother_deaths = self.death_ordinals[self.wife_rows][self.child_families]
+        father_deaths = self.death_ordinals[self.husband_rows][self.child_families]
+        if (mother_deaths == ILLEGITIMATE_DATE).any() or (((mother_deaths != NO_DATE) | (father_deaths != NO_DATE)) & (self.birth_ordinals[self.child_rows] <= 0)).any():
+            return None
+        births = self.births[self.child_rows]
+        late = ((mother_deaths > 0) & (births > self.deaths[self.wife_rows][self.child_families])) | ((father_deaths > 0) & (births > self.add_months(self.deaths[self.husband_rows], 9)[self.child_families]))
+        idList = []
+        with output as f:
+            for pair in self.numpy.flatnonzero(late):
+                childID = self.individual_ids[self.child_rows[pair]]
+                print(f"ERROR: US09: FAMILY: Child {childID} of Family {self.family_ids[self.child_families[pair]]} is not born before death of their mother or before 9 months after the death of their father.", file = f)
+                idList.append(childID)
+        return idList
+
+    def marriageAfter14(self, output):
+        '''US10 with the age of both spouses on the marriage date computed at once'''
+        married = self.marriage_ordinals != ILLEGITIMATE_DATE
+        if (self.marriage_ordinals == NO_DATE).any() or (married & ((self.husband_rows == -1) | (self.wife_rows == -1))).any(): #A missing marriage date makes calculateAge2 use today instead
+            return None
+        if (married & ((self.birth_ordinals[self.husband_rows] <= 0) | (self.birth_ordinals[self.wife_rows] <= 0))).any():
+            return None
+        young = married & ((self.age_on(self.births[self.husband_rows], self.marriages) < 14) | (self.age_on(self.births[self.wife_rows], self.marriages) < 14))
+        idList = []
+        with output as f:
+            for row in self.numpy.flatnonzero(young):
+                idList.append(self.family_ids[row])
+                print(f"WARNING: FAMILY: US10: {self.family_ids[row]}: One or both spouses were less than 14 years old at the time of marriage.", file = f)
+        return idList
+
+class SQLiteRecords(collections.abc.Mapping):
+    '''This is the individuals or family mapping of a run with a SQLiteStore. The IDs are read from the table in the order of the file and the records are only read from the database the first time one of them is looked up, a page of records that are next to each other in the file at a time, and kept after that so that what the checks set on them stays.'''
+    PAGE_SIZE = 1024 #How many records are read together, which makes a check that goes through every record read a page at a time instead of one record at a time
+
+    def __init__(self, database, table):
+        self.database = database
+        self.table = table
+        self.IDs = {sys.intern(ID): position for ID, position in database.execute(f"SELECT id, position FROM {table} ORDER BY position")} #Keeps the order of the file
+        self.records = dict() #The key is the ID and the value is the record read from the database
+
+    def __getitem__(self, ID):
+        if ID not in self.records:
+            first = self.IDs[ID] - self.IDs[ID] % self.PAGE_SIZE #Raises a KeyError for an ID that is not in the file
+            for pageID, record in self.database.page(self.table, first, first + self.PAGE_SIZE).items():
+                self.records.setdefault(pageID, record) #The records that were already read keep what was set on them
+        return self.records[ID]
+
+    def __contains__(self, ID):
+        return ID in self.IDs
+
+    def __iter__(self):
+        return iter(self.IDs)
+
+    def __len__(self):
+        return len(self.IDs)
+
+class SQLiteStore:
+    '''This class keeps the individuals and families of one GEDCOM file in a SQLite database file, so the cross-record checks run as SQL joins on indexes that stay on disk between runs instead of on a GEDCOM_Index and Kinship built in memory. The records are written with executemany in one transaction, and the database remembers the path, size and modification time of the file it holds, so the next run of the same file loads the records from it instead of reading the file again. Reading another file replaces what the database holds. Dates are stored as ordinals like in a ColumnarStore and "NA" IDs as NULL. The lineage table holds the famc family and the parents of each individual, which is one generation up like in Kinship, and the generation2 view joins it with itself for the grandparents. The database can be opened with sqlite3 for other queries, for example "SELECT id FROM individuals WHERE birth > ?".
+    The checks return the same IDs and write the same errors as the loops of Read_GEDCOM with the tables made. A family with a husband, wife or spouse family that is not in the file is skipped where the loop raises a KeyError, and the spouse families of an individual are gone through in the order of their IDs where the loop uses the order of a set.'''
+    TABLES = ("source", "individuals", "families", "spouses", "children", "lineage")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS source (path TEXT, size INTEGER, modified INTEGER, parser INTEGER, parsed BLOB);
+        CREATE TABLE IF NOT EXISTS individuals (id TEXT PRIMARY KEY, position INTEGER, name TEXT, sex TEXT, birth INTEGER, death INTEGER, famc TEXT);
+        CREATE TABLE IF NOT EXISTS families (id TEXT PRIMARY KEY, position INTEGER, marriage INTEGER, divorce INTEGER, husband TEXT, wife TEXT);
+        CREATE TABLE IF NOT EXISTS spouses (individual TEXT, family TEXT, position INTEGER, PRIMARY KEY (individual, family)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS children (family TEXT, individual TEXT, position INTEGER, PRIMARY KEY (family, individual)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS lineage (individual TEXT, ancestor TEXT, parent INTEGER, PRIMARY KEY (individual, ancestor)) WITHOUT ROWID;
+        CREATE VIEW IF NOT EXISTS generation2 AS SELECT up.individual, grand.ancestor FROM lineage up JOIN lineage grand ON grand.individual = up.ancestor WHERE up.parent;
+    """
+    #The indexes are dropped before a file is written and made again after, which is faster than updating them for every row
+    INDEXES = {
+        "individuals_position": "individuals (position)",
+        "families_position": "families (position)",
+        "individuals_famc": "individuals (famc)",
+        "individuals_name": "individuals (name)",
+        "individuals_birth": "individuals (birth)",
+        "spouses_family": "spouses (family)",
+        "children_individual": "children (individual)",
+        "families_husband": "families (husband, marriage)",
+        "families_wife": "families (wife)",
+        "lineage_ancestor": "lineage (ancestor)",
+    }
+    CHECKS = frozenset(["noMarriagesToChildren", "correspondingEntries", "uniqueFamiliesBySpouses", "firstCousinsShouldNotMarry", "auntsAndUncles", "noBigamy", "noSiblingMarriage"]) #The methods of Read_GEDCOM that run as SQL when a run has a database
+
+    def __init__(self, path):
+        import sqlite3 #Only imported by the runs that use a database
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != DATABASE_VERSION: #Tables made by another version are made again
+            self.connection.executescript("DROP VIEW IF EXISTS generation2;" + "".join(f"DROP TABLE IF EXISTS {table};" for table in self.TABLES) + self.SCHEMA + f"PRAGMA user_version = {DATABASE_VERSION};")
+
+    def close(self):
+        self.connection.close()
+
+    def execute(self, sql, parameters = ()):
+        '''Runs a query on the database and returns the cursor with its rows'''
+        return self.connection.execute(sql, parameters)
+
+    def key(self, path):
+        '''Returns the (path, size, modification time, PARSER_VERSION) of the GEDCOM file, which changes whenever the file or the parser change'''
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Can't open {path}!")
+        return (os.path.realpath(path), stat.st_size, stat.st_mtime_ns, PARSER_VERSION)
+
+    def parsed(self, key):
+        '''Returns the illegitimate date and non unique ID lists saved with the records when the database holds the file with the key, or None if it does not'''
+        row = self.execute("SELECT parsed FROM source WHERE path = ? AND size = ? AND modified = ? AND parser = ?", key).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def load(self, key, individual_dict, family_dict, parsed):
+        '''Replaces the records in the database with the individuals and families of the file with the key in one transaction and makes the indexes again'''
+        with self.connection: #Commits at the end, or rolls everything back if writing fails
+            for name in self.INDEXES:
+                self.execute(f"DROP INDEX IF EXISTS {name}")
+            for table in self.TABLES:
+                self.execute(f"DELETE FROM {table}")
+            self.connection.executemany("INSERT INTO individuals VALUES (?, ?, ?, ?, ?, ?, ?)", ((ID, position, individual.name, individual.sex, ColumnarStore.ordinal(individual.birth), ColumnarStore.ordinal(individual.death), self.reference(individual.famc)) for position, (ID, individual) in enumerate(individual_dict.items())))
+            self.connection.executemany("INSERT INTO families VALUES (?, ?, ?, ?, ?, ?)", ((ID, position, ColumnarStore.ordinal(family.marriage), ColumnarStore.ordinal(family.divorce), self.reference(family.husband), self.reference(family.wife)) for position, (ID, family) in enumerate(family_dict.items())))
+            self.connection.executemany("INSERT INTO spouses VALUES (?, ?, ?)", ((ID, fam, position) for ID, individual in individual_dict.items() if individual.fams != "NA" for position, fam in enumerate(individual.fams)))
+            self.connection.executemany("INSERT INTO children VALUES (?, ?, ?)", ((ID, child, position) for ID, family in family_dict.items() for position, child in enumerate(family.children)))
+            self.execute("INSERT OR IGNORE INTO lineage SELECT child.id, family.id, 0 FROM individuals child JOIN families family ON family.id = child.famc")
+            self.execute("INSERT OR IGNORE INTO lineage SELECT child.id, parent.id, 1 FROM individuals child JOIN families family ON family.id = child.famc JOIN individuals parent ON parent.id IN (family.husband, family.wife)") #Only the parents that are in the file like in Kinship
+            for name, columns in self.INDEXES.items():
+                self.execute(f"CREATE INDEX {name} ON {columns}")
+            self.execute("INSERT INTO source VALUES (?, ?, ?, ?, ?)", (*key, pickle.dumps(parsed, protocol = pickle.HIGHEST_PROTOCOL)))
+            self.execute("ANALYZE") #Statistics for the query planner to choose the indexes
+
+    @staticmethod
+    def reference(ID):
+        '''Returns the value stored for an IndiID or FamID, where "NA" is NULL'''
+        return None if ID == "NA" else ID
+
+    def records(self):
+        '''Returns the individuals and families mappings of the file the database holds, in the order of the file. The records stay in the database and each is read the first time it is looked up, so a run only builds the records that its checks and tables use.'''
+        return SQLiteRecords(self, "individuals"), SQLiteRecords(self, "families")
+
+    def page(self, table, first, last):
+        '''Reads the individuals or families with a position in the file from first up to last from the database and returns them by ID, with "NA" for no spouse family like a run holds it'''
+        records = dict()
+        if table == "individuals":
+            for ID, name, sex, birth, death, famc in self.execute("SELECT id, name, sex, birth, death, famc FROM individuals WHERE position >= ? AND position < ?", (first, last)):
+                records[sys.intern(ID)] = Individual(name, sex, ColumnarStore.date(birth), death = ColumnarStore.date(death), famc = sys.intern(famc) if famc is not None else "NA")
+            for ID, fam in self.execute("SELECT s.individual, s.family FROM individuals i JOIN spouses s ON s.individual = i.id WHERE i.position >= ? AND i.position < ? ORDER BY s.individual, s.position", (first, last)):
+                records[ID].fams.add(sys.intern(fam))
+            for individual in records.values():
+                if individual.fams == set():
+                    individual.fams = "NA"
+        else:
+            for ID, marriage, divorce, husband, wife in self.execute("SELECT id, marriage, divorce, husband, wife FROM families WHERE position >= ? AND position < ?", (first, last)):
+                family = records[sys.intern(ID)] = Family()
+                family.marriage = ColumnarStore.family_date(marriage)
+                family.divorce = ColumnarStore.family_date(divorce)
+                family.husband = sys.intern(husband) if husband is not None else "NA"
+                family.wife = sys.intern(wife) if wife is not None else "NA"
+            for fam, child in self.execute("SELECT c.family, c.individual FROM families f JOIN children c ON c.family = f.id WHERE f.position >= ? AND f.position < ? ORDER BY c.family, c.position", (first, last)):
+                records[fam].children.add(sys.intern(child))
+        return records
+
+    def noMarriagesToChildren(self, output):
+        '''US17 as a join of the spouse families of each individual with the children of those families'''
+        idList = []
+        with output as f:
+            for ID, name, sex, child in self.execute("""
+                    SELECT i.id, i.name, i.sex, c.individual FROM individuals i
+                    JOIN spouses s ON s.individual = i.id
+                    JOIN families f ON f.id = s.family
+                    JOIN children c ON c.family = f.id AND c.individual = (CASE i.sex WHEN 'M' THEN f.wife WHEN 'F' THEN f.husband END)
+                    ORDER BY i.position, s.family"""):
+                print(f"ERROR: INDIVIDUAL: {ID}. US17: No Marriage to Children; {name} has a {'wife' if sex == 'M' else 'husband'}: {child} who is also a child: {child}", file=f)
+                idList.append(ID)
+        return idList
+
+    def correspondingEntries(self, output):
+        '''US26 as the spouse families that do not have the individual as a spouse and the famc families that do not have the individual as a child'''
+        idList = []
+        with output as f:
+            for position, role, fam, ID in self.execute("""
+                    SELECT i.position, 'spouse', s.family, i.id FROM individuals i
+                    JOIN spouses s ON s.individual = i.id
+                    JOIN families f ON f.id = s.family
+                    WHERE f.husband IS NOT i.id AND f.wife IS NOT i.id
+                    UNION ALL
+                    SELECT i.position, 'child', i.famc, i.id FROM individuals i
+                    JOIN families f ON f.id = i.famc
+                    WHERE NOT EXISTS (SELECT 1 FROM children c WHERE c.family = f.id AND c.individual = i.id)
+                    ORDER BY 1, 2 DESC, 3"""):
+                print(f"WARNING: INDIVIDUAL: US26: {ID}: does not have corresponding entree as a {role} in family {fam}", file = f)
+                idList.append(ID)
+        return idList
+
+    def noSiblingMarriage(self, output):
+        '''US18 as the pairs of individuals with the same famc that share all of their spouse families, found through the spouses of each family. Each individual is reported with the first of them in the order of the file.'''
+        idList = []
+        with output as f:
+            for ID, sibling in self.execute("""
+                    WITH counts AS MATERIALIZED (SELECT individual, count(*) AS families FROM spouses GROUP BY individual),
+                    shared AS (SELECT sa.individual AS a, sb.individual AS b, count(*) AS families FROM spouses sa
+                        JOIN spouses sb ON sb.family = sa.family AND sb.individual != sa.individual
+                        GROUP BY sa.individual, sb.individual)
+                    SELECT shared.a, shared.b FROM shared
+                    JOIN counts ca ON ca.individual = shared.a AND ca.families = shared.families
+                    JOIN counts cb ON cb.individual = shared.b AND cb.families = shared.families
+                    JOIN individuals a ON a.id = shared.a
+                    JOIN individuals b ON b.id = shared.b AND b.famc IS a.famc
+                    ORDER BY a.position, b.position"""):
+                if not idList or idList[-1] != ID:
+                    print(f"WARNING: INDIVIDUAL: US18: {ID} and {sibling}: siblings should not marry", file = f)
+                    idList.append(ID)
+        return idList
+
+    def noBigamy(self, output):
+        '''US11 as a running count of the spouse families without a divorce of each individual'''
+        idList = []
+        with output as f:
+            for (ID,) in self.execute("""
+                    SELECT individual FROM (
+                        SELECT i.position, s.individual, s.family, sum(f.divorce = ?) OVER (PARTITION BY s.individual ORDER BY s.family) AS marriages
+                        FROM spouses s JOIN individuals i ON i.id = s.individual JOIN families f ON f.id = s.family)
+                    WHERE marriages > 1
+                    ORDER BY position, family""", (NO_DATE,)):
+                print(f"WARNING: INDIVIDUAL: US11: {ID}: No Bigamy", file = f)
+                idList.append(ID)
+        return idList
+
+    def uniqueFamiliesBySpouses(self, output):
+        '''US24 as a join of each family with the other families whose husband and wife have the same names and that have the same marriage date'''
+        with output as f:
+            idList = []
+            for fam, famo in self.execute("""
+                    SELECT f.id, o.id FROM families f
+                    JOIN individuals h ON h.id = f.husband
+                    JOIN individuals w ON w.id = f.wife
+                    JOIN individuals oh ON oh.name = h.name
+                    JOIN families o ON o.husband = oh.id AND o.marriage = f.marriage AND o.id != f.id
+                    JOIN individuals ow ON ow.id = o.wife AND ow.name = w.name
+                    ORDER BY f.position, o.position"""):
+                print(f"ERROR: US 24: {fam} and {famo} is an identical families", file=f)
+                idList.append(fam)
+            return idList
+
+    def firstCousinsShouldNotMarry(self, output):
+        '''US19 as the families where the husband and wife have a grandparent or the famc family of a parent in common'''
+        with output as f:
+            idList = []
+            for wife, husband in self.execute("""
+                    SELECT f.wife, f.husband FROM families f
+                    WHERE EXISTS (SELECT 1 FROM generation2 w JOIN generation2 h ON h.ancestor = w.ancestor WHERE w.individual = f.wife AND h.individual = f.husband)
+                    ORDER BY f.position"""):
+                idList.append(wife)
+                idList.append(husband)
+                print(f"ERROR: US19: {wife} and {husband} are first cousins", file=f)
+            idList = list(dict.fromkeys(idList))
+            return idList
+
+    def auntsAndUncles(self, output):
+        '''US20 as the families where a parent or the famc family of one spouse is a grandparent or the famc family of a parent of the other spouse'''
+        with output as f:
+            idList = []
+            for wife, husband in self.execute("""
+                    SELECT f.wife, f.husband FROM families f
+                    WHERE EXISTS (SELECT 1 FROM lineage h JOIN generation2 w ON w.ancestor = h.ancestor WHERE h.individual = f.husband AND w.individual = f.wife)
+                    OR EXISTS (SELECT 1 FROM lineage w JOIN generation2 h ON h.ancestor = w.ancestor WHERE w.individual = f.wife AND h.individual = f.husband)
+                    ORDER BY f.position"""):
+                idList.append(wife)
+                idList.append(husband)
+                print(f"ERROR: US20: AUNTS AND UNCLES {wife} and {husband} are related", file=f)
+            return idList
+
+class Check:
+    '''One entry of the check registry. It holds the user story that the check is for, the name of the Read_GEDCOM method that runs it, the fields of the individuals and families that the check reads ("today" for checks that depend on today's date), the tags that a Pipeline can select it by and what the check needs Read_GEDCOM to build before it runs ("index" for the GEDCOM_Index, "kinship" for the Kinship graph, "dates" for the DateColumns of a vectorized run and "references" for the husband and wife of a family). A check that reads None is always run again by an incremental run.'''
+    __slots__ = ("story", "method", "reads", "tags", "needs")
+    def __init__(self, story, method, reads = None, tags = "", needs = ""):
+        self.story = story
+        self.method = method
+        self.reads = frozenset(reads.split()) if reads is not None else None
+        self.tags = frozenset(tags.split())
+        self.needs = frozenset(needs.split())
+
+    def run(self, reader):
+        '''Runs the check on the Read_GEDCOM and returns what its method returns. The check is measured when the Read_GEDCOM has a profiler.'''
+        if reader.profiler is None:
+            return getattr(reader, self.method)()
+        return reader.profiler.run_check(reader, self)
+
+    def __repr__(self):
+        return f"Check({self.story!r}, {self.method!r})"
+
+#The checks that Read_GEDCOM runs after reading the file, in the order their output is written. The tags are error, warning and list for what a check writes, parse for the checks that report what was found while parsing and local for the checks that only read one record and the individuals a family refers to, which a StreamingGEDCOM runs while it reads the file. An age or alive value is read as birth, death and today because check_alive works them out from those
+CHECKS = [
+    Check("US15", "fewerThan15Siblings", "children", "warning"),
+    Check("US01", "checkDatesAfterToday", "birth death marriage divorce today", "error local", "dates"),
+    Check("US02", "checkBirthAfterMarriage", "fams birth sex marriage", "error", "dates"),
+    Check("US17", "noMarriagesToChildren", "fams children sex husband wife name", "error"),
+    Check("US32", "listMultipleBirths", "famc birth name", "list", "index"),
+    Check("US37", "listRecentSurvivors", "death today fams sex husband wife children name", "list"),
+    Check("US10", "marriageAfter14", "marriage husband wife birth death today", "warning", "dates"),
+    Check("US14", "birthsLessThanFive", "children birth", "error", "index"),
+    Check("US25", "uniqueFirstNameInFamily", "famc birth name", "error", "index"),
+    Check("US28", "orderSiblingsByAge", "children birth death today", "list", "index"),
+    Check("US26", "correspondingEntries", "famc fams husband wife children", "warning"),
+    Check("US21", "correctGenderForRole", "husband wife sex", "error local", "references"),
+    Check("US16", "maleLastNames", "husband children sex name", "warning"),
+    Check("US13", "siblingSpacing", "children birth name", "error", "index"),
+    Check("US24", "uniqueFamiliesBySpouses", "husband wife name marriage", "error", "index"),
+    Check("US34", "listLargeAgeDifferences", "marriage husband wife birth death today", "error"),
+    Check("US19", "firstCousinsShouldNotMarry", "husband wife famc", "error", "kinship"),
+    Check("US20", "auntsAndUncles", "husband wife famc", "error", "kinship"),
+    Check("US42", "printIllegitimateDateErrors", None, "error parse local"),
+    Check("US12", "parentsNotTooOld", "husband wife children birth death today", "warning"),
+    Check("US39", "upcomingAnniversaries", "husband wife death marriage today", "list"),
+    Check("US35", "recentBirths", "birth name today", "list"),
+    Check("US09", "birthBeforeDeathOfParents", "husband wife children birth death", "error", "dates"),
+    Check("US29", "list_deceased", "death name", "list"),
+    Check("US30", "list_living_married", "divorce husband wife death name", "list"),
+    Check("US31", "list_living_single", "fams birth death name today", "list"),
+    Check("US07", "less_than_150_years_old", "birth death name today", "error local", "dates"),
+    Check("US38", "listUpcomingBirthdays", "birth death name today", "list"),
+    Check("US33", "listOrphans", "husband wife children birth death name today", "list"),
+    Check("US08", "birthBeforeMarriageOfParents", "divorce children birth marriage", "warning"),
+    Check("US22", "printNonUniqueIDsErrors", None, "error parse local"),
+    Check("US23", "uniqueNameAndBirthDate", "name birth", "error", "index"),
+    Check("US11", "noBigamy", "fams divorce", "warning"),
+    Check("US18", "noSiblingMarriage", "fams famc", "warning", "index"),
+]
+
+#The user stories that UserStories checks. A Pipeline selects them the same way as the checks in CHECKS, but their methods are the methods of UserStories
+USER_STORY_CHECKS = [
+    Check("US03", "birth_before_death", "birth death name", "error local", "dates"),
+    Check("US04", "marriage_before_divorce", "marriage divorce husband wife name", "error local", "dates references"),
+    Check("US05", "marriage_before_death", "marriage husband wife death name", "error"),
+    Check("US06", "divorce_before_death", "divorce husband wife death name", "error"),
+]
+
+#The selection of a Pipeline that only finds errors. None of these checks make a pretty table, so a run with ptables = False and these checks never imports prettytable
+CORE_CHECKS = ("error", "warning", "parse")
+
+class Pipeline:
+    '''The checks that a Read_GEDCOM runs after reading the file. The selection is a user story ID such as "US22", a method name, a tag or a Check, or a list of them, and every check that matches one of them is selected. None selects every check. The selected checks keep the order of the registry so that their output is written in the same order as in a full run, and a Check that is not in the registry runs after them. needs is everything the selected checks need, so Read_GEDCOM does not build what only the other checks use.'''
+    def __init__(self, selection = None):
+        if selection is None:
+            self.checks = list(CHECKS)
+            self.user_stories = list(USER_STORY_CHECKS)
+        else:
+            if isinstance(selection, (str, Check)):
+                selection = [selection]
+            selected = [item for item in selection if isinstance(item, Check)]
+            keys = set(item.upper() if item.upper().startswith("US") else item for item in selection if not isinstance(item, Check))
+            registry = CHECKS + USER_STORY_CHECKS
+            unknown = keys - set(check.story for check in registry) - set(check.method for check in registry) - set(tag for check in registry for tag in check.tags)
+            if unknown:
+                raise ValueError(f"Unknown checks {sorted(unknown)}")
+            matches = lambda check: check in selected or check.story in keys or check.method in keys or not check.tags.isdisjoint(keys)
+            self.checks = [check for check in CHECKS if matches(check)] + [check for check in selected if check not in registry]
+            self.user_stories = [check for check in USER_STORY_CHECKS if matches(check)]
+        self.needs = frozenset().union(*(check.needs for check in self.checks + self.user_stories))
+
+    def __repr__(self):
+        return f"Pipeline({[check.story for check in self.checks + self.user_stories]!r})"
+
+class PhaseProfile:
+    '''What a Profiler measured for one phase or check of a run. start is the nanoseconds from the start of the profiler, wall and cpu are nanoseconds, net_blocks is the net change in allocated memory blocks from before it to after it, which is not how many it allocated since the blocks it freed are taken off, peak_memory is the most bytes it used while tracing memory, records is how many individuals and families it looked up, errors is how many ERROR and WARNING lines it wrote and IDs is how many IDs a check returned. What was not measured is None.'''
+    __slots__ = ("name", "kind", "story", "start", "wall", "cpu", "net_blocks", "peak_memory", "records", "errors", "IDs", "pid")
+    def __init__(self, name, kind, story = None):
+        self.name = name
+        self.kind = kind
+        self.story = story
+        self.start = self.wall = self.cpu = self.net_blocks = self.peak_memory = self.records = self.errors = self.IDs = None
+        self.pid = os.getpid()
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class ErrorCounter:
+    '''This passes everything that a profiled check writes on to the output of the Read_GEDCOM and counts the lines that are errors or warnings'''
+    def __init__(self, output):
+        self.output = output
+        self.errors = 0
+
+    def __enter__(self):
+        self.output.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.output.__exit__(*exc_info)
+
+    def write(self, text):
+        if text.startswith(("ERROR", "WARNING")):
+            self.errors += 1
+        return self.output.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.output, name)
+
+class CountingMapping(collections.abc.Mapping):
+    '''This counts the records that a profiled check looks up in the individuals or family mapping of the Read_GEDCOM'''
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.count = 0
+
+    def __getitem__(self, ID):
+        self.count += 1
+        return self.mapping[ID]
+
+    def __contains__(self, ID):
+        return ID in self.mapping
+
+    def __iter__(self):
+        return iter(self.mapping)
+
+    def __len__(self):
+        return len(self.mapping)
+
+class Profiler:
+    '''This class measures the wall time, CPU time and net change in allocated memory blocks of each phase and check of a run and the errors each check writes. With count_records the records each check looks up through the individuals and family mappings are counted, which makes the checks slower, and with trace_memory the peak memory of each phase is traced with tracemalloc, which makes everything slower. A run without a profiler does not measure anything.'''
+    def __init__(self, count_records = False, trace_memory = False):
+        self.count_records = count_records
+        self.trace_memory = trace_memory
+        self.entries = [] #The PhaseProfile of each phase and check in the order they started
+        self.origin = time.perf_counter_ns()
+        self.started_tracing = False
+
+    @contextlib.contextmanager
+    def measure(self, name, kind = "phase", story = None):
+        '''Measures the block of a with statement and yields its PhaseProfile'''
+        entry = PhaseProfile(name, kind, story)
+        self.entries.append(entry)
+        if self.trace_memory:
+            import tracemalloc #Only needed when memory is traced
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        cpu = time.process_time_ns()
+        wall = time.perf_counter_ns()
+        try:
+            yield entry
+        finally:
+            entry.wall = time.perf_counter_ns() - wall
+            entry.cpu = time.process_time_ns() - cpu
+            entry.net_blocks = sys.getallocatedblocks() - blocks
+            entry.start = wall - self.origin
+            if self.trace_memory:
+                entry.peak_memory = tracemalloc.get_traced_memory()[1] - memory
+
+    def run_check(self, reader, check):
+        '''Runs the check on the Read_GEDCOM, measures it and returns what it returned'''
+        with self.measure(check.method, "check", check.story) as entry:
+            output, individuals, family = reader.output, reader.individuals, reader.family
+            reader.output = counter = ErrorCounter(output)
+            if self.count_records:
+                reader.individuals, reader.family = CountingMapping(individuals), CountingMapping(family)
+            try:
+                result = getattr(reader, check.method)()
+            finally:
+                if self.count_records:
+                    entry.records = reader.individuals.count + reader.family.count
+                reader.output, reader.individuals, reader.family = output, individuals, family
+                entry.errors = counter.errors
+            entry.IDs = len(result) if isinstance(result, list) else None
+        return result
+
+    def close(self):
+        '''Stops tracing memory if the profiler started it'''
+        if self.started_tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def slowest(self, count = 10):
+        '''Returns the PhaseProfile of the phases and checks that took the most wall time, slowest first'''
+        return sorted(self.entries, key = lambda entry: entry.wall or 0, reverse = True)[:count]
+
+    def report(self):
+        '''Returns a pretty table of every phase and check, slowest first'''
+        table = make_table(["Name", "Story", "Wall ms", "CPU ms", "Net blocks", "Peak KB", "Records", "Errors"])
+        for entry in self.slowest(len(self.entries)):
+            table.add_row([entry.name, entry.story or "", round(entry.wall / 1e6, 3), round(entry.cpu / 1e6, 3), entry.net_blocks, "" if entry.peak_memory is None else round(entry.peak_memory / 1024, 1), "" if entry.records is None else entry.records, "" if entry.errors is None else entry.errors])
+        return table.get_string()
+
+    def to_dict(self):
+        return {"entries": [entry.to_dict() for entry in self.entries]}
+
+    def save_json(self, path):
+        '''Saves every PhaseProfile as JSON'''
+        with open(path, "w") as fp:
+            json.dump(self.to_dict(), fp, indent = 1)
+
+    def save_trace(self, path):
+        '''Saves the phases and checks as complete events of the trace event format, which chrome://tracing, Perfetto and speedscope can show as a flame graph. The checks run by worker processes are on the thread of their process.'''
+        events = [{"name": entry.name, "cat": entry.kind, "ph": "X", "ts": entry.start / 1000, "dur": entry.wall / 1000, "pid": self.entries[0].pid if self.entries else os.getpid(), "tid": entry.pid, "args": {field: getattr(entry, field) for field in ("story", "cpu", "net_blocks", "peak_memory", "records", "errors", "IDs") if getattr(entry, field) is not None}} for entry in self.entries if entry.wall is not None]
+        with open(path, "w") as fp:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp)
+
+def capture_check(reader, check):
+    '''Runs one check on the Read_GEDCOM and returns what the check returned, the text it wrote to the report, the text it printed, the rows it added to each table and the exception it raised or None, instead of writing them out'''
+    output = reader.output
+    reader.output = ReportWriter(io.StringIO()) #Only collects the text of this check
+    if reader.renderer is not None: #The renderer holds the rows back instead of writing them
+        reader.renderer.hold()
+    else:
+        row_counts = {name: len(table.rows) for name, table in vars(reader).items() if name in reader.TABLE_FIELDS}
+    result = error = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) as printed:
+            result = check.run(reader)
+    except Exception as exception: #The caller writes what the check wrote before it raised and raises it again, like running it directly would
+        error = exception
+    finally:
+        captured, reader.output = reader.output, output
+        if reader.renderer is not None:
+            rows = reader.renderer.release()
+        else:
+            rows = {name: table.rows[row_counts.get(name, 0):] for name, table in vars(reader).items() if name in reader.TABLE_FIELDS and len(table.rows) > row_counts.get(name, 0)} #Includes the tables that the check made
+    return result, captured.getvalue(), printed.getvalue(), rows, error
+
+forked_reader = None #The Read_GEDCOM that the worker processes of a CheckExecutor inherit when they are forked
+
+def run_forked_check(check):
+    '''Runs one check in a worker process of a CheckExecutor on the Read_GEDCOM inherited from the parent process. What the profiler of a profiled run measured in the worker is sent back with the outcome.'''
+    profiler = forked_reader.profiler
+    start = len(profiler.entries) if profiler is not None else 0
+    outcome = capture_check(forked_reader, check)
+    return outcome, profiler.entries[start:] if profiler is not None else []
+
+class CheckExecutor:
+    '''This class runs the checks of the registry on a Read_GEDCOM after the file was read. With more than one worker the checks run on a pool of forked processes that share the parsed individuals and families copy-on-write. The report text, printed text, table rows and results of every check are merged back in registry order, so the output is the same as running the checks one after another.'''
+    def __init__(self, reader, workers = 1):
+        self.reader = reader
+        self.workers = workers if workers is not None else os.cpu_count() #None uses every core
+        self.outcomes = dict() #The key is the method name of a check and the value is what capture_check returned for it
+
+    def run(self, checks = None, previous = None, changed = frozenset()):
+        '''Runs the checks and returns a dictionary with the method name of each check as the key and what it returned as the value. previous is the outcomes of an earlier run. When it is given, a check that does not read any of the changed fields is not run again and its earlier outcome is merged instead, and the outcome of every check is kept in outcomes.'''
+        checks = CHECKS if checks is None else checks
+        if self.workers > 1:
+            import multiprocessing #Only needed when the checks run on more than one worker
+        parallel = self.workers > 1 and "fork" in multiprocessing.get_all_start_methods() #Without fork the parsed records would have to be copied to every worker, so the checks run here instead
+        if previous is None and not parallel:
+            return {check.method: check.run(self.reader) for check in checks}
+        previous = previous if previous is not None else dict()
+        stale = [check for check in checks if check.reads is None or check.method not in previous or check.reads & changed]
+        results = dict()
+        pool = None
+        global forked_reader
+        try:
+            if parallel and len(stale) > 1:
+                forked_reader = self.reader
+                sys.stdout.flush()
+                pool = multiprocessing.get_context("fork").Pool(min(self.workers, len(stale)))
+                outcomes = self.merge_profiles(pool.imap(run_forked_check, stale)) #imap returns the outcomes in registry order, so a check that raises stops the merge at the same place it would stop the checks run one after another
+            else:
+                outcomes = (capture_check(self.reader, check) for check in stale)
+            stale = set(check.method for check in stale)
+            for check in checks:
+                outcome = next(outcomes) if check.method in stale else previous[check.method]
+                result, report, printed, rows, error = outcome
+                with self.reader.output as f:
+                    f.write(report)
+                sys.stdout.write(printed)
+                if pool is not None or check.method not in stale or self.reader.renderer is not None: #A check captured in this process already added its rows to the tables, unless the renderer held them back
+                    for name, new_rows in rows.items():
+                        for row in new_rows:
+                            getattr(self.reader, name).add_row(row)
+                if error is not None:
+                    raise error
+                results[check.method] = result
+                self.outcomes[check.method] = outcome
+        finally:
+            forked_reader = None
+            if pool is not None:
+                pool.terminate()
+        return results
+
+    def merge_profiles(self, outcomes):
+        '''Yields the outcome of each check run by a worker and adds what the profiler measured in the worker to the profiler of the Read_GEDCOM'''
+        for outcome, entries in outcomes:
+            if self.reader.profiler is not None:
+                self.reader.profiler.entries += entries
+            yield outcome
+
 class UserStories:
     '''This class is meant to store functions for testing errors in user stories'''
-    def __init__(self, family_dict, individual_dict, error_list, print_all_errors):
+    def __init__(self, family_dict, individual_dict, error_list, print_all_errors, output = None, date_columns = None, checks = None):
         self.family = family_dict
         self.individuals = individual_dict
+        self.output = output if output is not None else ReportWriter()
+        self.date_columns = date_columns #Runs US03 and US04 on the NumPy date columns when it is given
         self.add_errors = error_list
-        self.birth_before_death()
-        self.marriage_before_divorce()
-        self.marriage_before_death()
-        self.divorce_before_death()
+        for check in USER_STORY_CHECKS if checks is None else checks: #Only runs the user stories of USER_STORY_CHECKS that a Pipeline selected when checks is given
+            getattr(self, check.method)()
 
         if print_all_errors == True:
             self.print_user_story_errors()
@@ -904,12 +2965,22 @@ class UserStories:
 
     def birth_before_death(self):
         '''US03 Birth Before Death: Birth should occur before death of an individual'''
+        if self.date_columns is not None:
+            errors = self.date_columns.birth_before_death()
+            if errors is not None:
+                self.add_errors += errors
+                return
         for individual in self.individuals.values():
             if individual.death != None and individual.death != "ILLEGITIMATE" and individual.birth != "ILLEGITIMATE" and (individual.death - individual.birth).days < 0:
                 self.add_errors += [f"ERROR: INDIVIDUAL: US03: {individual.name}'s death occurs on {individual.death} which is before their birth on {individual.birth}"]
     
     def marriage_before_divorce(self):
         '''US04 Marriage Before Divorce: Marriage should occur before divorce of spouses, and divorce can only occur after marriage'''
+        if self.date_columns is not None:
+            errors = self.date_columns.marriage_before_divorce()
+            if errors is not None:
+                self.add_errors += errors
+                return
         for families in self.family.values():
             if families.divorce != "NA" and families.divorce != "ILLEGITIMATE" and families.marriage != "ILLEGITIMATE" and (families.divorce - families.marriage).days < 0:
                 self.add_errors += [f"ERROR: FAMILY: US04: {self.individuals[families.husband].name} and {self.individuals[families.wife].name} divorce occurs on {families.divorce} which is before their marriage on {families.marriage}"]
@@ -961,10 +3032,10 @@ class UserStories:
 
     def print_user_story_errors(self):
         '''This function will print all the errors that have been compiled into the list of errors'''
-        for GEDCOM_error in sorted(self.add_errors):
-            with open("Sprintoutput.txt", "a") as f:
+        with self.output as f:
+            for GEDCOM_error in sorted(self.add_errors):
                 print(GEDCOM_error, file=f)
-            print(GEDCOM_error)
+                print(GEDCOM_error)
 
 def main():
     '''This runs the program.'''
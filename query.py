@@ -0,0 +1,184 @@
+'''This file answers questions about a GEDCOM file that was already read, such as "the living descendants of I2", "everyone alive on 1 JAN 0290" or "the families married from 0280 to 0290". A TreeQuery indexes the individuals and families of a Read_GEDCOM once, so each question after that looks up an index instead of going through every record.
+Every query returns a frozenset of IDs, so queries are combined with &, | and -, for example query.descendants("I2") & query.living(). ordered puts the IDs of an answer in the order of the file.'''
+
+import bisect
+import datetime
+from collections import defaultdict
+
+import gedcom_parser
+
+OPEN_END = datetime.date.max.toordinal() #The end of the life of an individual that has no death date
+
+class IntervalTree:
+    '''A static centered interval tree of closed (start, end, value) intervals. Each node keeps the intervals that contain its center sorted by start and by end, the intervals that end before the center go to the left and the ones that start after it go to the right, so finding the k intervals that contain a point takes O(log n + k).'''
+    __slots__ = ("center", "starts", "by_start", "ends", "by_end", "left", "right")
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        points = sorted(point for start, end, value in intervals for point in (start, end))
+        self.center = points[len(points) // 2] if points else 0
+        here = [interval for interval in intervals if interval[0] <= self.center <= interval[1]]
+        here.sort(key = lambda interval: interval[0])
+        self.starts = [interval[0] for interval in here]
+        self.by_start = [interval[2] for interval in here]
+        here.sort(key = lambda interval: interval[1])
+        self.ends = [interval[1] for interval in here]
+        self.by_end = [interval[2] for interval in here]
+        left = [interval for interval in intervals if interval[1] < self.center]
+        right = [interval for interval in intervals if interval[0] > self.center]
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlapping(self, start, end):
+        '''Returns the list of values whose intervals have at least one point from start to end (inclusive) in common with it'''
+        values, nodes = [], [self]
+        while nodes:
+            node = nodes.pop()
+            if end < node.center: #Every interval of the node ends at or after the center, so only where they start matters
+                values.extend(node.by_start[:bisect.bisect_right(node.starts, end)])
+                if node.left is not None:
+                    nodes.append(node.left)
+            elif start > node.center:
+                values.extend(node.by_end[bisect.bisect_left(node.ends, start):])
+                if node.right is not None:
+                    nodes.append(node.right)
+            else:
+                values.extend(node.by_start)
+                nodes.extend(child for child in (node.left, node.right) if child is not None)
+        return values
+
+    def at(self, point):
+        '''Returns the list of values whose intervals contain point'''
+        return self.overlapping(point, point)
+
+class DateIndex:
+    '''Values sorted by their dates, so the values whose date is in a range are found with two binary searches'''
+    def __init__(self, dated):
+        pairs = sorted((date.toordinal(), value) for value, date in dated if isinstance(date, datetime.date))
+        self.ordinals = [ordinal for ordinal, value in pairs]
+        self.values = [value for ordinal, value in pairs]
+
+    def between(self, first, last):
+        '''Returns the list of values whose date is from first to last (inclusive)'''
+        return self.values[bisect.bisect_left(self.ordinals, first.toordinal()):bisect.bisect_right(self.ordinals, last.toordinal())]
+
+class TreeQuery:
+    '''The indexes of one Read_GEDCOM. The life of each individual with a legitimate birthday is an interval from the birth to the death, or with no end while they are alive, and each family with a legitimate marriage date is married from then until the divorce or the death of a spouse. Individuals with an illegitimate death date or a death before their birth and families with an illegitimate divorce date or an end before the marriage are left out of the interval trees because when they lived or were married is not known. The descendants and ancestors of an individual are found the first time they are asked for and kept for the next time.'''
+    def __init__(self, reader):
+        self.individuals = reader.individuals
+        self.family = reader.family
+        self.positions = {ID: position for position, ID in enumerate(self.individuals)}
+        self.family_positions = {ID: position for position, ID in enumerate(self.family)}
+        self.lives = IntervalTree(life for life in (self.life(ID) for ID in self.individuals) if life is not None)
+        self.marriages = IntervalTree(marriage for marriage in (self.marriage(fam) for fam in self.family) if marriage is not None)
+        self.births = DateIndex((ID, individual.birth) for ID, individual in self.individuals.items())
+        self.deaths = DateIndex((ID, individual.death) for ID, individual in self.individuals.items())
+        self.weddings = DateIndex((fam, family.marriage) for fam, family in self.family.items())
+        self.surnames = defaultdict(list) #The key is the surname in lower case and the value is the list of IndiIDs with it
+        self.surname_codes = defaultdict(list) #The key is the Soundex code of the surname and the value is the list of IndiIDs with it
+        for ID, individual in self.individuals.items():
+            surname = gedcom_parser.split_name(individual.name)[1]
+            self.surnames[surname.lower()].append(ID)
+            self.surname_codes[gedcom_parser.soundex(surname)].append(ID)
+        self._living = None
+        self._descendants = dict()
+        self._ancestors = dict()
+
+    def life(self, ID):
+        '''Returns the (birth ordinal, death ordinal, ID) interval of the life of an individual, or None if it is not known'''
+        individual = self.individuals[ID]
+        if not isinstance(individual.birth, datetime.date):
+            return None
+        if individual.death is None:
+            return (individual.birth.toordinal(), OPEN_END, ID)
+        if isinstance(individual.death, datetime.date) and individual.death >= individual.birth:
+            return (individual.birth.toordinal(), individual.death.toordinal(), ID)
+        return None
+
+    def marriage(self, fam):
+        '''Returns the (marriage ordinal, end ordinal, FamID) interval of a family, or None if it is not known. The marriage ends at the divorce or the first death of a spouse.'''
+        family = self.family[fam]
+        if not isinstance(family.marriage, datetime.date):
+            return None
+        ends = [family.divorce] + [self.individuals[spouse].death for spouse in (family.husband, family.wife) if spouse in self.individuals]
+        if any(end is not None and end != "NA" and not isinstance(end, datetime.date) for end in ends):
+            return None
+        end = min((end.toordinal() for end in ends if isinstance(end, datetime.date)), default = OPEN_END)
+        return (family.marriage.toordinal(), end, fam) if end >= family.marriage.toordinal() else None
+
+    def alive_on(self, date):
+        '''Returns the IndiIDs of the individuals that were alive on date'''
+        return frozenset(self.lives.at(date.toordinal()))
+
+    def alive_between(self, first, last):
+        '''Returns the IndiIDs of the individuals that were alive on at least one day from first to last'''
+        return frozenset(self.lives.overlapping(first.toordinal(), last.toordinal()))
+
+    def married_on(self, date):
+        '''Returns the FamIDs of the families that were married on date'''
+        return frozenset(self.marriages.at(date.toordinal()))
+
+    def born_between(self, first, last):
+        '''Returns the IndiIDs of the individuals born from first to last (inclusive)'''
+        return frozenset(self.births.between(first, last))
+
+    def died_between(self, first, last):
+        '''Returns the IndiIDs of the individuals that died from first to last (inclusive)'''
+        return frozenset(self.deaths.between(first, last))
+
+    def married_between(self, first, last):
+        '''Returns the FamIDs of the families married from first to last (inclusive). For years, use the first of January and the last of December.'''
+        return frozenset(self.weddings.between(first, last))
+
+    def living(self):
+        '''Returns the IndiIDs of the individuals that have no death date, which is how US30 and US31 tell who is alive'''
+        if self._living is None:
+            self._living = frozenset(ID for ID, individual in self.individuals.items() if individual.death is None)
+        return self._living
+
+    def with_surname(self, surname, sounds_like = False):
+        '''Returns the IndiIDs of the individuals with the surname, in any case, or with a surname with the same Soundex code when sounds_like is True'''
+        if sounds_like:
+            return frozenset(self.surname_codes.get(gedcom_parser.soundex(surname), ()))
+        return frozenset(self.surnames.get(surname.lower(), ()))
+
+    def descendants(self, ID):
+        '''Returns the IndiIDs of the children of the individual, their children and so on, not including the individual'''
+        if ID not in self._descendants:
+            self._descendants[ID] = self.closure(ID, self.children)
+        return self._descendants[ID]
+
+    def ancestors(self, ID):
+        '''Returns the IndiIDs of the parents of the individual, their parents and so on, not including the individual'''
+        if ID not in self._ancestors:
+            self._ancestors[ID] = self.closure(ID, self.parents)
+        return self._ancestors[ID]
+
+    def children(self, ID):
+        '''Returns the IndiIDs of the children in the families where the individual is a spouse'''
+        return [child for fam in self.individuals[ID].fams if fam in self.family for child in self.family[fam].children if child in self.individuals]
+
+    def parents(self, ID):
+        '''Returns the IndiIDs of the husband and wife of the famc family of the individual'''
+        famc = self.individuals[ID].famc
+        if famc not in self.family:
+            return []
+        return [parent for parent in (self.family[famc].husband, self.family[famc].wife) if parent in self.individuals]
+
+    def closure(self, ID, step):
+        '''Returns every IndiID that can be reached from ID by calling step one or more times. A file where someone is their own ancestor does not loop forever.'''
+        found, waiting = set(), [ID] if ID in self.individuals else []
+        while waiting:
+            for other in step(waiting.pop()):
+                if other not in found:
+                    found.add(other)
+                    waiting.append(other)
+        found.discard(ID)
+        return frozenset(found)
+
+    def where(self, IDs, predicate):
+        '''Returns the IDs whose individual, or family for FamIDs, makes predicate return True'''
+        return frozenset(ID for ID in IDs if predicate(self.individuals[ID] if ID in self.individuals else self.family[ID]))
+
+    def ordered(self, IDs):
+        '''Returns a list of the IDs in the order of the file, individuals first'''
+        return sorted(IDs, key = lambda ID: (0, self.positions[ID]) if ID in self.positions else (1, self.family_positions[ID]))
@@ -0,0 +1,268 @@
+'''This file runs a local HTTP server that validates GEDCOM files and keeps the files it read in memory. A file is read once and stays in a least recently used cache until it changes or other files need the room, and each check runs the first time it is asked for on a file, so asking again is answered from memory without reading the file or running the check again.
+GET /validate?path=FILE&checks=US01,US22 returns the results and messages of the checks as JSON (every check when checks is left out), GET /report?path=FILE&checks=US29 returns the text the checks wrote to the report (the list checks when checks is left out) and GET /metrics returns the latency of the requests and the hits of the cache.
+Run "python server.py --port 8555 --root uploads" or "python server.py --unix /tmp/gedcom.sock" and then "curl 'http://127.0.0.1:8555/validate?path=family.ged&checks=error'".'''
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+import gedcom_parser
+from batch import MESSAGE_PREFIXES, json_value
+
+MAX_RECORDS = 2000000 #The most individuals and families the cache keeps by default
+LATENCY_WINDOW = 1024 #How many of the most recent requests of a route the latency percentiles are taken from
+ROUTES = ("/validate", "/report", "/metrics")
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    '''Raised while handling a request to answer it with the status and the message'''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ParsedTree:
+    '''One GEDCOM file read into memory with no checks, and the outcome of every check that was run on it so far. The outcome of a check of the registry is what capture_check returned and the outcome of a user story of UserStories is the list of errors it found.'''
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.reader = gedcom_parser.Read_GEDCOM(path, False, False, gedcom_parser.ReportWriter(io.StringIO()), fast_tokenizer = True, checks = [])
+        self.records = len(self.reader.individuals) + len(self.reader.family)
+        self.outcomes = dict() #The key is the method name of a check
+
+    def missing(self, pipeline):
+        '''Returns the checks of the Pipeline that were not run on the file yet'''
+        return [check for check in pipeline.checks + pipeline.user_stories if check.method not in self.outcomes]
+
+    def run(self, checks):
+        '''Runs the checks that were not run on the file yet. The user stories are run on their own so that their errors are not mixed up with the errors of the other user stories.'''
+        for check in checks:
+            if check.method in self.outcomes:
+                continue
+            if check in gedcom_parser.USER_STORY_CHECKS:
+                self.outcomes[check.method] = gedcom_parser.UserStories(self.reader.family, self.reader.individuals, [], False, gedcom_parser.ReportWriter(io.StringIO()), None, [check]).add_errors
+            else:
+                self.outcomes[check.method] = gedcom_parser.capture_check(self.reader, check)
+
+    def validation(self, pipeline):
+        '''Returns the results and messages of the checks of the Pipeline, which must have been run, as a dictionary that can be saved as JSON'''
+        results, messages, errors = dict(), [], dict()
+        for check in pipeline.checks:
+            result, report, printed, rows, error = self.outcomes[check.method]
+            results[check.story] = result
+            messages += [line for line in report.splitlines() if line.startswith(MESSAGE_PREFIXES)]
+            if error is not None:
+                errors[check.story] = f"{type(error).__name__}: {error}"
+        for check in pipeline.user_stories:
+            results[check.story] = self.outcomes[check.method]
+            messages += self.outcomes[check.method]
+        validation = {"path": self.path, "individuals": len(self.reader.individuals), "families": len(self.reader.family), "results": results, "messages": messages}
+        if errors:
+            validation["errors"] = errors
+        return validation
+
+    def report(self, pipeline):
+        '''Returns the text that the checks of the Pipeline, which must have been run, wrote to the report'''
+        return "".join(self.outcomes[check.method][1] for check in pipeline.checks) + "".join(line + "\n" for check in pipeline.user_stories for line in self.outcomes[check.method])
+
+class TreeCache:
+    '''A least recently used cache of ParsedTrees that holds at most max_records individuals and families. The key of a file is its real path, the time it was last modified, its size and today's date, so a file that changed is read again and the checks that depend on today are run again the next day.'''
+    def __init__(self, max_records = MAX_RECORDS):
+        self.max_records = max_records
+        self.trees = collections.OrderedDict() #The key is the key of the file and the value is its ParsedTree, least recently used first
+        self.records = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(path):
+        '''Returns the key of the file at the path. Raises FileNotFoundError if there is no such file.'''
+        stat = os.stat(path)
+        return (os.path.realpath(path), stat.st_mtime_ns, stat.st_size, datetime.date.today())
+
+    def get(self, key):
+        '''Returns the ParsedTree of the key and marks it as the most recently used, or returns None if it is not cached'''
+        tree = self.trees.get(key)
+        if tree is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.trees.move_to_end(key)
+        return tree
+
+    def put(self, tree):
+        '''Adds the ParsedTree, removes the older versions of its file and then the least recently used trees until the rest fit in max_records. A tree that is too large for the cache on its own is not kept.'''
+        for key in [key for key in self.trees if key[0] == tree.key[0]]:
+            self.records -= self.trees.pop(key).records
+        self.trees[tree.key] = tree
+        self.records += tree.records
+        while self.records > self.max_records:
+            key, evicted = self.trees.popitem(last = False)
+            self.records -= evicted.records
+            self.evictions += 1
+
+    def stats(self):
+        return {"trees": len(self.trees), "records": self.records, "max_records": self.max_records, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class LatencyMetrics:
+    '''Counts the requests and errors of each route and keeps how long the most recent requests took, so the percentiles follow the current load'''
+    def __init__(self, window = LATENCY_WINDOW):
+        self.window = window
+        self.requests = collections.Counter()
+        self.errors = collections.Counter()
+        self.total = collections.Counter() #The key is the route and the value is the seconds all its requests took
+        self.recent = collections.defaultdict(lambda: collections.deque(maxlen = self.window))
+
+    def record(self, route, seconds, status):
+        self.requests[route] += 1
+        self.errors[route] += status >= 400
+        self.total[route] += seconds
+        self.recent[route].append(seconds)
+
+    def summary(self):
+        '''Returns the number of requests and errors, the mean and the 50th, 95th and 99th percentile and maximum latency in milliseconds of each route'''
+        summary = dict()
+        for route, count in self.requests.items():
+            recent = sorted(self.recent[route])
+            percentile = lambda fraction: round(recent[min(int(fraction * len(recent)), len(recent) - 1)] * 1000, 3)
+            summary[route] = {"requests": count, "errors": self.errors[route], "mean_ms": round(self.total[route] / count * 1000, 3), "p50_ms": percentile(0.5), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99), "max_ms": round(recent[-1] * 1000, 3)}
+        return summary
+
+class ValidationServer:
+    '''Answers the requests of the HTTP server. Reading files and running checks happen on a worker thread so the event loop keeps answering the requests that are already in memory, including the metrics, while a large file is read. There is one worker thread because the checks print through sys.stdout, which every thread shares, and sys.stdout is redirected while the worker thread reads a file or runs a check, so the server writes its own messages to sys.stderr. Requests for a file that is being read wait for that read instead of reading it again. Only the files under root can be validated.'''
+    def __init__(self, root = ".", max_records = MAX_RECORDS):
+        self.root = os.path.realpath(root)
+        self.cache = TreeCache(max_records)
+        self.metrics = LatencyMetrics()
+        self.executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix = "gedcom")
+        self.loading = dict() #The key is the key of a file that is being read and the value is the future of its ParsedTree
+
+    def resolve(self, path):
+        '''Returns the path of the file relative to root, or raises an HTTPError if it is outside root'''
+        if not path:
+            raise HTTPError(400, "The path of a GEDCOM file is required")
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([resolved, self.root]) != self.root:
+            raise HTTPError(403, f"{path} is not under the root directory")
+        return resolved
+
+    async def tree(self, path, pipeline):
+        '''Returns the ParsedTree of the file with every check of the Pipeline run on it, reading the file and running the checks on the worker thread when they are not in memory'''
+        try:
+            key = self.cache.key(path)
+        except OSError:
+            raise HTTPError(404, f"Can't open {path}!")
+        loop = asyncio.get_running_loop()
+        tree = self.cache.get(key)
+        if tree is None:
+            if key not in self.loading:
+                self.loading[key] = loop.run_in_executor(self.executor, ParsedTree, path, key)
+            try:
+                tree = await asyncio.shield(self.loading[key]) #A client that disconnects does not cancel the read for the others
+            finally:
+                self.loading.pop(key, None)
+            if key not in self.cache.trees:
+                self.cache.put(tree)
+        while tree.missing(pipeline):
+            await loop.run_in_executor(self.executor, tree.run, tree.missing(pipeline)) #Checks that another request runs at the same time are skipped by run
+        return tree
+
+    def pipeline(self, params, default):
+        '''Returns the Pipeline of the comma separated checks of the request, or of default when there are none'''
+        selection = [item for value in params.get("checks", []) for item in value.split(",") if item]
+        try:
+            return gedcom_parser.Pipeline(selection or default)
+        except ValueError as error:
+            raise HTTPError(400, str(error))
+
+    async def respond(self, method, url):
+        '''Returns the status, content type and body of the response to the request'''
+        if method != "GET":
+            raise HTTPError(405, f"{method} is not supported")
+        params = urllib.parse.parse_qs(url.query)
+        if url.path == "/metrics":
+            return 200, "application/json", json.dumps({"routes": self.metrics.summary(), "cache": self.cache.stats()})
+        if url.path == "/validate":
+            pipeline = self.pipeline(params, None)
+            tree = await self.tree(self.resolve(params.get("path", [""])[0]), pipeline)
+            return 200, "application/json", json.dumps(tree.validation(pipeline), default = json_value)
+        if url.path == "/report":
+            pipeline = self.pipeline(params, "list")
+            tree = await self.tree(self.resolve(params.get("path", [""])[0]), pipeline)
+            return 200, "text/plain; charset=utf-8", tree.report(pipeline)
+        raise HTTPError(404, f"There is no {url.path}, only {', '.join(ROUTES)}")
+
+    async def handle(self, reader, writer):
+        '''Reads one HTTP request from the connection, writes the response and closes the connection'''
+        start = time.perf_counter()
+        route = "invalid"
+        try:
+            try:
+                method, target, version = (await reader.readline()).decode("latin-1").split()
+            except ValueError:
+                raise HTTPError(400, "The request line is not valid")
+            while (await reader.readline()).strip(): #The headers are not used
+                pass
+            url = urllib.parse.urlsplit(target)
+            route = url.path if url.path in ROUTES else "other" #Every unknown path is counted together so the metrics stay small
+            status, content_type, body = await self.respond(method, url)
+        except HTTPError as error:
+            status, content_type, body = error.status, "application/json", json.dumps({"error": str(error)})
+        except Exception as error: #A bug in a check answers its own request with an error instead of stopping the server
+            status, content_type, body = 500, "application/json", json.dumps({"error": f"{type(error).__name__}: {error}"})
+        body = body.encode("utf-8")
+        try:
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError: #The client went away before the response was written
+            pass
+        self.metrics.record(route, time.perf_counter() - start, status)
+
+    async def start(self, host = "127.0.0.1", port = 8555, unix = None):
+        '''Starts listening on the host and port, or on the Unix socket when unix is given, and returns the asyncio server'''
+        if unix is not None:
+            return await asyncio.start_unix_server(self.handle, unix)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+async def serve(server, host, port, unix):
+    listener = await server.start(host, port, unix)
+    addresses = ", ".join(str(socket.getsockname()) for socket in listener.sockets)
+    print(f"Validating GEDCOM files under {server.root} on {addresses}", file = sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv = None):
+    '''This starts the server from the command line and runs it until it is stopped'''
+    parser = argparse.ArgumentParser(description = "Runs a local HTTP server that validates GEDCOM files and keeps the files it read in memory")
+    parser.add_argument("--host", default = "127.0.0.1", help = "the address to listen on")
+    parser.add_argument("--port", type = int, default = 8555, help = "the port to listen on")
+    parser.add_argument("--unix", help = "the Unix socket to listen on instead of a port")
+    parser.add_argument("--root", default = ".", help = "the directory the paths of the requests are relative to. Files outside it are not validated")
+    parser.add_argument("--max-records", type = int, default = MAX_RECORDS, help = "the most individuals and families kept in memory")
+    args = parser.parse_args(argv)
+    server = ValidationServer(args.root, args.max_records)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())